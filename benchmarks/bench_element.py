@@ -0,0 +1,143 @@
+"""Memory and throughput of `BGPElement` against the former NamedTuple layout.
+
+Usage:
+    python benchmarks/bench_element.py [n_elements]
+"""
+
+import sys
+import gc
+import time
+import heapq
+import pickle
+import tracemalloc
+from operator import attrgetter
+from typing import NamedTuple
+
+from pybgpflux.bgpelement import BGPElement
+
+
+class NamedTupleElement(NamedTuple):
+    """`BGPElement` layout up to 0.5.0: a NamedTuple with a fields dict per element"""
+
+    time: float
+    type: str
+    collector: str
+    peer_asn: int
+    peer_address: str
+    fields: dict
+
+    def __str__(self):
+        return "%s|%f|%s|%s|%s|%s|%s|%s|%s|%s|%s" % (
+            self.type,
+            self.time,
+            self.collector,
+            self.peer_asn,
+            self.peer_address,
+            self.fields.get("prefix"),
+            self.fields.get("next-hop"),
+            self.fields["as-path"] if self.fields.get("as-path") else None,
+            " ".join(self.fields["communities"])
+            if self.fields.get("communities")
+            else None,
+            None,
+            None,
+        )
+
+    def __lt__(self, other):
+        return self.time < other.time
+
+
+def raw_elements(n: int) -> list[tuple]:
+    """Parser output stand-in: (time, type, peer_asn, peer_address, prefix, next_hop, as_path, communities)"""
+    return [
+        (
+            1283299200.0 + i // 100,
+            "A",
+            2497,
+            "202.249.2.169",
+            f"10.{i >> 16 & 255}.{i >> 8 & 255}.0/24",
+            "202.249.2.169",
+            f"2497 3356 {13335 + i % 1000}",
+            ["2497:22", "3356:100"],
+        )
+        for i in range(n)
+    ]
+
+
+def build_namedtuple(raw):
+    return [
+        NamedTupleElement(
+            t,
+            ty,
+            "route-views.wide",
+            asn,
+            address,
+            {"next-hop": nh, "as-path": path, "communities": comm, "prefix": pfx},
+        )
+        for t, ty, asn, address, pfx, nh, path, comm in raw
+    ]
+
+
+def build_slotted(raw):
+    return [
+        BGPElement(t, ty, "route-views.wide", asn, address, None, pfx, nh, path, comm)
+        for t, ty, asn, address, pfx, nh, path, comm in raw
+    ]
+
+
+def timed(func, *args) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def retained_memory(build, raw) -> int:
+    """Bytes allocated by `build` that are still alive afterwards"""
+    gc.collect()
+    tracemalloc.start()
+    elements = build(raw)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del elements
+    return size
+
+
+def run(n: int) -> dict[str, dict[str, float]]:
+    raw = raw_elements(n)
+    results = {}
+    for name, build in (("NamedTuple", build_namedtuple), ("BGPElement", build_slotted)):
+        elements = build(raw)
+        # 4 sorted sources, as in BGPStream's merge of collectors
+        sources = [elements[i::4] for i in range(4)]
+        results[name] = {
+            "build (Melem/s)": n / timed(build, raw) / 1e6,
+            "memory (B/elem)": retained_memory(build, raw) / n,
+            "merge (Melem/s)": n
+            / timed(lambda: sum(1 for _ in heapq.merge(*sources, key=attrgetter("time"))))
+            / 1e6,
+            "str (Melem/s)": n / timed(lambda: [str(e) for e in elements]) / 1e6,
+            "fields (Melem/s)": n
+            / timed(lambda: [e.fields["prefix"] for e in elements])
+            / 1e6,
+            "pickle (Melem/s)": n
+            / timed(lambda: pickle.loads(pickle.dumps(elements, pickle.HIGHEST_PROTOCOL)))
+            / 1e6,
+        }
+    return results
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    results = run(n)
+    metrics = list(next(iter(results.values())))
+    print(f"{n} elements")
+    print(f"| {'':<18} | " + " | ".join(f"{name:>10}" for name in results) + " |")
+    print(f"| {'-' * 18} | " + " | ".join("-" * 10 for _ in results) + " |")
+    for metric in metrics:
+        values = " | ".join(f"{results[name][metric]:>10.2f}" for name in results)
+        print(f"| {metric:<18} | {values} |")
+
+
+if __name__ == "__main__":
+    main()
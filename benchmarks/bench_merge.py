@@ -0,0 +1,86 @@
+"""Per-element overhead of merging collectors in time order: `heapq.merge` against `pybgpflux.merge`.
+
+Each source stands for a collector: elements with integer timestamps over an
+hour, as in update dumps, so that sources interleave every second.
+
+Usage:
+    python benchmarks/bench_merge.py [n_elements]
+"""
+
+import sys
+import gc
+import time
+import heapq
+import random
+from itertools import chain
+from operator import attrgetter
+
+from pybgpflux.bgpelement import BGPElement
+from pybgpflux.merge import merge
+
+T0 = 1283299200.0
+DURATION = 3600
+SOURCES = (2, 10, 50)
+
+
+def make_sources(n: int, k: int, seed: int = 0) -> list[list[BGPElement]]:
+    """`k` sorted sources of `n` elements in total"""
+    rng = random.Random(seed)
+    sources = []
+    for s in range(k):
+        times = sorted(T0 + rng.randrange(DURATION) for _ in range(n // k))
+        sources.append(
+            [
+                BGPElement(t, "A", f"rrc{s:02d}", 2497, "202.249.2.169", None, "10.0.0.0/24")
+                for t in times
+            ]
+        )
+    return sources
+
+
+def timed(func, *args) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def consume(iterator):
+    for _ in iterator:
+        pass
+
+
+def run(n: int) -> dict[int, dict[str, float]]:
+    key = attrgetter("time")
+    results = {}
+    for k in SOURCES:
+        sources = make_sources(n, k)
+        total = sum(map(len, sources))
+        assert list(merge(*sources, key=key)) == list(heapq.merge(*sources, key=key))
+        # Floor: iterating over the elements without merging them
+        base = timed(consume, chain.from_iterable(sources))
+        heap = timed(consume, heapq.merge(*sources, key=key))
+        batched = timed(consume, merge(*sources, key=key))
+        results[k] = {
+            "chain (ns/elem)": base / total * 1e9,
+            "heapq.merge (ns/elem)": (heap - base) / total * 1e9,
+            "merge (ns/elem)": (batched - base) / total * 1e9,
+            "speedup": (heap - base) / max(batched - base, 1e-9),
+        }
+    return results
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    results = run(n)
+    metrics = list(next(iter(results.values())))
+    print(f"{n} elements over {DURATION} s, merge overhead above iteration")
+    print(f"| {'':<22} | " + " | ".join(f"{f'{k} sources':>10}" for k in results) + " |")
+    print(f"| {'-' * 22} | " + " | ".join("-" * 10 for _ in results) + " |")
+    for metric in metrics:
+        values = " | ".join(f"{results[k][metric]:>10.1f}" for k in results)
+        print(f"| {metric:<22} | {values} |")
+
+
+if __name__ == "__main__":
+    main()
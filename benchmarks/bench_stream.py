@@ -0,0 +1,351 @@
+"""End-to-end `BGPStream` benchmark on a synthetic local archive.
+
+Reproduces the scenarios of perf.md (cache type x data type x collectors x
+duration) for every available parser backend and stream mode, without the
+network: MRT files are synthesized (see `benchmarks/fixtures.py`), served by a
+local HTTP server and listed by a stand-in broker. Each run happens in a fresh
+process and reports the element count, runtime, elements/s, time to first
+element (TTFE) and peak RSS.
+
+Usage:
+    python -m benchmarks.bench_stream [--durations short long] [--modes default workers] ...
+    python -m benchmarks.bench_stream --write perf.md      # regenerate the perf.md tables
+    python -m benchmarks.bench_stream --json new.json --baseline old.json  # regression check
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import importlib.util
+import multiprocessing
+from dataclasses import dataclass, asdict
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.fixtures import LocalArchive, LocalBroker
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC, as in perf.md
+
+COLLECTORS = {
+    "single": ["route-views2"],
+    "few": ["rrc00", "route-views2"],
+    "many": [
+        "rrc00",
+        "rrc01",
+        "rrc03",
+        "rrc04",
+        "rrc05",
+        "route-views2",
+        "route-views.sydney",
+        "route-views.wide",
+        "route-views.linx",
+        "route-views.eqix",
+    ],
+}
+DURATIONS = {"short": 2 * 3600, "long": 24 * 3600}
+DATA_TYPES = {"update": ["update"], "rib": ["rib"]}
+DATA_TYPE_LABELS = {"update": "Update", "rib": "RIB"}
+CACHE_TYPES = ("no cache", "cache miss", "cache hit")
+
+# BGPStream options of each mode
+MODES = {
+    "default": {},
+    "single-chunk": {"chunk_time": None},
+    "workers": {"workers": 2},
+    "stream-downloads": {"stream_downloads": True},
+    "cache-decompressed": {"cache_decompressed": True},
+    "element-cache": {"element_cache": True},
+}
+
+# Executables and modules each parser needs
+PARSER_REQUIREMENTS = {
+    "pybgpkit": (None, "bgpkit"),
+    "bgpkit": ("bgpkit-parser", None),
+    "bgpdump": ("bgpdump", None),
+    "pybgpstream": (None, "pybgpstream"),
+}
+
+MARKER_START = "<!-- benchmarks:start -->"
+MARKER_END = "<!-- benchmarks:end -->"
+
+
+@dataclass
+class Scenario:
+    parser: str
+    mode: str
+    cache_type: str
+    data_type: str
+    collectors: str
+    duration: str
+
+    @property
+    def key(self) -> str:
+        return "/".join(asdict(self).values())
+
+
+@dataclass
+class Result:
+    scenario: Scenario
+    count: int
+    runtime: float  # seconds
+    ttfe: float  # seconds to the first element, None if the stream is empty
+    peak_rss: float  # MiB, including the worker and helper processes
+
+    @property
+    def rate(self) -> float:
+        return self.count / self.runtime if self.runtime else 0.0
+
+
+def available_parsers() -> list[str]:
+    """Parser backends that can run on this machine"""
+    return [
+        parser
+        for parser, (executable, module) in PARSER_REQUIREMENTS.items()
+        if (executable is None or shutil.which(executable))
+        and (module is None or importlib.util.find_spec(module))
+    ]
+
+
+def supported(scenario: Scenario) -> bool:
+    # See the BGPStream constructor
+    if scenario.parser == "pybgpstream" and scenario.mode == "workers":
+        return False
+    if scenario.mode == "element-cache" and scenario.cache_type == "no cache":
+        return False
+    return True
+
+
+def _peak_rss() -> float:
+    usage = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # kilobytes on Linux, bytes on macOS
+    return usage / 2**20 if sys.platform == "darwin" else usage / 2**10
+
+
+def run_stream(
+    archive: LocalArchive, scenario: Scenario, cache_dir: str | None
+) -> tuple[int, float, float | None]:
+    """Consume one stream of `scenario`.
+
+    Returns:
+        tuple: element count, runtime and time to first element (seconds).
+    """
+    from pybgpflux import BGPStream
+
+    ts_start = T0
+    ts_end = T0 + DURATIONS[scenario.duration] - 1
+    with mock.patch("bgpkit.Broker", lambda *args, **kwargs: LocalBroker(archive)):
+        start = time.perf_counter()
+        stream = BGPStream(
+            collectors=COLLECTORS[scenario.collectors],
+            data_type=DATA_TYPES[scenario.data_type],
+            ts_start=ts_start,
+            ts_end=ts_end,
+            cache_dir=cache_dir,
+            parser_name=scenario.parser,
+            **MODES[scenario.mode],
+        )
+        count = 0
+        ttfe = None
+        for _ in stream:
+            if not count:
+                ttfe = time.perf_counter() - start
+            count += 1
+        return count, time.perf_counter() - start, ttfe
+
+
+def _run_in_process(
+    archive: LocalArchive, scenario: Scenario, cache_dir: str | None
+) -> tuple[int, float, float | None, float]:
+    count, runtime, ttfe = run_stream(archive, scenario, cache_dir)
+    return count, runtime, ttfe, _peak_rss()
+
+
+def run(archive: LocalArchive, scenario: Scenario) -> Result:
+    """Run `scenario` in a fresh process, after a warm-up run for cache hits"""
+    collectors = COLLECTORS[scenario.collectors]
+    data_types = DATA_TYPES[scenario.data_type]
+    # Files of the broker queries margin too (see BGPStream._set_urls)
+    archive.ensure(collectors, data_types, T0 - 3600, T0 + DURATIONS[scenario.duration])
+
+    cache_dir = None if scenario.cache_type == "no cache" else tempfile.mkdtemp()
+    try:
+        runs = 2 if scenario.cache_type == "cache hit" else 1
+        for _ in range(runs):
+            # Spawned: a clean heap for the RSS, and the pybgpkit parser holding
+            # the GIL does not stall the HTTP server of this process
+            with ProcessPoolExecutor(
+                1, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                count, runtime, ttfe, peak_rss = executor.submit(
+                    _run_in_process, archive, scenario, cache_dir
+                ).result()
+    finally:
+        if cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    return Result(scenario, count, runtime, ttfe, peak_rss)
+
+
+# Reports
+
+
+def _table(results: list[Result]) -> list[str]:
+    lines = [
+        "| Mode | Cache Type | Data Type | Collectors | Duration | BGPElem count "
+        "| Runtime (s) | BGPElem/s | TTFE (s) | Peak RSS (MiB) |",
+        "| ---- | ---------- | --------- | ---------- | -------- | ------------- "
+        "| ----------- | --------- | -------- | -------------- |",
+    ]
+    for result in results:
+        s = result.scenario
+        ttfe = f"{result.ttfe:.2f}" if result.ttfe is not None else "-"
+        lines.append(
+            f"| {s.mode} | {s.cache_type.capitalize()} | {DATA_TYPE_LABELS[s.data_type]} "
+            f"| {s.collectors.capitalize()} | {s.duration.capitalize()} | {result.count} "
+            f"| {result.runtime:.2f} | {result.rate:.0f} | {ttfe} | {result.peak_rss:.1f} |"
+        )
+    return lines
+
+
+def markdown(results: list[Result], archive: LocalArchive, command: str) -> str:
+    """perf.md section of the results, one table per parser"""
+    lines = [
+        MARKER_START,
+        "",
+        "## Local benchmark",
+        "",
+        f"Generated by `{command}` on {platform.machine()} with Python "
+        f"{platform.python_version()}, against a synthetic archive "
+        f"({archive.updates_per_file} UPDATE messages per update dump, "
+        f"{archive.prefixes_per_rib} prefixes seen by 4 peers per RIB dump) served locally.",
+        "Runtimes include the local downloads, so they only compare the library against itself.",
+    ]
+    for parser in dict.fromkeys(r.scenario.parser for r in results):
+        lines += ["", f"### {parser}", ""]
+        lines += _table([r for r in results if r.scenario.parser == parser])
+    lines += ["", MARKER_END]
+    return "\n".join(lines) + "\n"
+
+
+def write_perf(path: str, section: str):
+    """Replace the generated section of perf.md (appended if missing)"""
+    with open(path) as f:
+        content = f.read()
+    if MARKER_START in content and MARKER_END in content:
+        head, rest = content.split(MARKER_START, 1)
+        tail = rest.split(MARKER_END, 1)[1].lstrip("\n")
+        content = head + section + tail
+    else:
+        content = content.rstrip("\n") + "\n\n" + section
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def compare(results: list[Result], baseline_path: str, tolerance: float) -> list[str]:
+    """Regressions against a previous `--json` output"""
+    with open(baseline_path) as f:
+        baseline = {r["key"]: r for r in json.load(f)}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.scenario.key)
+        if previous is None:
+            continue
+        if result.count != previous["count"]:
+            regressions.append(
+                f"{result.scenario.key}: {result.count} elements instead of {previous['count']}"
+            )
+        elif result.rate < previous["rate"] * (1 - tolerance):
+            regressions.append(
+                f"{result.scenario.key}: {result.rate:.0f} elem/s instead of {previous['rate']:.0f}"
+            )
+    return regressions
+
+
+def _command(argv=None) -> str:
+    """Command line reproducing the results, without the output and local options"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    words = ["python", "-m", "benchmarks.bench_stream"]
+    while argv:
+        arg = argv.pop(0)
+        if arg in ("--json", "--baseline", "--tolerance", "--archive-dir"):
+            argv.pop(0)
+        else:
+            words.append(f'"{arg}"' if " " in arg else arg)
+    return " ".join(words)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--parsers", nargs="+", default=None, choices=list(PARSER_REQUIREMENTS),
+                        help="Parser backends (default: every available one)")
+    parser.add_argument("--modes", nargs="+", default=["default"], choices=list(MODES))
+    parser.add_argument("--cache-types", nargs="+", default=list(CACHE_TYPES), choices=CACHE_TYPES)
+    parser.add_argument("--data-types", nargs="+", default=list(DATA_TYPES), choices=list(DATA_TYPES))
+    parser.add_argument("--collectors", nargs="+", default=list(COLLECTORS), choices=list(COLLECTORS))
+    parser.add_argument("--durations", nargs="+", default=["short"], choices=list(DURATIONS))
+    parser.add_argument("--updates-per-file", type=int, default=1000)
+    parser.add_argument("--prefixes-per-rib", type=int, default=5000)
+    parser.add_argument("--archive-dir", default=os.path.join(tempfile.gettempdir(), "pybgpflux-bench"),
+                        help="Where the synthetic MRT files are generated (reused across runs)")
+    parser.add_argument("--write", metavar="PERF_MD", help="Regenerate the tables of this perf.md")
+    parser.add_argument("--json", metavar="FILE", help="Save the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="Fail on regressions against a --json output")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative drop of elements/s against --baseline (default: 0.2)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    parsers = args.parsers or available_parsers()
+    archive = LocalArchive(args.archive_dir, args.updates_per_file, args.prefixes_per_rib)
+    httpd = archive.serve()
+
+    scenarios = [
+        Scenario(parser, mode, cache_type, data_type, collectors, duration)
+        for parser in parsers
+        for mode in args.modes
+        for cache_type in args.cache_types
+        for data_type in args.data_types
+        for collectors in args.collectors
+        for duration in args.durations
+    ]
+    results = []
+    try:
+        for scenario in filter(supported, scenarios):
+            result = run(archive, scenario)
+            results.append(result)
+            print(
+                f"{scenario.key}: {result.count} elements in {result.runtime:.2f}s "
+                f"({result.rate:.0f}/s), TTFE {result.ttfe or 0:.2f}s, "
+                f"peak RSS {result.peak_rss:.1f} MiB",
+                flush=True,
+            )
+    finally:
+        httpd.shutdown()
+
+    if args.write:
+        write_perf(args.write, markdown(results, archive, _command(argv)))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                [{"key": r.scenario.key, **asdict(r), "rate": r.rate} for r in results], f, indent=2
+            )
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""Synthetic MRT archive mirroring the RouteViews and RIPE RIS layouts.
+
+Files are generated on demand, deterministically (seeded by their path), so
+element counts are stable across runs and machines. They are served by a local
+HTTP server and listed by `LocalBroker`, a stand-in for `bgpkit.Broker`.
+"""
+
+import io
+import os
+import re
+import bz2
+import gzip
+import zlib
+import struct
+import random
+import datetime
+import functools
+import threading
+import ipaddress
+import http.server
+
+from bgpkit.bgpkit_broker import BrokerItem
+
+# Update and RIB dump intervals (seconds) of each project
+RIPE_INTERVALS = (300, 8 * 3600)
+ROUTEVIEWS_INTERVALS = (900, 2 * 3600)
+
+# Collector peers: (ASN, address)
+PEERS = [
+    (2497, "202.249.2.169"),
+    (7500, "202.249.2.83"),
+    (25152, "202.249.2.86"),
+    (3356, "4.69.184.193"),
+]
+ORIGINS = [13335, 15169, 16509, 27653, 64512, 174, 2914, 6939]
+
+
+# MRT encoding (RFC 6396)
+
+
+def _mrt(ts: int, mrt_type: int, subtype: int, body: bytes) -> bytes:
+    return struct.pack("!IHHI", ts, mrt_type, subtype, len(body)) + body
+
+
+def _nlri(prefix: str) -> bytes:
+    network = ipaddress.ip_network(prefix)
+    return bytes([network.prefixlen]) + network.network_address.packed[
+        : (network.prefixlen + 7) // 8
+    ]
+
+
+def _attribute(flags: int, code: int, value: bytes) -> bytes:
+    if len(value) > 255:
+        return struct.pack("!BBH", flags | 0x10, code, len(value)) + value
+    return struct.pack("!BBB", flags, code, len(value)) + value
+
+
+def _attributes(as_path: tuple[int, ...], next_hop: str, communities) -> bytes:
+    segment = struct.pack("!BB", 2, len(as_path)) + b"".join(
+        struct.pack("!I", asn) for asn in as_path
+    )
+    out = _attribute(0x40, 1, b"\x00")  # ORIGIN IGP
+    out += _attribute(0x40, 2, segment)
+    out += _attribute(0x40, 3, ipaddress.ip_address(next_hop).packed)
+    if communities:
+        out += _attribute(
+            0xC0, 8, b"".join(struct.pack("!HH", a, b) for a, b in communities)
+        )
+    return out
+
+
+def _update_record(
+    ts: int,
+    peer: tuple[int, str],
+    announced: list[str],
+    withdrawn: list[str],
+    attributes: bytes,
+) -> bytes:
+    """BGP4MP_MESSAGE_AS4 record holding an UPDATE"""
+    withdrawn_routes = b"".join(map(_nlri, withdrawn))
+    message = (
+        struct.pack("!H", len(withdrawn_routes))
+        + withdrawn_routes
+        + struct.pack("!H", len(attributes))
+        + attributes
+        + b"".join(map(_nlri, announced))
+    )
+    bgp = b"\xff" * 16 + struct.pack("!HB", 19 + len(message), 2) + message
+    peer_asn, peer_address = peer
+    header = struct.pack("!IIHH", peer_asn, 65000, 0, 1)
+    header += ipaddress.ip_address(peer_address).packed
+    header += ipaddress.ip_address("10.255.255.1").packed
+    return _mrt(ts, 16, 4, header + bgp)
+
+
+def _random_prefix(rng: random.Random) -> str:
+    return f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.0/24"
+
+
+def _random_route(rng: random.Random, peer: tuple[int, str]) -> bytes:
+    as_path = (peer[0], *rng.sample(ORIGINS, rng.randint(1, 3)))
+    return _attributes(as_path, peer[1], [(peer[0], rng.randint(1, 500))])
+
+
+def make_updates(ts_start: int, ts_end: int, n_records: int, seed: int) -> bytes:
+    """Update dump of `n_records` UPDATE messages evenly spread over [ts_start, ts_end)"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(n_records):
+        ts = ts_start + (i * (ts_end - ts_start)) // n_records
+        peer = PEERS[i % len(PEERS)]
+        prefixes = [_random_prefix(rng) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.2:
+            records.append(_update_record(ts, peer, [], prefixes, b""))
+        else:
+            records.append(
+                _update_record(ts, peer, prefixes, [], _random_route(rng, peer))
+            )
+    return b"".join(records)
+
+
+def make_rib(ts: int, n_prefixes: int, seed: int) -> bytes:
+    """TABLE_DUMP_V2 RIB dump of `n_prefixes` prefixes, each seen by every peer"""
+    rng = random.Random(seed)
+    peers = b"".join(
+        b"\x02"  # AS4, IPv4 peer
+        + ipaddress.ip_address(address).packed
+        + ipaddress.ip_address(address).packed
+        + struct.pack("!I", asn)
+        for asn, address in PEERS
+    )
+    index = ipaddress.ip_address("10.0.0.1").packed + struct.pack("!HH", 0, len(PEERS))
+    records = [_mrt(ts, 13, 1, index + peers)]
+    prefixes = sorted(
+        {_random_prefix(rng) for _ in range(n_prefixes)}, key=ipaddress.ip_network
+    )
+    for sequence, prefix in enumerate(prefixes):
+        entries = b""
+        for peer_index, peer in enumerate(PEERS):
+            attributes = _random_route(rng, peer)
+            entries += struct.pack("!HIH", peer_index, max(ts - 3600, 0), len(attributes))
+            entries += attributes
+        body = struct.pack("!I", sequence) + _nlri(prefix)
+        records.append(_mrt(ts, 13, 2, body + struct.pack("!H", len(PEERS)) + entries))
+    return b"".join(records)
+
+
+# Archive layout
+
+
+def _iso(ts: int) -> str:
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%S"
+    )
+
+
+def _strftime(ts: int, fmt: str) -> str:
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime(fmt)
+
+
+class LocalArchive:
+    """Synthetic RouteViews/RIS archive rooted at `root`.
+
+    Args:
+        root: Directory holding the generated MRT files.
+        updates_per_file: UPDATE messages per update dump.
+        prefixes_per_rib: Prefixes per RIB dump (each seen by every peer).
+    """
+
+    def __init__(self, root: str, updates_per_file: int = 1000, prefixes_per_rib: int = 5000):
+        self.root = root
+        self.updates_per_file = updates_per_file
+        self.prefixes_per_rib = prefixes_per_rib
+        self.base_url: str | None = None
+        self._servers: list[http.server.ThreadingHTTPServer] = []
+
+    @property
+    def _scale_dir(self) -> str:
+        # Files of different sizes don't share paths
+        return f"u{self.updates_per_file}-r{self.prefixes_per_rib}"
+
+    def files(
+        self, collector: str, data_type: str, ts_start: int, ts_end: int
+    ) -> list[tuple[int, int, str]]:
+        """Dumps of `collector` overlapping [ts_start, ts_end] as (start, end, relative path)"""
+        if collector.startswith("rrc"):
+            update_interval, rib_interval = RIPE_INTERVALS
+            names = ("updates.%Y%m%d.%H%M.gz", "bview.%Y%m%d.%H%M.gz")
+        else:
+            update_interval, rib_interval = ROUTEVIEWS_INTERVALS
+            names = ("updates.%Y%m%d.%H%M.bz2", "rib.%Y%m%d.%H%M.bz2")
+        if data_type == "update":
+            interval, name, duration = update_interval, names[0], update_interval
+        else:
+            interval, name, duration = rib_interval, names[1], 0
+        files = []
+        for start in range(ts_start - ts_start % interval, ts_end + 1, interval):
+            if start + duration >= ts_start:
+                path = f"{self._scale_dir}/{collector}/{data_type}/{_strftime(start, name)}"
+                files.append((start, start + duration, path))
+        return files
+
+    def ensure(self, collectors: list[str], data_types: list[str], ts_start: int, ts_end: int):
+        """Generate the missing files of a stream"""
+        for collector in collectors:
+            for data_type in data_types:
+                for start, end, path in self.files(collector, data_type, ts_start, ts_end):
+                    filepath = os.path.join(self.root, path)
+                    if os.path.exists(filepath):
+                        continue
+                    seed = zlib.crc32(path.encode())
+                    if data_type == "update":
+                        data = make_updates(start, end, self.updates_per_file, seed)
+                    else:
+                        data = make_rib(start, self.prefixes_per_rib, seed)
+                    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+                    compress = gzip.compress if path.endswith(".gz") else bz2.compress
+                    # Atomic: concurrent benchmarks may share the archive
+                    with open(f"{filepath}.{os.getpid()}.tmp", "wb") as f:
+                        f.write(compress(data))
+                    os.rename(f"{filepath}.{os.getpid()}.tmp", filepath)
+
+    def serve(self, handler: type | None = None) -> http.server.ThreadingHTTPServer:
+        """Serve the archive over HTTP on a free local port, in a daemon thread.
+
+        `handler` is an `ArchiveHandler` subclass, e.g. to inject server faults.
+        The archive's URLs point to the last server started; `shutdown` stops
+        all of them. The parsers must run in another process: the pybgpkit
+        parser holds the GIL.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        handler = functools.partial(handler or ArchiveHandler, directory=self.root)
+        httpd = _Server(("127.0.0.1", 0), handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        self._servers.append(httpd)
+        self.base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+        return httpd
+
+    def shutdown(self):
+        """Stop the servers started by `serve`"""
+        while self._servers:
+            self._servers.pop().shutdown()
+
+    def __getstate__(self):
+        # Sent to benchmark processes: the servers stay in this one
+        return {**self.__dict__, "_servers": []}
+
+
+class ArchiveHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves the archive files, with persistent connections and byte ranges, without logs"""
+
+    # Persistent connections, like the archives
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_head(self):
+        # Single byte ranges ("bytes=start-[end]"), like the archives
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match is None:
+            return super().send_head()
+        path = self.translate_path(self.path)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.send_error(404)
+            return None
+        start = int(match[1])
+        end = min(int(match[2]) if match[2] else len(data) - 1, len(data) - 1)
+        if start > end:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(data)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        self.send_response(206)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        return io.BytesIO(data[start : end + 1])
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class LocalBroker:
+    """`bgpkit.Broker` stand-in listing the files of a `LocalArchive`"""
+
+    def __init__(self, archive: LocalArchive):
+        self.archive = archive
+        self.calls = 0
+
+    def query(self, ts_start, ts_end, collector_id, data_type, **kwargs) -> list[BrokerItem]:
+        self.calls += 1
+        items = []
+        for collector in collector_id.split(","):
+            for start, end, path in self.archive.files(
+                collector, data_type, int(ts_start), int(ts_end)
+            ):
+                size = os.path.getsize(os.path.join(self.archive.root, path))
+                items.append(
+                    BrokerItem(
+                        _iso(start),
+                        _iso(end),
+                        collector,
+                        "updates" if data_type == "update" else "rib",
+                        f"{self.archive.base_url}/{path}",
+                        size,
+                        size,
+                    )
+                )
+        return items
@@ -5,6 +5,9 @@ from .bgpstreamconfig import (
 )
 from .bgpstream import BGPStream
 from .bgpelement import BGPElement
+from .stats import StreamStats
+from .multiplex import StreamMultiplexer
+from .ribstate import RibSnapshot, RibState
 
 __all__ = [
     "BGPStreamConfig",
@@ -12,4 +15,8 @@ __all__ = [
     "BGPStream",
     "BGPElement",
     "LiveStreamConfig",
+    "StreamStats",
+    "StreamMultiplexer",
+    "RibState",
+    "RibSnapshot",
 ]
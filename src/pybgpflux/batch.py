@@ -0,0 +1,181 @@
+"""Columnar batches of BGP elements (see `BGPStream.iter_batches`)."""
+
+from array import array
+from operator import itemgetter
+from typing import Iterator, Iterable
+
+from pybgpflux.bgpelement import BGPElement
+
+# Flat element layout shared by the parsers' `iter_rows`:
+# (time, type, collector, peer_asn, peer_address, prefix, next_hop, as_path, communities)
+# communities is the space-separated string ("" if none), other missing fields are None
+ElementRow = tuple[float, str, str, int, str, str | None, str | None, str | None, str]
+
+# array typecode holding an unsigned 32-bit int on this platform
+UINT32 = "I" if array("I").itemsize == 4 else "L"
+
+# Element types, indexed by their code in `ElementBatch.type`: RIB entry,
+# announcement, withdrawal and peer state (pybgpstream elements only)
+TYPES = ("R", "A", "W", "S")
+TYPE_CODES = {t: code for code, t in enumerate(TYPES)}
+
+
+def element_to_row(elem) -> ElementRow:
+    """Flatten a `BGPElement` (or a pybgpstream element) into an `ElementRow`."""
+    if type(elem) is BGPElement:
+        # Flat attributes: don't build the fields dict
+        communities = elem.communities
+        return (
+            elem.time,
+            elem.type,
+            elem.collector,
+            elem.peer_asn,
+            elem.peer_address,
+            elem.prefix,
+            elem.next_hop,
+            elem.as_path,
+            " ".join(communities) if communities else "",
+        )
+    fields = elem.fields
+    communities = fields.get("communities")
+    return (
+        elem.time,
+        elem.type,
+        elem.collector,
+        elem.peer_asn,
+        elem.peer_address,
+        fields.get("prefix"),
+        fields.get("next-hop"),
+        fields.get("as-path"),
+        " ".join(communities) if communities else "",
+    )
+
+
+def row_to_element(row: ElementRow) -> BGPElement:
+    """Build a `BGPElement` back from an `ElementRow`."""
+    time, type, collector, peer_asn, peer_address, prefix, next_hop, as_path, comm = row
+    return BGPElement(
+        time,
+        type,
+        collector,
+        peer_asn,
+        peer_address,
+        None,
+        prefix,
+        next_hop,
+        as_path,
+        comm.split() if comm else None,
+    )
+
+
+class DictionaryColumn:
+    """Dictionary-encoded column: `codes[i]` indexes `values`.
+
+    Attributes:
+        codes (array): uint32 codes, one per element.
+        values (list): Distinct values, in order of first appearance.
+    """
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self, data: Iterable):
+        data = list(data)
+        self.values = list(dict.fromkeys(data))
+        index = {value: code for code, value in enumerate(self.values)}
+        self.codes = array(UINT32, map(index.__getitem__, data))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i: int):
+        return self.values[self.codes[i]]
+
+    def decode(self) -> list:
+        """Materialize the column as a list of values."""
+        return list(map(self.values.__getitem__, self.codes))
+
+
+class ElementBatch:
+    """A batch of BGP elements stored column by column.
+
+    Numeric columns are `array.array` (zero-copy with `numpy.frombuffer` or
+    `memoryview`), string columns are dictionary-encoded per batch. Elements
+    of a type not in `TYPES` raise a ValueError.
+
+    Attributes:
+        time (array): float64 timestamps.
+        type (array): uint8 type codes, index into `TYPES` ("R", "A", "W", "S").
+        peer_asn (array): uint32 peer AS numbers.
+        collector (DictionaryColumn): Collector names.
+        peer_address (DictionaryColumn): Peer IP addresses.
+        prefix (DictionaryColumn): Prefixes.
+        next_hop (DictionaryColumn): Next hops (None for withdrawals).
+        as_path (DictionaryColumn): AS paths (None for withdrawals).
+        communities (DictionaryColumn): Space-separated communities ("" if none).
+    """
+
+    def __init__(self, rows: list[ElementRow]):
+        self.time = array("d", map(itemgetter(0), rows))
+        try:
+            self.type = array("B", map(TYPE_CODES.__getitem__, map(itemgetter(1), rows)))
+        except KeyError as e:
+            raise ValueError(
+                f"Element type {e.args[0]!r} cannot be batched (types: {', '.join(TYPES)})"
+            ) from None
+        self.collector = DictionaryColumn(map(itemgetter(2), rows))
+        self.peer_asn = array(UINT32, map(itemgetter(3), rows))
+        self.peer_address = DictionaryColumn(map(itemgetter(4), rows))
+        self.prefix = DictionaryColumn(map(itemgetter(5), rows))
+        self.next_hop = DictionaryColumn(map(itemgetter(6), rows))
+        self.as_path = DictionaryColumn(map(itemgetter(7), rows))
+        self.communities = DictionaryColumn(map(itemgetter(8), rows))
+
+    def __len__(self):
+        return len(self.time)
+
+    def rows(self) -> Iterator[ElementRow]:
+        """Iterate over the batch as `ElementRow` tuples."""
+        return zip(
+            self.time,
+            map(TYPES.__getitem__, self.type),
+            self.collector.decode(),
+            self.peer_asn,
+            self.peer_address.decode(),
+            self.prefix.decode(),
+            self.next_hop.decode(),
+            self.as_path.decode(),
+            self.communities.decode(),
+        )
+
+    def to_elements(self) -> Iterator[BGPElement]:
+        """Iterate over the batch as `BGPElement`."""
+        return map(row_to_element, self.rows())
+
+    def to_numpy(self) -> dict:
+        """Return the columns as NumPy arrays (numeric columns are zero-copy views).
+
+        Dictionary-encoded columns are returned as two entries: `<name>` with the
+        uint32 codes and `<name>_values` with the object array of distinct values.
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("numpy is not installed. Install with: pip install numpy")
+
+        columns = {
+            "time": np.frombuffer(self.time, dtype=np.float64),
+            "type": np.frombuffer(self.type, dtype=np.uint8),
+            "peer_asn": np.frombuffer(self.peer_asn, dtype=np.uint32),
+        }
+        for name in (
+            "collector",
+            "peer_address",
+            "prefix",
+            "next_hop",
+            "as_path",
+            "communities",
+        ):
+            column: DictionaryColumn = getattr(self, name)
+            columns[name] = np.frombuffer(column.codes, dtype=np.uint32)
+            columns[f"{name}_values"] = np.array(column.values, dtype=object)
+        return columns
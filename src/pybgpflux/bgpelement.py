@@ -1,4 +1,4 @@
-from typing import NamedTuple, TypedDict, Literal
+from typing import TypedDict, Literal
 
 
 class ElementFields(TypedDict):
@@ -11,15 +11,81 @@ class ElementFields(TypedDict):
     }
 
 
-class BGPElement(NamedTuple):
-    """Compatible with pybgpstream.BGPElem"""
+# Flat fields of an element, which parsers can skip (see `BGPStream(fields=...)`)
+ElementField = Literal["prefix", "next_hop", "as_path", "communities"]
+ELEMENT_FIELDS: tuple[ElementField, ...] = ("prefix", "next_hop", "as_path", "communities")
 
-    time: float  # time first for sorting tuples convention
-    type: Literal["R", "A", "W"]
-    collector: str
-    peer_asn: int
-    peer_address: str
-    fields: ElementFields
+
+class BGPElement:
+    """Compatible with pybgpstream.BGPElem
+
+    Elements are slotted objects: parsers set the flat attributes (`prefix`,
+    `next_hop`, `as_path`, `communities`) and the pybgpstream-like `fields`
+    dict is only built on first access. Elements built from a `fields` dict
+    (e.g. RIS Live) keep that dict as is.
+
+    For compatibility with the former `NamedTuple`, elements can still be
+    unpacked and indexed as `(time, type, collector, peer_asn, peer_address, fields)`.
+    """
+
+    __slots__ = (
+        "time",
+        "type",
+        "collector",
+        "peer_asn",
+        "peer_address",
+        "prefix",
+        "next_hop",
+        "as_path",
+        "communities",
+        "_fields_dict",
+    )
+
+    # Former NamedTuple fields, in tuple order
+    _fields = ("time", "type", "collector", "peer_asn", "peer_address", "fields")
+
+    def __init__(
+        self,
+        time: float,  # time first for sorting tuples convention
+        type: Literal["R", "A", "W"],
+        collector: str,
+        peer_asn: int,
+        peer_address: str,
+        fields: ElementFields | None = None,
+        prefix: str | None = None,
+        next_hop: str | None = None,
+        as_path: str | None = None,
+        communities: list[str] | None = None,
+    ):
+        self.time = time
+        self.type = type
+        self.collector = collector
+        self.peer_asn = peer_asn
+        self.peer_address = peer_address
+        if fields is None:
+            self.prefix = prefix
+            self.next_hop = next_hop
+            self.as_path = as_path
+            self.communities = communities
+        else:
+            self.prefix = fields.get("prefix")
+            self.next_hop = fields.get("next-hop")
+            self.as_path = fields.get("as-path")
+            self.communities = fields.get("communities")
+        self._fields_dict = fields
+
+    @property
+    def fields(self) -> ElementFields:
+        """pybgpstream-like fields dict, built on first access."""
+        fields = self._fields_dict
+        if fields is None:
+            fields = self._fields_dict = {
+                "next-hop": self.next_hop,
+                "as-path": self.as_path,
+                "communities": self.communities or [],
+                "prefix": self.prefix,
+            }
+        return fields
 
     def __str__(self):
         """Credit to pybgpstream"""
@@ -29,21 +95,25 @@ class BGPElement(NamedTuple):
             self.collector,
             self.peer_asn,
             self.peer_address,
-            self._maybe_field("prefix"),
-            self._maybe_field("next-hop"),
-            self.fields["as-path"]
-            if self.fields.get('as-path')
-            else None,
-            " ".join(self.fields["communities"])
-            if self.fields.get('communities')
-            else None,
+            self.prefix,
+            self.next_hop,
+            self.as_path if self.as_path else None,
+            " ".join(self.communities) if self.communities else None,
             self._maybe_field("old-state"),
             self._maybe_field("new-state"),
         )
 
+    def __repr__(self):
+        return (
+            f"BGPElement(time={self.time!r}, type={self.type!r}, "
+            f"collector={self.collector!r}, peer_asn={self.peer_asn!r}, "
+            f"peer_address={self.peer_address!r}, fields={self.fields!r})"
+        )
+
     def _maybe_field(self, field):
         """Credit to pybgpstream"""
-        return self.fields[field] if field in self.fields else None
+        fields = self._fields_dict
+        return fields[field] if fields and field in fields else None
 
     # Useful for sorting streams
     def __lt__(self, other):
@@ -51,3 +121,61 @@ class BGPElement(NamedTuple):
 
     def __le__(self, other):
         return self.time <= other.time
+
+    def __eq__(self, other):
+        if not isinstance(other, BGPElement):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    __hash__ = None  # like the former NamedTuple holding a dict
+
+    def __reduce__(self):
+        # Flat arguments: cheaper to pickle than the slots state (see ParsingPool)
+        return (
+            BGPElement,
+            (
+                self.time,
+                self.type,
+                self.collector,
+                self.peer_asn,
+                self.peer_address,
+                self._fields_dict,
+                self.prefix,
+                self.next_hop,
+                self.as_path,
+                self.communities,
+            ),
+        )
+
+    # NamedTuple compatibility
+    def __iter__(self):
+        yield self.time
+        yield self.type
+        yield self.collector
+        yield self.peer_asn
+        yield self.peer_address
+        yield self.fields
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def _asdict(self) -> dict:
+        return dict(zip(self._fields, self))
+
+    def _replace(self, **changes) -> "BGPElement":
+        kwargs = {name: getattr(self, name) for name in self._fields[:-1]}
+        if "fields" not in changes:
+            flat = {name: changes.pop(name) for name in ELEMENT_FIELDS if name in changes}
+            if self._fields_dict is None:
+                kwargs.update({name: getattr(self, name) for name in ELEMENT_FIELDS}, **flat)
+            else:
+                # Keep the other keys of the dict (e.g. RIS Live states)
+                kwargs["fields"] = {
+                    **self._fields_dict,
+                    **{name.replace("_", "-"): value for name, value in flat.items()},
+                }
+        kwargs.update(changes)
+        return BGPElement(**kwargs)
@@ -1,9 +1,20 @@
+import asyncio
+from contextlib import aclosing
 import bgpkit
 from pybgpflux.bgpstreamconfig import FilterOptions
-from pybgpflux.bgpelement import BGPElement
-from typing import Iterator, Protocol
-import re
-import ipaddress
+from pybgpflux.bgpelement import ELEMENT_FIELDS, BGPElement, ElementField
+from pybgpflux.batch import ElementRow, element_to_row
+from pybgpflux.filtering import (
+    PREFIX_MODES,
+    community_regex,
+    compile_filter,
+    filter_values,
+    origin_regex,
+    required_fields,
+    residual_filter,
+)
+from itertools import islice, takewhile
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, Protocol
 import subprocess as sp
 from pybgpflux.utils import dt_from_filepath
 import logging
@@ -14,6 +25,138 @@ except ImportError:
     pass
 
 
+def projected_fields(
+    fields: Iterable[ElementField] | None, residual: FilterOptions | None
+) -> frozenset[str] | None:
+    """Element fields a parser builds: `fields`, plus the ones read by its Python-side filters.
+
+    Returns:
+        frozenset[str] | None: None if every field is built (no projection).
+
+    Raises:
+        ValueError: If `fields` has unknown field names.
+    """
+    if fields is None:
+        return None
+    fields = set(fields)
+    unknown = fields.difference(ELEMENT_FIELDS)
+    if unknown:
+        raise ValueError(
+            f"Unknown element fields: {sorted(unknown)} (expected some of {ELEMENT_FIELDS})"
+        )
+    fields |= required_fields(residual)
+    if fields.issuperset(ELEMENT_FIELDS):
+        return None
+    return frozenset(fields)
+
+
+# Size of the reads from the stdout of subprocess parsers
+PIPE_BLOCK_SIZE = 1 << 20
+
+# Number of elements parsed at a time by parsers iterated asynchronously in a thread (see abatches)
+ASYNC_BATCH_SIZE = 4096
+
+
+def split_lines(tail: bytes, block: bytes) -> tuple[list[str], bytes]:
+    """Decode the complete lines of `tail + block` (without line endings).
+
+    Returns:
+        tuple[list[str], bytes]: The lines, and the bytes after the last line ending.
+    """
+    end = block.rfind(b"\n") + 1
+    if not end:
+        # No complete line in this block
+        return [], tail + block
+    lines = (tail + block[:end] if tail else block[:end]).decode().split("\n")
+    lines.pop()  # empty string after the last line ending
+    return lines, block[end:]
+
+
+def read_lines(pipe: BinaryIO, block_size: int = PIPE_BLOCK_SIZE) -> Iterator[str]:
+    """Lines of a binary `pipe` (without line endings), read and decoded in large blocks.
+
+    Cheaper than iterating a line-buffered text pipe: one read, decode and
+    split per block instead of per line.
+    """
+    read = pipe.read
+    tail = b""
+    while True:
+        block = read(block_size)
+        if not block:
+            break
+        lines, tail = split_lines(tail, block)
+        yield from lines
+    if tail:
+        yield tail.decode()
+
+
+def iter_subprocess_lines(parser, cmd: list[str]) -> Iterator[str]:
+    """Run `cmd` as `parser.parser` and yield its output lines (see `read_lines`)."""
+    # Unbuffered binary pipe: read_lines does the buffering, in large blocks
+    parser.parser = sp.Popen(cmd, stdout=sp.PIPE, bufsize=0)
+
+    try:
+        yield from read_lines(parser.parser.stdout)
+    finally:
+        # Cleanup happens whether exhausted or abandoned
+        parser.parser.stdout.close()
+        parser.parser.terminate()
+        parser.parser.wait()  # Reap the zombie process
+
+
+async def aiter_subprocess_lines(
+    parser, cmd: list[str], block_size: int = PIPE_BLOCK_SIZE
+) -> AsyncIterator[list[str]]:
+    """Run `cmd` as `parser.parser` with asyncio, and yield its output lines, a block at a time."""
+    parser.parser = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, limit=block_size
+    )
+    read = parser.parser.stdout.read
+    tail = b""
+    try:
+        while block := await read(block_size):
+            lines, tail = split_lines(tail, block)
+            if lines:
+                yield lines
+        if tail:
+            yield [tail.decode()]
+    finally:
+        # Cleanup happens whether exhausted or abandoned
+        if parser.parser.returncode is None:
+            try:
+                parser.parser.terminate()
+            except ProcessLookupError:
+                pass
+        await parser.parser.wait()  # Reap the zombie process
+
+
+async def abatches(
+    parser: Iterable, batch_size: int = ASYNC_BATCH_SIZE
+) -> AsyncIterator[list]:
+    """Yield the elements of `parser` in lists, without blocking the event loop.
+
+    Subprocess parsers read their pipe with asyncio (their `_abatches`). Other
+    parsers, or any iterable, are iterated in the default executor of the loop,
+    `batch_size` elements at a time.
+    """
+    native = getattr(parser, "_abatches", None)
+    if native is not None:
+        async with aclosing(native()) as batches:
+            async for batch in batches:
+                if batch:
+                    yield batch
+        return
+    iterator = iter(parser)
+    try:
+        while batch := await asyncio.to_thread(list, islice(iterator, batch_size)):
+            yield batch
+    finally:
+        # Run the cleanup of a generator left early (e.g. temporary files) now
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await asyncio.to_thread(close)
+
+
 class BGPParser(Protocol):
     filepath: str
     is_rib: bool
@@ -22,6 +165,20 @@ class BGPParser(Protocol):
 
     def __iter__(self) -> Iterator[BGPElement]: ...
 
+    def iter_rows(self) -> Iterator[ElementRow]:
+        """Iterate over flat `ElementRow` tuples (used by `BGPStream.iter_batches`).
+
+        Parsers override this to build rows without intermediate `BGPElement`.
+        """
+        return map(element_to_row, self)
+
+    async def __aiter__(self) -> AsyncIterator[BGPElement]:
+        """Iterate asynchronously (see `abatches`): `async for elem in parser`."""
+        async with aclosing(abatches(self)) as batches:
+            async for batch in batches:
+                for elem in batch:
+                    yield elem
+
 
 class PyBGPKITParser(BGPParser):
     """Use BGPKIT Python bindings (default parser). Slower than other alternatives but easier to ship (no system dependencies)."""
@@ -32,46 +189,111 @@ class PyBGPKITParser(BGPParser):
         is_rib: bool,
         collector: str,
         filters: FilterOptions = FilterOptions(),
+        fields: Iterable[ElementField] | None = None,
     ):
         self.filepath = filepath
         self.parser = None  # placeholder for lazy instantiation
         self.is_rib = is_rib
         self.collector = collector
-        self.filters: dict = filters.model_dump(exclude_unset=True, exclude_none=True)
-        # cast int ipv to pybgpkit ipv4 or ipv6 string
-        if "ip_version" in self.filters:
-            ipv_int = self.filters["ip_version"]
-            if ipv_int:
-                self.filters["ip_version"] = f"ipv{ipv_int}"
-        if self.filters.get("peer_asn"):
-            self.filters["peer_asn"] = str(self.filters["peer_asn"])
-        if self.filters.get("origin_asn"):
-            self.filters["origin_asn"] = str(self.filters["origin_asn"])
-        if self.filters.get("update_type"):
-            val = self.filters.pop("update_type")
-            self.filters["type"] = val
-        if self.filters.get("peer_ips"):
-            self.filters["peer_ips"] = ", ".join(self.filters["peer_ips"])
+        # Filters pybgpkit applies natively, the rest is filtered on the Python side
+        self.filters, residual = pybgpkit_filters(filters)
+        self._filter_func = compile_filter(residual)
+        self.fields = projected_fields(fields, residual)
 
     def _convert(self, element) -> BGPElement:
+        # Flat fields: the fields dict is only built on access
         return BGPElement(
-            type="R" if self.is_rib else element.elem_type,
-            collector=self.collector,
-            time=element.timestamp,
-            peer_asn=element.peer_asn,
-            peer_address=element.peer_ip,
-            fields={
-                "next-hop": element.next_hop,
-                "as-path": element.as_path,
-                "communities": [] if not element.communities else element.communities,
-                "prefix": element.prefix,
-            },
+            element.timestamp,
+            "R" if self.is_rib else element.elem_type,
+            self.collector,
+            element.peer_asn,
+            element.peer_ip,
+            None,
+            element.prefix,
+            element.next_hop,
+            element.as_path,
+            element.communities,
         )
 
+    def _projected_converter(self, rows: bool = False):
+        """Convert pybgpkit elements (into rows with `rows`), only reading `self.fields`.
+
+        Each attribute read copies a value out of pybgpkit: skipping the
+        communities saves building their list.
+        """
+        fields = self.fields
+        want_prefix = "prefix" in fields
+        want_next_hop = "next_hop" in fields
+        want_as_path = "as_path" in fields
+        want_communities = "communities" in fields
+        elem_type = "R" if self.is_rib else None
+        collector = self.collector
+
+        def convert(elem):
+            communities = elem.communities if want_communities else None
+            if rows:
+                return (
+                    elem.timestamp,
+                    elem_type or elem.elem_type,
+                    collector,
+                    elem.peer_asn,
+                    elem.peer_ip,
+                    elem.prefix if want_prefix else None,
+                    elem.next_hop if want_next_hop else None,
+                    elem.as_path if want_as_path else None,
+                    " ".join(communities) if communities else "",
+                )
+            return BGPElement(
+                elem.timestamp,
+                elem_type or elem.elem_type,
+                collector,
+                elem.peer_asn,
+                elem.peer_ip,
+                None,
+                elem.prefix if want_prefix else None,
+                elem.next_hop if want_next_hop else None,
+                elem.as_path if want_as_path else None,
+                communities,
+            )
+
+        return convert
+
     def __iter__(self) -> Iterator[BGPElement]:
         parser = bgpkit.Parser(self.filepath, filters=self.filters)
+        if self.fields is None:
+            elements = map(self._convert, parser)
+        else:
+            elements = map(self._projected_converter(), parser)
+        if self._filter_func:
+            return filter(self._filter_func, elements)
+        return elements
+
+    def iter_rows(self) -> Iterator[ElementRow]:
+        if self._filter_func:
+            # Python-side filters work on BGPElement
+            return super().iter_rows()
+        if self.fields is not None:
+            parser = bgpkit.Parser(self.filepath, filters=self.filters)
+            return map(self._projected_converter(rows=True), parser)
+        return self._iter_rows()
+
+    def _iter_rows(self) -> Iterator[ElementRow]:
+        parser = bgpkit.Parser(self.filepath, filters=self.filters)
+        elem_type = "R" if self.is_rib else None
+        collector = self.collector
         for elem in parser:
-            yield self._convert(elem)
+            communities = elem.communities
+            yield (
+                elem.timestamp,
+                elem_type or elem.elem_type,
+                collector,
+                elem.peer_asn,
+                elem.peer_ip,
+                elem.prefix,
+                elem.next_hop,
+                elem.as_path,
+                " ".join(communities) if communities else "",
+            )
 
 
 class BGPKITParser(BGPParser):
@@ -83,44 +305,119 @@ class BGPKITParser(BGPParser):
         is_rib: bool,
         collector: str,
         filters: FilterOptions | str | None = None,
+        fields: Iterable[ElementField] | None = None,
     ):
         self.filepath = filepath
         self.parser = None  # placeholder for lazy instantiation
         self.is_rib = is_rib
         self.collector = collector
         self.filters = filters
+        # Filters the CLI cannot apply (e.g. sets of prefixes) are applied on the Python side
+        residual = bgpkit_cli_args(filters)[1]
+        self._filter_func = compile_filter(residual)
+        self.fields = projected_fields(fields, residual)
 
         # Set timestamp for the same behavior as bgpdump default (timestamp match rib time, not last change)
         self.time = int(dt_from_filepath(self.filepath).timestamp())
 
-    def __iter__(self):
+    def _iter_lines(self) -> Iterator[str]:
+        return iter_subprocess_lines(self, build_bgpkit_cmd(self.filepath, self.filters))
+
+    async def _abatches(self) -> AsyncIterator[list[BGPElement]]:
+        convert = self._convert if self.fields is None else self._projected_converter()
         cmd = build_bgpkit_cmd(self.filepath, self.filters)
-        self.parser = sp.Popen(cmd, stdout=sp.PIPE, text=True, bufsize=1)
+        async with aclosing(aiter_subprocess_lines(self, cmd)) as blocks:
+            async for lines in blocks:
+                elements = map(convert, lines)
+                yield list(filter(self._filter_func, elements) if self._filter_func else elements)
 
-        stream = (self._convert(line) for line in self.parser.stdout)
+    def __iter__(self):
+        if self.fields is None:
+            elements = map(self._convert, self._iter_lines())
+        else:
+            elements = map(self._projected_converter(), self._iter_lines())
+        if self._filter_func:
+            return filter(self._filter_func, elements)
+        return elements
+
+    def iter_rows(self) -> Iterator[ElementRow]:
+        if self._filter_func:
+            # Python-side filters work on BGPElement
+            return super().iter_rows()
+        if self.fields is not None:
+            return map(self._projected_converter(rows=True), self._iter_lines())
+        return map(self._convert_row, self._iter_lines())
+
+    def _projected_converter(self, rows: bool = False):
+        """Convert lines (into rows with `rows`), only extracting `self.fields`.
+
+        Lines are only split up to the last requested field: without communities,
+        the longest part of RIB lines is never split.
+        """
+        fields = self.fields
+        # Type|Time|PeerIP|PeerAS|Prefix|ASPath|Origin|NextHop|...|Communities|...
+        want_prefix = "prefix" in fields
+        want_as_path = "as_path" in fields
+        want_next_hop = "next_hop" in fields
+        want_communities = "communities" in fields
+        indices = {"prefix": 4, "as_path": 5, "next_hop": 7, "communities": 10}
+        maxsplit = max([3] + [indices[field] for field in fields]) + 1
+        time = self.time  # force RIB filename timestamp, see _convert
+        collector = self.collector
+        announce_type = "R" if self.is_rib else "A"
+
+        def convert(line: str):
+            element = line.split("|", maxsplit)
+            prefix = element[4] if want_prefix else None
+            if element[0] == "W":
+                peer_asn, peer_ip = int(element[3]), element[2]
+                if rows:
+                    return (time, "W", collector, peer_asn, peer_ip, prefix, None, None, "")
+                return BGPElement(time, "W", collector, peer_asn, peer_ip, None, prefix)
+            rec_comm = element[10] if want_communities else ""
+            if rows:
+                return (
+                    time,
+                    announce_type,
+                    collector,
+                    int(element[3]),
+                    element[2],
+                    prefix,
+                    element[7] if want_next_hop else None,
+                    element[5] if want_as_path else None,
+                    rec_comm,
+                )
+            return BGPElement(
+                time,
+                announce_type,
+                collector,
+                int(element[3]),
+                element[2],
+                None,
+                prefix,
+                element[7] if want_next_hop else None,
+                element[5] if want_as_path else None,
+                rec_comm.split() if rec_comm else None,
+            )
 
-        try:
-            yield from stream
-        finally:
-            # Cleanup happens whether exhausted or abandoned
-            self.parser.stdout.close()
-            self.parser.terminate()
-            self.parser.wait()  # Reap the zombie process
+        return convert
 
     def _convert(self, element: str):
-        element = element.rstrip().split("|")
+        # No line ending (see read_lines), fields after the communities are left unsplit
+        element = element.split("|", 11)
         rec_type = element[0]
 
         # 1. Handle Withdrawals (W)
         # Structure: Type|Time|PeerIP|PeerAS|Prefix
         if rec_type == "W":
             return BGPElement(
-                time=self.time,  # force RIB filename timestamp instead of last changed
-                type="W",
-                collector=self.collector,
-                peer_asn=int(element[3]),
-                peer_address=element[2],
-                fields={"prefix": element[4]},
+                self.time,  # force RIB filename timestamp instead of last changed
+                "W",
+                self.collector,
+                int(element[3]),
+                element[2],
+                None,
+                element[4],
             )
 
         # 2. Handle Announcements (A)
@@ -139,13 +436,39 @@ class BGPKITParser(BGPParser):
             # float(element[1]),
             int(element[3]),
             element[2],
-            {
-                "prefix": element[4],
-                "as-path": element[5],
-                "next-hop": element[7],
-                # Fast check for empty communities
-                "communities": rec_comm.split() if rec_comm else [],
-            },
+            None,
+            element[4],
+            element[7],
+            element[5],
+            # Fast check for empty communities
+            rec_comm.split() if rec_comm else None,
+        )
+
+    def _convert_row(self, element: str) -> ElementRow:
+        # Same field mapping as _convert, without building the fields dict
+        element = element.split("|", 11)
+        if element[0] == "W":
+            return (
+                self.time,
+                "W",
+                self.collector,
+                int(element[3]),
+                element[2],
+                element[4],
+                None,
+                None,
+                "",
+            )
+        return (
+            self.time,
+            "R" if self.is_rib else element[0],
+            self.collector,
+            int(element[3]),
+            element[2],
+            element[4],
+            element[7],
+            element[5],
+            element[10],
         )
 
 
@@ -161,6 +484,7 @@ class PyBGPStreamParser(BGPParser):
         *args,
         **kwargs,
     ):
+        # pybgpstream elements are yielded as is: `fields` projections are ignored
         self.filepath = filepath
         self.collector = collector
         self.filters = filters
@@ -185,7 +509,7 @@ class PyBGPStreamParser(BGPParser):
             filter=bgpstream_filter if bgpstream_filter else None,
         )
         stream.set_data_interface_option("singlefile", "rib-file", self.filepath)
-        peer_ips = set(self.filters.peer_ips)
+        peer_ips = set(filter_values(self.filters)["peer_ip"])
 
         for elem in stream:
             if elem.peer_address not in peer_ips:
@@ -194,46 +518,121 @@ class PyBGPStreamParser(BGPParser):
             yield elem
 
     def __iter__(self):
-        if not self.filters.peer_ip and not self.filters.peer_ips:
+        if "peer_ip" not in filter_values(self.filters):
             return self._iter_normal()
         else:
-            if self.filters.peer_ip:
-                self.filters.peer_ips = [self.filters.peer_ip]
             return self._iter_python_filter()
 
 
 class BGPdumpParser(BGPParser):
-    """Run bgpdump as a subprocess. I might have over-engineered the filtering."""
+    """Run bgpdump as a subprocess, filtering on the Python side (see `pybgpflux.filtering`)."""
 
-    def __init__(self, filepath, is_rib, collector, filters):
+    def __init__(self, filepath, is_rib, collector, filters, fields=None):
         self.filepath = filepath
         self.collector = collector
 
-        self._init_filters(filters)
+        # Python-side filters (bgpdump has none)
+        self._filter_func = compile_filter(filters)
+        self.fields = projected_fields(fields, filters)
+
+    def _iter_lines(self) -> Iterator[str]:
+        return iter_subprocess_lines(self, ["bgpdump", "-m", "-v", self.filepath])
+
+    async def _abatches(self) -> AsyncIterator[list[BGPElement]]:
+        convert = self._convert if self.fields is None else self._projected_converter()
+        check = self._filter_func
+        cmd = ["bgpdump", "-m", "-v", self.filepath]
+        async with aclosing(aiter_subprocess_lines(self, cmd)) as blocks:
+            async for lines in blocks:
+                # Filter STATE messages
+                yield [
+                    e
+                    for e in map(convert, lines)
+                    if e is not None and (check is None or check(e))
+                ]
 
     def __iter__(self):
-        self.parser = sp.Popen(
-            ["bgpdump", "-m", "-v", self.filepath], stdout=sp.PIPE, text=True, bufsize=1
-        )
+        if self.fields is None:
+            raw_stream = map(self._convert, self._iter_lines())
+        else:
+            raw_stream = map(self._projected_converter(), self._iter_lines())
+        # Filter STATE message
+        clean_stream = (e for e in raw_stream if e is not None)
+
+        if self._filter_func:
+            return filter(self._filter_func, clean_stream)
+        return clean_stream
+
+    def iter_rows(self) -> Iterator[ElementRow]:
+        if self._filter_func:
+            # Python-side filters work on BGPElement
+            return super().iter_rows()
+        if self.fields is None:
+            rows = map(self._convert_row, self._iter_lines())
+        else:
+            rows = map(self._projected_converter(rows=True), self._iter_lines())
+        return (r for r in rows if r is not None)
+
+    def _projected_converter(self, rows: bool = False):
+        """Convert lines (into rows with `rows`), only extracting `self.fields`.
+
+        Lines are only split up to the last requested field: without communities,
+        the longest part of RIB lines is never split.
+        """
+        fields = self.fields
+        # Proto|Time|Type|PeerIP|PeerAS|Prefix|ASPath|Origin|NextHop|LocalPref|MED|Communities|...
+        want_prefix = "prefix" in fields
+        want_as_path = "as_path" in fields
+        want_next_hop = "next_hop" in fields
+        want_communities = "communities" in fields
+        indices = {"prefix": 5, "as_path": 6, "next_hop": 8, "communities": 11}
+        maxsplit = max([4] + [indices[field] for field in fields]) + 1
+        collector = self.collector
+
+        def convert(line: str):
+            element = line.split("|", maxsplit)
+            elem_type = element[2]
+            if elem_type == "STATE":
+                return
+            prefix = element[5] if want_prefix else None
+            if elem_type == "W":
+                time, peer_asn, peer_ip = float(element[1]), int(element[4]), element[3]
+                if rows:
+                    return (time, "W", collector, peer_asn, peer_ip, prefix, None, None, "")
+                return BGPElement(time, "W", collector, peer_asn, peer_ip, None, prefix)
+            elem_type = "R" if elem_type == "B" else "A"
+            rec_comm = element[11] if want_communities else ""
+            if rows:
+                return (
+                    float(element[1]),
+                    elem_type,
+                    collector,
+                    int(element[4]),
+                    element[3],
+                    prefix,
+                    element[8] if want_next_hop else None,
+                    element[6] if want_as_path else None,
+                    rec_comm,
+                )
+            return BGPElement(
+                float(element[1]),
+                elem_type,
+                collector,
+                int(element[4]),
+                element[3],
+                None,
+                prefix,
+                element[8] if want_next_hop else None,
+                element[6] if want_as_path else None,
+                rec_comm.split(" ") if rec_comm else None,
+            )
 
-        try:
-            raw_stream = (self._convert(line) for line in self.parser.stdout)
-            # Filter STATE message
-            clean_stream = (e for e in raw_stream if e is not None)
-
-            if self._filter_func:
-                yield from filter(self._filter_func, clean_stream)
-            else:
-                yield from clean_stream
-        finally:
-            # Cleanup happens whether exhausted or abandoned
-            self.parser.stdout.close()
-            self.parser.terminate()
-            self.parser.wait()  # Reap the zombie process
+        return convert
 
     def _convert(self, element: str):
+        # No line ending (see read_lines), fields after the communities are left unsplit
+        element = element.split("|", 12)
         # Extract type once to avoid repeated list lookups
-        element = element.rstrip().split("|")
         elem_type = element[2]
         if elem_type == "STATE":
             return
@@ -246,7 +645,8 @@ class BGPdumpParser(BGPParser):
                 self.collector,
                 int(element[4]),
                 element[3],
-                {"prefix": element[5]},  # Dict literal is faster than assignment
+                None,
+                element[5],
             )
 
         # 2. Handle RIB (TABLE_DUMP2) and Announcements (A)
@@ -254,134 +654,132 @@ class BGPdumpParser(BGPParser):
         rec_comm = element[11]
 
         # Logic: if TABLE_DUMP2, type is R, else A
-        # Construct fields dict in one shot (BUILD_MAP opcode)
+        # Positional flat fields (the fields dict is built lazily)
         return BGPElement(
             float(element[1]),
             "R" if elem_type == "B" else "A",
             self.collector,
             int(element[4]),
             element[3],
-            {
-                "prefix": element[5],
-                "as-path": element[6],
-                "next-hop": element[8],
-                # Check for empty string before splitting (avoids creating [''])
-                "communities": rec_comm.split(" ") if rec_comm else [],
-            },
+            None,
+            element[5],
+            element[8],
+            element[6],
+            # Check for empty string before splitting (avoids creating [''])
+            rec_comm.split(" ") if rec_comm else None,
         )
 
-    def _init_filters(self, f: FilterOptions):
-        # 1. Pre-process sets for O(1) lookups and compile Regex
-        # self.peer_asns = set([f.peer_asn]) if f.peer_asn else (set(f.peer_ips) if f.peer_ips else None)
-        if not f.model_dump(exclude_unset=True):
-            self._filter_func = None
-
-        self.peer_asn = f.peer_asn
-
-        # Peer IPs (handles both single and list)
-        self.peer_ips = None
-        if f.peer_ip:
-            self.peer_ips = {str(f.peer_ip)}
-        elif f.peer_ips:
-            self.peer_ips = {str(ip) for ip in f.peer_ips}
-
-        self.origin_asn = str(f.origin_asn) if f.origin_asn else None
-        self.update_type = (
-            f.update_type[0].upper() if f.update_type else None
-        )  # 'A' or 'W'
-        self.ip_version = f.ip_version
-
-        # Regex and CIDR objects
-        self.as_path_re = re.compile(f.as_path) if f.as_path else None
-        self.exact_net = ipaddress.ip_network(f.prefix) if f.prefix else None
-        self.sub_net = ipaddress.ip_network(f.prefix_sub) if f.prefix_sub else None
-        self.super_net = (
-            ipaddress.ip_network(f.prefix_super) if f.prefix_super else None
-        )
-        self.ss_net = (
-            ipaddress.ip_network(f.prefix_super_sub) if f.prefix_super_sub else None
+    def _convert_row(self, element: str) -> ElementRow | None:
+        # Same field mapping as _convert, without building the fields dict
+        element = element.split("|", 12)
+        elem_type = element[2]
+        if elem_type == "STATE":
+            return
+        if elem_type == "W":
+            return (
+                float(element[1]),
+                "W",
+                self.collector,
+                int(element[4]),
+                element[3],
+                element[5],
+                None,
+                None,
+                "",
+            )
+        return (
+            float(element[1]),
+            "R" if elem_type == "B" else "A",
+            self.collector,
+            int(element[4]),
+            element[3],
+            element[5],
+            element[8],
+            element[6],
+            element[11],
         )
 
-        # 2. Build the optimized filter function
-        self._filter_func = self._compile_filter()
-
-    def _compile_filter(self):
-        # Localize variables to the closure to avoid 'self' lookups in the loop
-        p_asn = self.peer_asn
-        p_ips = self.peer_ips
-        o_asn = self.origin_asn
-        u_type = self.update_type
-        version = self.ip_version
-        path_re = self.as_path_re
-
-        e_net = self.exact_net
-        sub_n = self.sub_net
-        sup_n = self.super_net
-        ss_n = self.ss_net
-
-        def filter_logic(e: BGPElement) -> bool:
-            # 1. Cheap checks first (Integers and Strings)
-            if p_asn is not None and int(e.peer_asn) != p_asn:
-                return False
-            if p_ips is not None and e.peer_address not in p_ips:
-                return False
-            if u_type is not None and e.type != u_type:
-                return False
-
-            # 2. String processing (Origin ASN and AS Path)
-            # Use .get() or direct access depending on your confidence in 'fields' content
-            as_path = e.fields.get("as-path", "")
-            if o_asn is not None:
-                if not as_path or as_path.rsplit(" ", 1)[-1] != o_asn:
-                    return False
-            if path_re is not None and not path_re.search(as_path):
-                return False
-
-            # 3. CIDR / IP Logic (Expensive)
-            prefix_str = e.fields.get("prefix")
-            if version is not None:
-                # Fast check for IP version without parsing
-                is_v6 = ":" in prefix_str if prefix_str else False
-                if (version == 6 and not is_v6) or (version == 4 and is_v6):
-                    return False
-
-            if e_net or sub_n or sup_n or ss_n:
-                if not prefix_str:
-                    return False
-                net = ipaddress.ip_network(prefix_str)
-                if e_net and net != e_net:
-                    return False
-                if sub_n and not net.subnet_of(sub_n):
-                    return False
-                if sup_n and not net.supernet_of(sup_n):
-                    return False
-                if ss_n and not (net.subnet_of(ss_n) or net.supernet_of(ss_n)):
-                    return False
-
-            return True
-
-        return filter_logic
+
+# Elements of a dump may be this many seconds out of time order (see TimeBoundParser)
+TIME_SLACK = 60
+
+
+class TimeBoundParser(BGPParser):
+    """Parse with `parser_cls` until its elements pass `ts_end`.
+
+    Dumps are written in time order: once an element is more than `TIME_SLACK`
+    seconds after `ts_end`, the rest of the file would only be parsed to be
+    dropped by the time window of the stream. The subprocess parsers are
+    stopped there.
+
+    Bind the first arguments (e.g. `functools.partial`) to use it as a parser class.
+    """
+
+    def __init__(
+        self,
+        parser_cls: type[BGPParser],
+        ts_end: float,
+        filepath,
+        is_rib,
+        collector,
+        filters=None,
+        fields=None,
+    ):
+        self.parser = parser_cls(filepath, is_rib, collector, filters=filters, fields=fields)
+        self.limit = ts_end + TIME_SLACK
+        self.filepath = filepath
+        self.is_rib = is_rib
+        self.collector = collector
+        self.filters = filters
+        if hasattr(self.parser, "_abatches"):
+            # Keep reading subprocess parsers with asyncio (see abatches)
+            self._abatches = self._abatches_native
+
+    def __iter__(self) -> Iterator[BGPElement]:
+        limit = self.limit
+        return takewhile(lambda elem: elem.time <= limit, self.parser)
+
+    def iter_rows(self) -> Iterator[ElementRow]:
+        limit = self.limit
+        return takewhile(lambda row: row[0] <= limit, self.parser.iter_rows())
+
+    async def _abatches_native(self) -> AsyncIterator[list[BGPElement]]:
+        limit = self.limit
+        async with aclosing(self.parser._abatches()) as batches:
+            async for batch in batches:
+                kept = list(takewhile(lambda elem: elem.time <= limit, batch))
+                yield kept
+                if len(kept) < len(batch):
+                    return
 
 
 def generate_bgpstream_filters(f: FilterOptions) -> str | None:
-    """Generates a filter string compatible with BGPStream's C parser from a BGPStreamConfig object."""
+    """Generates a filter string compatible with BGPStream's C parser from a BGPStreamConfig object.
+
+    Sets of values are given to a single term (e.g. "peer 2497 3333"), which matches any of them.
+    """
     if not f:
         return None
     if not f.model_dump(exclude_unset=True):
         return None
 
+    values = filter_values(f)
     parts = []
 
-    if f.peer_asn:
-        parts.append(f"peer {f.peer_asn}")
+    if "peer_asn" in values:
+        parts.append(f"peer {' '.join(map(str, values['peer_asn']))}")
 
     if f.as_path:
         # Quote the value to handle potential spaces in the regex
         parts.append(f'aspath "{f.as_path}"')
 
-    if f.origin_asn:
+    if "origin_asn" in values:
         # Filtering by origin ASN is typically done via an AS path regex
-        parts.append(f'aspath "_{f.origin_asn}$"')
+        origins = values["origin_asn"]
+        if len(origins) == 1:
+            parts.append(f'aspath "_{origins[0]}$"')
+        else:
+            parts.append(f'aspath "_({"|".join(map(str, origins))})$"')
 
     if f.update_type:
         # The parser expects 'announcements' or 'withdrawals'
@@ -389,20 +787,25 @@ def generate_bgpstream_filters(f: FilterOptions) -> str | None:
         parts.append(f"elemtype {value}")
 
     # Handle all prefix variations
-    if f.prefix:
-        parts.append(f"prefix exact {f.prefix}")
-    if f.prefix_super:
-        parts.append(f"prefix less {f.prefix_super}")
-    if f.prefix_sub:
-        parts.append(f"prefix more {f.prefix_sub}")
-    if f.prefix_super_sub:
-        parts.append(f"prefix any {f.prefix_super_sub}")
+    keywords = {
+        "prefix": "exact",
+        "prefix_super": "less",
+        "prefix_sub": "more",
+        "prefix_super_sub": "any",
+    }
+    for option, keyword in keywords.items():
+        if option in values:
+            parts.append(f"prefix {keyword} {' '.join(values[option])}")
+
+    if "community" in values:
+        # Same "asn:value" syntax, with "*" wildcards
+        parts.append(f"community {' '.join(values['community'])}")
 
     if f.ip_version:
         parts.append(f"ipversion {f.ip_version}")
 
     # Warn about unsupported fields
-    if f.peer_ip or f.peer_ips:
+    if "peer_ip" in values:
         logging.info(
             "Filtering by peer_ip is not supported natively by pybgpstream (falling back to python-side filtering)"
         )
@@ -411,57 +814,118 @@ def generate_bgpstream_filters(f: FilterOptions) -> str | None:
     return " and ".join(parts)
 
 
-def build_bgpkit_cmd(filepath: str, filters: FilterOptions) -> list[str]:
-    # Start with the base command and file path
-    cmd = ["bgpkit-parser", filepath]
+def pybgpkit_filters(f: FilterOptions | None) -> tuple[dict, FilterOptions]:
+    """Split `f` into pybgpkit filters and the residual filters left to the Python side.
+
+    pybgpkit filters take a single value: sets of origin ASNs and communities
+    are pushed down as regexes, the other sets are filtered on the Python side.
+    """
+    values = filter_values(f)
+    native = {}
+    pushed = set()
+
+    def push(option, key, value):
+        native[key] = value
+        pushed.add(option)
+
+    if f is not None:
+        if f.ip_version:
+            # cast int ipv to pybgpkit ipv4 or ipv6 string
+            push("ip_version", "ip_version", f"ipv{f.ip_version}")
+        if f.update_type:
+            push("update_type", "type", f.update_type)
+        if f.as_path:
+            push("as_path", "as_path", f.as_path)
+    if "origin_asn" in values:
+        origins = values["origin_asn"]
+        if len(origins) == 1:
+            push("origin_asn", "origin_asn", str(origins[0]))
+        elif "as_path" not in native:
+            push("origin_asn", "as_path", origin_regex(origins))
+    if len(values.get("peer_asn", ())) == 1:
+        push("peer_asn", "peer_asn", str(values["peer_asn"][0]))
+    if "peer_ip" in values:
+        push("peer_ip", "peer_ips", ", ".join(values["peer_ip"]))
+    for option in PREFIX_MODES:
+        if len(values.get(option, ())) == 1:
+            push(option, option, values[option][0])
+    if "community" in values:
+        push("community", "community", community_regex(values["community"]))
+
+    return native, residual_filter(f, pushed)
+
+
+def bgpkit_cli_args(filters: FilterOptions | None) -> tuple[list[str], FilterOptions]:
+    """Split `filters` into `bgpkit-parser` arguments and the residual filters left to the Python side.
+
+    The CLI filters take a single value: sets of origin ASNs are pushed down
+    as an AS path regex, the other sets are filtered on the Python side.
+    """
+    if filters is None:
+        return [], FilterOptions()
+
+    values = filter_values(filters)
+    args = []
+    pushed = set()
 
     # 1. Simple Integer/String Mappings
-    if filters.origin_asn:
-        cmd.extend(["--origin-asn", str(filters.origin_asn)])
-
-    if filters.peer_ip:
-        cmd.extend(["--peer-ip", str(filters.peer_ip)])
-
-    if filters.peer_asn:
-        cmd.extend(["--peer-asn", str(filters.peer_asn)])
-
     if filters.as_path:
-        cmd.extend(["--as-path", filters.as_path])
+        args.extend(["--as-path", filters.as_path])
+        pushed.add("as_path")
+
+    if "origin_asn" in values:
+        origins = values["origin_asn"]
+        if len(origins) == 1:
+            args.extend(["--origin-asn", str(origins[0])])
+            pushed.add("origin_asn")
+        elif not filters.as_path:
+            args.extend(["--as-path", origin_regex(origins)])
+            pushed.add("origin_asn")
+
+    if len(values.get("peer_asn", ())) == 1:
+        args.extend(["--peer-asn", str(values["peer_asn"][0])])
+        pushed.add("peer_asn")
 
     # 2. Prefix Logic (Handling super/sub flags)
-    # We prioritize the most specific prefix field provided
-    prefix_val = None
-    if filters.prefix:
-        prefix_val = filters.prefix
-    elif filters.prefix_super:
-        prefix_val = filters.prefix_super
-        cmd.append("--include-super")
-    elif filters.prefix_sub:
-        prefix_val = filters.prefix_sub
-        cmd.append("--include-sub")
-    elif filters.prefix_super_sub:
-        prefix_val = filters.prefix_super_sub
-        cmd.extend(["--include-super", "--include-sub"])
-
-    if prefix_val:
-        cmd.extend(["--prefix", prefix_val])
-
-    # 3. List-based filters (using the --filter "key=value" format)
-    if filters.peer_ips:
-        # If it's a list, we add a generic filter for the comma-separated string
-        ips_str = ",".join(str(ip) for ip in filters.peer_ips)
-        cmd.extend(["--filter", f"peer_ips={ips_str}"])
+    # A single prefix option can be pushed down, the others are filtered on the Python side
+    flags = {
+        "prefix": [],
+        "prefix_super": ["--include-super"],
+        "prefix_sub": ["--include-sub"],
+        "prefix_super_sub": ["--include-super", "--include-sub"],
+    }
+    for option, option_flags in flags.items():
+        if len(values.get(option, ())) == 1:
+            args.extend(option_flags + ["--prefix", values[option][0]])
+            pushed.add(option)
+            break
+
+    # 3. Peer IPs (using the --filter "key=value" format for lists)
+    if "peer_ip" in values:
+        peer_ips = values["peer_ip"]
+        if len(peer_ips) == 1:
+            args.extend(["--peer-ip", peer_ips[0]])
+        else:
+            args.extend(["--filter", f"peer_ips={','.join(peer_ips)}"])
+        pushed.add("peer_ip")
 
     # 4. Enums and Literals
     if filters.update_type:
         # CLI accepts 'a' for announce and 'w' for withdraw
         val = "a" if filters.update_type == "announce" else "w"
-        cmd.extend(["--elem-type", val])
+        args.extend(["--elem-type", val])
+        pushed.add("update_type")
 
     if filters.ip_version:
         if filters.ip_version == 4:
-            cmd.append("--ipv4-only")
+            args.append("--ipv4-only")
         elif filters.ip_version == 6:
-            cmd.append("--ipv6-only")
+            args.append("--ipv6-only")
+        pushed.add("ip_version")
+
+    return args, residual_filter(filters, pushed)
+
 
-    return cmd
+def build_bgpkit_cmd(filepath: str, filters: FilterOptions | None) -> list[str]:
+    """`bgpkit-parser` command, with the filters it applies natively (see `bgpkit_cli_args`)"""
+    return ["bgpkit-parser", filepath] + bgpkit_cli_args(filters)[0]
@@ -2,13 +2,19 @@ import asyncio
 import os
 import re
 import datetime
-from typing import Iterator, Literal
-from collections import defaultdict
-from itertools import chain
-from heapq import merge
+import time
+from typing import AsyncIterator, Iterator, Literal
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from functools import partial
+from itertools import chain, groupby, islice
 from operator import attrgetter, itemgetter
 import binascii
+import zlib
 import logging
+import threading
+import multiprocessing
+from contextlib import aclosing, asynccontextmanager, contextmanager, nullcontext
 from tempfile import TemporaryDirectory
 
 import aiofiles
@@ -21,16 +27,59 @@ from pybgpflux.bgpstreamconfig import (
     FilterOptions,
     LiveStreamConfig,
 )
-from pybgpflux.bgpelement import BGPElement
+from pybgpflux.bgpelement import BGPElement, ElementField
+from pybgpflux.cache import CacheManager
+from pybgpflux.broker import BrokerCache, BROKER_CACHE_FILENAME
+from pybgpflux.batch import ElementBatch, ElementRow, element_to_row
 from pybgpflux.bgpparser import (
     BGPParser,
     PyBGPKITParser,
     BGPKITParser,
     PyBGPStreamParser,
     BGPdumpParser,
+    TIME_SLACK,
+    TimeBoundParser,
+    abatches,
+    projected_fields,
 )
-from pybgpflux.rislive import RISLiveStream, jitter_buffer_stream
-from pybgpflux.utils import dt_from_filepath
+from pybgpflux.download import (
+    THROTTLE_STATUSES,
+    Downloader,
+    DownloadError,
+    check_size,
+    fetch_parts,
+    file_crc32,
+    retry_after,
+    split_parts,
+)
+from pybgpflux.decompress import (
+    DECOMPRESSED_KEY_SUFFIX,
+    decompress_file,
+    decompressed_filepath,
+)
+from pybgpflux.elementcache import (
+    ELEMENTS_EXT,
+    ELEMENTS_KEY_SUFFIX,
+    CachingParser,
+    ElementFileParser,
+    element_variant,
+    elements_filepath,
+    read_header,
+)
+from pybgpflux.fileindex import (
+    SUMMARY_KEY_SUFFIX,
+    IndexingParser,
+    may_match,
+    read_summary,
+    summary_filepath,
+)
+from pybgpflux.interning import Interner
+from pybgpflux.merge import amerge, merge
+from pybgpflux.parallel import ParsingPool
+from pybgpflux.streaming import StreamJob, feed_fifos
+from pybgpflux.stats import StreamStats
+from pybgpflux.rislive import RISLiveStream, ajitter_buffer_stream, jitter_buffer_stream
+from pybgpflux.utils import dt_from_filepath, dump_span
 
 name2parser = {
     "pybgpkit": PyBGPKITParser,
@@ -45,7 +94,6 @@ logger = logging.getLogger(__name__)
 # Download retry constants
 MAX_RETRIES = 5
 INITIAL_BACKOFF = 0.2  # seconds
-REQUEST_DELAY = 0.05 # 50ms
 
 
 def crc32(input_str: str):
@@ -54,17 +102,6 @@ def crc32(input_str: str):
     return f"{crc:08x}"
 
 
-class Directory:
-    """Permanent directory that mimics TemporaryDirectory interface."""
-
-    def __init__(self, path):
-        self.name = str(path)
-
-    def cleanup(self):
-        """No-op cleanup for permanent directories."""
-        pass
-
-
 def get_shared_memory():
     """Get a RAM-based temp path if available, otherwise fall back to default."""
     if os.path.exists("/dev/shm"):  # Linux tmpfs
@@ -88,10 +125,19 @@ class BGPStream:
         ts_start (float | None): Start timestamp (Unix epoch). None for live mode.
         ts_end (float | None): End timestamp (Unix epoch). None for live mode.
         filters (FilterOptions): Filtering options for BGP elements.
-        cache_dir (Directory | TemporaryDirectory): Cache directory for downloaded files.
+        fields (list[str] | None): Element fields built by the parsers (None for all of them).
+        cache_dir (CacheManager | TemporaryDirectory): Cache directory for downloaded files.
         parser_name (str): Backend parser to use ("pybgpkit", "bgpkit", "bgpdump", "pybgpstream").
-        max_concurrent_downloads (int): Maximum concurrent file downloads.
+        max_concurrent_downloads (int): Maximum concurrent file downloads from each archive host.
         chunk_time (float): Time window (seconds) for processing chunks. Default is 2 hours.
+        prefetch_chunks (int): Number of upcoming chunks downloaded in the background while the current one is parsed.
+        workers (int): Number of processes parsing MRT files (1 parses in the current process).
+        stream_downloads (bool): Parse files while they are downloaded instead of after.
+        cache_decompressed (bool): Keep a decompressed copy of the files in the cache.
+        element_cache (bool): Keep the parsed elements of the files in the cache.
+        file_index (bool): Skip the cached files whose summary rules out the filters.
+        download_parts (int): Number of ranges of each large file downloaded in parallel.
+        intern_attributes (bool): Share the repeated attributes of the elements (see `pybgpflux.interning`).
         ram_fetch (bool): Use RAM disk (/dev/shm, /Volumes/RAMDisk) if available.
         jitter_buffer_delay (float): Delay (seconds) for jitter buffer in live mode.
 
@@ -149,6 +195,18 @@ class BGPStream:
         ram_fetch: bool | None = True,
         parser_name: str | None = "pybgpkit",
         jitter_buffer_delay: float | None = 10.0,
+        prefetch_chunks: int | None = 1,
+        workers: int | None = None,
+        cache_max_size: int | None = None,
+        cache_eviction: Literal["lru", "lfu"] = "lru",
+        stream_downloads: bool | None = False,
+        stats: bool | StreamStats | None = False,
+        fields: list[ElementField] | None = None,
+        cache_decompressed: bool | None = False,
+        element_cache: bool | None = False,
+        file_index: bool | None = False,
+        download_parts: int | None = 1,
+        intern_attributes: bool | None = False,
     ):
         """Initialize a BGP stream.
 
@@ -158,16 +216,59 @@ class BGPStream:
             ts_start: Start timestamp (Unix epoch) for historical data. None for live mode.
             ts_end: End timestamp (Unix epoch) for historical data. None for live mode.
             filters: Optional FilterOptions to filter BGP elements. Defaults to no filtering.
-            cache_dir: Directory to cache downloaded MRT files. If None, uses temporary directory.
-            max_concurrent_downloads: Maximum concurrent downloads. Default is 10.
+            cache_dir: Directory to cache downloaded MRT files and broker query results.
+                If None, uses temporary directory.
+            max_concurrent_downloads: Maximum concurrent downloads from each archive host
+                (the limit adapts to the host's responses, see `pybgpflux.download`). Default is 10.
             chunk_time: Time window (seconds) for streaming chunks. Default is 2 hours (7200s).
             ram_fetch: Use RAM disk for temporary files if available. Default is True.
             parser_name: Parser backend ("pybgpkit", "bgpkit", "bgpdump", "pybgpstream").
                 Default is "pybgpkit" (no system dependencies).
             jitter_buffer_delay: Delay (seconds) for jitter buffer in live mode. Default is 10.0.
+            prefetch_chunks: Number of upcoming chunks fetched in a background thread while the
+                current chunk is parsed (only used when chunk_time is set). 0 disables pipelining.
+                Default is 1.
+            workers: Number of worker processes parsing MRT files in parallel. None or 1 parses
+                in the current process. Not supported by the "pybgpstream" parser.
+            cache_max_size: Size budget (bytes) of cache_dir. Least recently/frequently used files
+                are evicted beyond it. None (default) never evicts.
+            cache_eviction: Eviction policy of cache_dir, "lru" (default) or "lfu".
+            stream_downloads: Parse files not in cache while they are downloaded, through a named
+                pipe, instead of waiting for the downloads to finish. The downloaded bytes are
+                still written to the cache. Default is False (POSIX only).
+            stats: Collect per-stage time and counters in `self.stats` (a `StreamStats`),
+                e.g. to see whether the broker, downloads, parsers or merge are the bottleneck.
+                A `StreamStats` object can be given to share it between streams. Default is False.
+            fields: Element fields the parsers build, among "prefix", "next_hop", "as_path"
+                and "communities" (the others are None). Skipping fields saves their
+                extraction, e.g. the communities of RIB dumps. Fields read by the filters
+                applied on the Python side are always built. Ignored by the "pybgpstream"
+                parser and live streams. Default is None (all fields).
+            cache_decompressed: Decompress the files in background threads, in parallel, and
+                keep the decompressed MRT files in the cache next to the compressed ones.
+                Parsers then read raw MRT files, and later streams over the same files skip
+                the decompression. Costs disk space (files are 3 to 10 times larger).
+                Default is False.
+            element_cache: Write the elements parsed from each file to an element file in
+                cache_dir (one per file, parser, filters and fields), read back through a
+                memory map by later streams with the same parser, filters and fields instead
+                of downloading, decompressing and parsing the file again. Default is False.
+            file_index: Write a summary of each file of cache_dir (peers, origin ASNs and
+                prefixes) the first time it is parsed, and skip the files whose summary
+                matches none of the filters in later streams. First parses read whole files
+                and filter them on the Python side, to summarize them. Default is False.
+            download_parts: Download files of at least 32 MiB (e.g. RIB dumps) in this many
+                byte ranges in parallel, each one counted in max_concurrent_downloads.
+                Helps when a single connection is slower than the link. Default is 1.
+            intern_attributes: Map the equal AS paths, communities, next hops and peer
+                addresses of the elements to one shared object (from a bounded table per
+                stream), so that buffered elements share them. Communities are then tuples
+                instead of lists. Ignored by the "pybgpstream" parser. Default is False.
 
         Raises:
-            ValueError: If parser_name is invalid.
+            ValueError: If parser_name is invalid, workers is used with the "pybgpstream" parser,
+                stream_downloads is used on a platform without named pipes, fields has
+                unknown field names, or element_cache or file_index is used without cache_dir.
 
         Note:
             For live mode, set both ts_start and ts_end to None.
@@ -181,13 +282,22 @@ class BGPStream:
         if not filters:
             filters = FilterOptions()
         self.filters = filters
+        # Checked here rather than in every parser
+        projected_fields(fields, None)
+        self.fields = list(fields) if fields is not None else None
 
         # Implementation config
         self.max_concurrent_downloads = max_concurrent_downloads
+        self.download_parts = download_parts if download_parts else 1
         self.chunk_time = chunk_time
+        self.prefetch_chunks = prefetch_chunks if prefetch_chunks else 0
         self.ram_fetch = ram_fetch
+        self.cache_max_size = cache_max_size
+        self.cache_eviction = cache_eviction
         if cache_dir:
-            self.cache_dir = Directory(cache_dir)
+            self.cache_dir = CacheManager(
+                cache_dir, max_size=cache_max_size, eviction=cache_eviction
+            )
         else:
             if ram_fetch:
                 self.cache_dir = TemporaryDirectory(dir=get_shared_memory())
@@ -199,8 +309,83 @@ class BGPStream:
             self.parser_name = parser_name
 
         self.broker = bgpkit.Broker()
+        # With cache_dir, broker results of past windows are cached next to the
+        # files: opened on the first query, closed on release (see _cached_broker)
+        self._broker_cache: BrokerCache | None = None
+        # Chunk workers query through their manager's cache (see _make_worker)
+        self._owns_broker_cache = True
         self.parser_cls: BGPParser = name2parser[parser_name]
 
+        self.workers = workers if workers else 1
+        if self.workers > 1 and self.parser_name == "pybgpstream":
+            raise ValueError(
+                "workers > 1 is not supported by the pybgpstream parser "
+                "(its elements cannot be sent between processes)"
+            )
+        # Process pool, shared by the worker streams of a manager stream
+        self._pool: ParsingPool | None = None
+
+        self.stream_downloads = bool(stream_downloads)
+        if self.stream_downloads and not hasattr(os, "mkfifo"):
+            raise ValueError("stream_downloads requires named pipes (POSIX only)")
+        # Named pipes of the files streamed to the parsers
+        self._streams: list[str] = []
+        # Set on release, for the helper processes feeding them (see feed_fifos)
+        self._streams_stopped = None
+
+        self.cache_decompressed = bool(cache_decompressed)
+        # Threads decompressing files (see _decompress)
+        self._decompressor: ThreadPoolExecutor | None = None
+        # Cache files pinned by this stream (see _list_files and _release)
+        self._pinned: list[str] = []
+
+        if element_cache and not cache_dir:
+            raise ValueError("element_cache requires cache_dir")
+        self.element_cache = bool(element_cache)
+        # Element files of this stream's parser, filters and fields (see elementcache)
+        self._element_variant = (
+            element_variant(self.parser_cls, self.filters, self.fields)
+            if self.element_cache
+            else None
+        )
+        # Files parsed for the first time: path -> (url, element file to write)
+        self._element_files: dict[str, tuple[str, str]] = {}
+
+        if file_index and not cache_dir:
+            raise ValueError("file_index requires cache_dir")
+        self.file_index = bool(file_index)
+        # Summaries depend on the parser only (see fileindex)
+        self._index_variant = (
+            element_variant(self.parser_cls, None, None) if self.file_index else None
+        )
+        # Files without summary: path -> (url, summary to write)
+        self._index_files: dict[str, tuple[str, str]] = {}
+        # Update files running past ts_end, parsed up to it (see _list_files)
+        self._bounded: set[str] = set()
+
+        if isinstance(stats, StreamStats):
+            self.stats = stats
+        else:
+            self.stats = StreamStats() if stats else None
+
+        # Set by _list_files(), reset once the stream has been consumed
+        self.paths = None
+        # Download state: one future per file being downloaded (see _download_files)
+        self._ready: dict[str, Future] = {}
+        self._downloads: list[tuple[str, str]] = []
+        self._download_lock = threading.Lock()
+        self._download_task = None
+        self._downloading: threading.Event | None = None
+        # HTTP session and host limiters, kept for a whole iteration (see _download_session)
+        self._downloader: Downloader | None = None
+        # Download task of a stream iterated asynchronously (see _afetch)
+        self._adownload: asyncio.Task | None = None
+        self._closing = False
+
+        self.intern_attributes = bool(intern_attributes)
+        # One table per stream: the elements of the chunk workers are interned by the manager (see _iter)
+        self._interner = Interner() if self.intern_attributes else None
+
         # Live config
         self.jitter_buffer_delay = jitter_buffer_delay
 
@@ -233,12 +418,25 @@ class BGPStream:
 
         return f"cache-{data_type}.{timestamp}.{hash_suffix}.{compression_ext}"
 
+    def _cached_broker(self):
+        """The broker, behind this stream's `BrokerCache` if it has a cache directory"""
+        if not isinstance(self.cache_dir, CacheManager):
+            return self.broker
+        with self._download_lock:
+            if self._broker_cache is None:
+                self._broker_cache = BrokerCache(
+                    os.path.join(self.cache_dir.name, BROKER_CACHE_FILENAME), self.broker
+                )
+            return self._broker_cache
+
     def _set_urls(self):
         """Set archive files URL with bgpkit broker"""
         # Set the urls with bgpkit broker
         self.urls = {"rib": defaultdict(list), "update": defaultdict(list)}
+        # Sizes of the files, checked at the end of their download
+        self._sizes: dict[str, int] = {}
         for data_type in self.data_type:
-            items: list[BrokerItem] = self.broker.query(
+            items: list[BrokerItem] = self._cached_broker().query(
                 ts_start=int(self.ts_start - 60),
                 ts_end=int(self.ts_end),
                 collector_id=",".join(self.collectors),
@@ -246,234 +444,802 @@ class BGPStream:
             )
             for item in items:
                 self.urls[data_type][item.collector_id].append(item.url)
+                self._sizes[item.url] = item.exact_size
             
-    async def _download_file(self, semaphore, session, url, filepath, data_type, rc):
-        """Helper coroutine to download a single file with retries and backoff, controlled by a semaphore."""
-        async with semaphore:
+    async def _download_file(self, session, url, filepath):
+        """Helper coroutine to download a single file with retries and backoff, within the concurrency window of its host.
+
+        Retries resume after the bytes already received (HTTP Range requests).
+        The file is only added to the cache once its size matches the server's (or
+        the broker's, for servers announcing none).
+        """
+        limiter = self._downloader.limiter(url)
+        size = self._sizes.get(url) or None
+        parts = split_parts(size, self.download_parts)
+        # Using a temporary file is safer to avoid partial cache hits
+        # (one per process, several processes may share the cache)
+        temp_filepath = f"{filepath}.{os.getpid()}.tmp"
+        try:
             for attempt in range(MAX_RETRIES + 1):
+                if self._closing:
+                    return None
+                if not os.path.exists(temp_filepath):
+                    open(temp_filepath, "wb").close()
                 try:
-                    # 1. Mandatory 50ms delay before every request attempt
-                    await asyncio.sleep(REQUEST_DELAY)
-
                     logging.debug(f"Attempt {attempt + 1}: Downloading {url}")
-                    
-                    async with session.get(url) as resp:
-                        resp.raise_for_status()
-                        
-                        # Using a temporary file is safer to avoid partial cache hits
-                        temp_filepath = f"{filepath}.tmp"
-                        async with aiofiles.open(temp_filepath, mode="wb") as fd:
-                            async for chunk in resp.content.iter_chunked(32768):
-                                await fd.write(chunk)
-                        
-                        # Rename temp file to actual filepath on success
-                        os.rename(temp_filepath, filepath)
-                        return data_type, rc, filepath
+                    await fetch_parts(session, limiter, url, temp_filepath, parts)
+                    downloaded = check_size(temp_filepath, parts, size)
+                    if len(parts) == 1:
+                        checksum = parts[0].checksum
+                    else:
+                        checksum = await asyncio.to_thread(file_crc32, temp_filepath)
+
+                    # Rename temp file to actual filepath on success
+                    os.rename(temp_filepath, filepath)
+                    if isinstance(self.cache_dir, CacheManager):
+                        self.cache_dir.add(url, filepath, checksum=f"{checksum:08x}")
+                    if self.stats is not None:
+                        self.stats.add(bytes_downloaded=downloaded, files_downloaded=1)
+                    return filepath
 
                 except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                     backoff = INITIAL_BACKOFF * (2 ** attempt)
-                    
-                    if attempt < MAX_RETRIES:
-                        logging.warning(
-                            f"Retrying {url} in {backoff}s due to error: {e} (Attempt {attempt + 1}/{MAX_RETRIES})"
-                        )
-                        await asyncio.sleep(backoff)
-                    else:
+                    if isinstance(e, DownloadError):
+                        # Start over, in a single part
+                        os.remove(temp_filepath)
+                        parts = split_parts(None, 1)
+                    elif isinstance(e, aiohttp.ClientResponseError) and e.status in THROTTLE_STATUSES:
+                        backoff = max(backoff, retry_after(e.headers) or 0.0)
+
+                    if attempt == MAX_RETRIES:
                         logging.error(f"Failed to download {url} after {MAX_RETRIES} retries: {e}")
-                        # Clean up temp file if it exists
-                        if os.path.exists(f"{filepath}.tmp"):
-                            os.remove(f"{filepath}.tmp")
+                        if self.stats is not None:
+                            self.stats.add(download_failures=1)
                         return None
+                    received = sum(part.done for part in parts)
+                    logging.warning(
+                        f"Retrying {url} in {backoff}s due to error: {e} (Attempt {attempt + 1}/{MAX_RETRIES}"
+                        f"{f', resuming after {received} bytes' if received else ''})"
+                    )
+                    await asyncio.sleep(backoff)
+        finally:
+            # Failed, or stream closed during the download (see _release)
+            if os.path.exists(temp_filepath):
+                os.remove(temp_filepath)
 
-    async def _prefetch_data(self):
-        """Download archive files concurrently and cache to `self.cache_dir`"""
+    def _stream_files(self, jobs: list[StreamJob]):
+        """Feed the named pipes of `jobs` from a helper process (see `feed_fifos`).
+
+        Each download starts once a parser opens its pipe, so files are fetched
+        in the order they are parsed.
+        """
+        for *_, fifo_path in jobs:
+            os.mkfifo(fifo_path)
+        cache_dir = (
+            self.cache_dir.name if isinstance(self.cache_dir, CacheManager) else None
+        )
+        # spawn: the helper may be started while download threads are running
+        context = multiprocessing.get_context("spawn")
+        if self._streams_stopped is None:
+            self._streams_stopped = context.Event()
+        helper = context.Process(
+            target=feed_fifos, args=(jobs, cache_dir, self._streams_stopped), daemon=True
+        )
+        helper.start()
+        self._streams.extend(fifo_path for *_, fifo_path in jobs)
+
+    def _list_files(self):
+        """Query the broker and set this stream's file paths, in time order.
+
+        Cached files are ready at once. Files to download get a future in
+        `self._ready`, resolved by `_download_files` when their download is over,
+        so that each file can be parsed as soon as it is on disk. With
+        `cache_decompressed`, paths are those of the decompressed files, whose
+        futures are resolved by `_decompress`. With `element_cache`, files whose
+        elements are cached are replaced by their element file. With `file_index`,
+        files whose summary rules out the filters are left out.
+
+        Files whose time span is outside [ts_start, ts_end] are left out too (see
+        `_in_window`), and the update files running past ts_end are only parsed
+        up to it (see `TimeBoundParser`).
+        """
+        with self._timed("broker"):
+            self._set_urls()
         self.paths = {"rib": defaultdict(list), "update": defaultdict(list)}
-        tasks = []
-
-        semaphore = asyncio.Semaphore(self.max_concurrent_downloads)
-
-        timeout = aiohttp.ClientTimeout(total=None, sock_read=300)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            # Create all the download tasks.
-            for data_type in self.data_type:
-                for rc, rc_urls in self.urls[data_type].items():
-                    for url in rc_urls:
-                        filename = self._generate_cache_filename(url)
-                        filepath = os.path.join(self.cache_dir.name, filename)
-
-                        if os.path.exists(filepath):
-                            logging.debug(f"{filepath} is a cache hit")
-                            self.paths[data_type][rc].append(filepath)
-                        else:
-                            task = asyncio.create_task(
-                                self._download_file(
-                                    semaphore, session, url, filepath, data_type, rc
-                                )
-                            )
-                            tasks.append(task)
+        self._ready = {}
+        self._downloads = []
+        self._element_files = {}
+        self._index_files = {}
+        self._bounded = set()
+        skipped = pruned = 0
+        with self._download_lock:
+            self._closing = False
+            self._download_task = None
+            self._downloading = None
+        streams = []
 
-            if tasks:
-                logging.info(
-                    f"Starting download of {len(tasks)} files with a concurrency of {self.max_concurrent_downloads}..."
-                )
-                results = await asyncio.gather(*tasks)
+        for data_type in self.data_type:
+            for rc, rc_urls in self.urls[data_type].items():
+                for url in rc_urls:
+                    start, end = dump_span(url, rc, data_type == "rib")
+                    if not self._in_window(start, end, data_type == "rib"):
+                        logging.debug(f"{url} skipped, outside of the time window")
+                        pruned += 1
+                        continue
+                    filename = self._generate_cache_filename(url)
+                    filepath = os.path.join(self.cache_dir.name, filename)
+                    summary_path = (
+                        summary_filepath(filepath, self._index_variant)
+                        if self.file_index
+                        else None
+                    )
+                    summary = self._read_summary(url, summary_path) if summary_path else None
+                    if summary is not None and not may_match(summary, self.filters):
+                        logging.debug(f"{filepath} skipped, no match in {summary_path}")
+                        skipped += 1
+                        continue
+                    raw_path = (
+                        decompressed_filepath(filepath) if self.cache_decompressed else None
+                    )
+                    elements_path = (
+                        elements_filepath(filepath, self._element_variant)
+                        if self.element_cache
+                        else None
+                    )
 
-                # Process the results, skipping any 'None' values from failed downloads.
-                for result in results:
-                    if result:
-                        data_type, rc, filepath = result
-                        self.paths[data_type][rc].append(filepath)
-                logging.info("All downloads finished.")
+                    if isinstance(self.cache_dir, CacheManager):
+                        # Pinned before the lookups, so that another process
+                        # sharing the cache cannot evict them in between
+                        candidates = [p for p in (elements_path, raw_path, filepath) if p]
+                        self.cache_dir.pin(candidates)
+                        self._pinned.extend(candidates)
+
+                    if elements_path and self._has_elements(url, elements_path):
+                        logging.debug(f"{elements_path} is a cache hit")
+                        filepath = elements_path
+                    elif raw_path and self._is_cached(url + DECOMPRESSED_KEY_SUFFIX, raw_path):
+                        logging.debug(f"{raw_path} is a cache hit")
+                        filepath = raw_path
+                    elif self._is_cached(url, filepath):
+                        logging.debug(f"{filepath} is a cache hit")
+                        if raw_path:
+                            filepath = self._decompress(url, filepath, raw_path)
+                    elif self.stream_downloads:
+                        # Keep the timestamp and compression extension for the parsers
+                        root, ext = os.path.splitext(filepath)
+                        # (unique per stream: consecutive chunks may share a file)
+                        filepath = f"{root}.{os.getpid()}.{id(self):x}.fifo{ext}"
+                        streams.append((url, os.path.join(self.cache_dir.name, filename), filepath))
+                    else:
+                        self._ready[filepath] = Future()
+                        self._downloads.append((url, filepath))
+                        if raw_path:
+                            filepath = self._decompress(url, filepath, raw_path)
+                    if elements_path and filepath != elements_path:
+                        self._element_files[filepath] = (url, elements_path)
+                    if summary_path and summary is None and filepath != elements_path:
+                        self._index_files[filepath] = (url, summary_path)
+                    if (
+                        data_type == "update"
+                        and (end is None or end > self.ts_end)
+                        # Files streamed, cached or summarized are read in full
+                        and filepath not in self._element_files
+                        and filepath not in self._index_files
+                        and (not streams or streams[-1][2] != filepath)
+                    ):
+                        self._bounded.add(filepath)
+                    self.paths[data_type][rc].append(filepath)
+
+        if self.stats is not None:
+            misses = len(self._downloads) + len(streams)
+            self.stats.add(
+                cache_hits=len(self._all_paths()) - misses,
+                cache_misses=misses,
+                files_skipped=skipped,
+                files_pruned=pruned,
+            )
 
-    def __iter__(self):
-        if self.ts_start is None and self.ts_end is None:
-            return self._iter_live()
-        if "update" in self.data_type:
-            return self._iter_update()
-        else:
-            return self._iter_rib()
+        for rc_to_paths in self.paths.values():
+            for paths in rc_to_paths.values():
+                paths.sort(key=dt_from_filepath)
+        # Earliest files first, whatever the collector: they are parsed first
+        self._downloads.sort(key=lambda download: dt_from_filepath(download[1]))
 
-    def _iter_update(self) -> Iterator[BGPElement]:
-        # __iter__ for data types [ribs, updates] or [updates]
-        # try/finally to cleanup the fetching cache
-        try:
-            # Manager mode: spawn smaller worker streams to balance fetch/parse
-            if self.chunk_time:
-                current = self.ts_start
+        if streams:
+            self._stream_files(streams)
 
-                while current < self.ts_end:
-                    chunk_end = min(current + self.chunk_time, self.ts_end)
+    def _in_window(self, start: float, end: float | None, is_rib: bool) -> bool:
+        """Can a dump spanning [start, end) (see `dump_span`) hold elements of [ts_start, ts_end]?
 
-                    logging.info(
-                        f"Processing chunk: {datetime.datetime.fromtimestamp(current)} "
-                        f"to {datetime.datetime.fromtimestamp(chunk_end)}"
-                    )
-                    worker = type(self)(
-                        ts_start=current,
-                        ts_end=chunk_end
-                        - 1,  # remove one second because BGPKIT include border
-                        collectors=self.collectors,
-                        data_type=self.data_type,
-                        cache_dir=self.cache_dir.name
-                        if isinstance(self.cache_dir, Directory)
-                        else None,
-                        filters=self.filters,
-                        max_concurrent_downloads=self.max_concurrent_downloads,
-                        chunk_time=None,  # Worker doesn't chunk itself
-                        ram_fetch=self.ram_fetch,
-                        parser_name=self.parser_name,
-                    )
+        The broker lists the files around the window (e.g. the update dump ending
+        at ts_start): parsing them would only feed the time filter. Records may
+        be stamped up to `TIME_SLACK` after the span of their file (and RIB
+        elements carry the time of their MRT record, not of the file name), so
+        only the files wholly outside the window, slack included, are left out.
+        """
+        if start > self.ts_end:
+            return False
+        if is_rib:
+            return start + TIME_SLACK >= self.ts_start
+        return end is None or end + TIME_SLACK > self.ts_start
+
+    def _is_current(self, url: str, checksum: str | None, path: str) -> bool:
+        """Was `path` derived from the current version of `url`? (`checksum`: the one it recorded)"""
+        current = self.cache_dir.checksum(url)
+        if checksum and current and checksum != current:
+            logging.info(f"{path} is outdated, {url} changed since it was written")
+            return False
+        return True
+
+    def _read_summary(self, url: str, summary_path: str) -> dict | None:
+        """Summary of the current version of `url`, recording the access in the cache index."""
+        summary = read_summary(summary_path)
+        if summary is None or not self._is_current(url, summary["checksum"], summary_path):
+            return None
+        if not self.cache_dir.lookup(
+            url + SUMMARY_KEY_SUFFIX + self._index_variant, summary_path
+        ):
+            # Evicted in the meantime
+            return None
+        return summary
+
+    def _has_elements(self, url: str, elements_path: str) -> bool:
+        """Is `elements_path` a complete element file of the current version of `url`?"""
+        header = read_header(elements_path)
+        if header is None or not self._is_current(url, header["checksum"], elements_path):
+            return False
+        return self.cache_dir.lookup(
+            url + ELEMENTS_KEY_SUFFIX + self._element_variant, elements_path
+        )
 
-                    yield from worker
-                    current = chunk_end + 1e-7
+    def _decompress(self, url: str, filepath: str, raw_path: str) -> str:
+        """Decompress `filepath` to `raw_path` in a background thread, once it is on disk.
 
+        Returns `raw_path`, whose future in `self._ready` is resolved when the
+        decompressed file is ready (False if the download or decompression failed).
+        """
+        if self._decompressor is None:
+            self._decompressor = ThreadPoolExecutor(
+                max_workers=os.cpu_count(), thread_name_prefix="pybgpflux-decompress"
+            )
+        decompressor = self._decompressor
+        download = self._ready.get(filepath)
+        ready = self._ready[raw_path] = Future()
+
+        def run():
+            try:
+                with self._timed("decompress"):
+                    decompress_file(filepath, raw_path)
+            except Exception as e:
+                logging.error(f"Failed to decompress {filepath}: {e}")
+                ready.set_result(False)
                 return
+            if isinstance(self.cache_dir, CacheManager):
+                self.cache_dir.add(url + DECOMPRESSED_KEY_SUFFIX, raw_path)
+            ready.set_result(True)
 
-            self._set_urls()
-            asyncio.run(self._prefetch_data())
-
-            # One iterator for each data_type * collector combinations
-            # To be merged according to the elements timestamp
-            iterators_to_merge = []
-
-            for data_type in self.data_type:
-                is_rib = data_type == "rib"
+        def start(download: Future | None):
+            if ready.done():
+                return
+            if download is not None:
+                if download.exception() is not None:
+                    ready.set_exception(download.exception())
+                    return
+                if not download.result():
+                    ready.set_result(False)
+                    return
+            try:
+                decompressor.submit(run)
+            except RuntimeError:
+                # Stream released in the meantime (see _release)
+                ready.set_result(False)
+
+        if download is None:
+            start(None)
+        else:
+            download.add_done_callback(start)
+        return raw_path
+
+    def _download_files(self):
+        """Download the files listed by `_list_files` (blocks until they are all done)."""
+        with self._download_lock:
+            if self._closing or not self._downloads:
+                self._resolve_downloads(False)
+                return
+            self._downloading = threading.Event()
+        with self._timed("download"):
+            self._downloader.submit(self._run_downloads()).result()
+        if isinstance(self.cache_dir, CacheManager):
+            self.cache_dir.evict()
+
+    async def _run_downloads(self):
+        """`_prefetch_data` on the downloader's loop: resolves all the download
+        futures and sets `self._downloading` once over, whatever happens."""
+        try:
+            await self._prefetch_data()
+        except BaseException as e:
+            # Parsers waiting for a file raise the error instead of hanging
+            self._resolve_downloads(e)
+        finally:
+            with self._download_lock:
+                self._download_task = None
+            self._resolve_downloads(False)
+            self._downloading.set()
+
+    def _resolve_downloads(self, result: bool | BaseException):
+        for _, filepath in self._downloads:
+            ready = self._ready[filepath]
+            if not ready.done():
+                if isinstance(result, BaseException):
+                    ready.set_exception(result)
+                else:
+                    ready.set_result(result)
 
-                # Get rib or update files per collector
-                rc_to_paths = self.paths[data_type]
+    async def _prefetch_data(self):
+        """Download archive files concurrently and cache to `self.cache_dir`"""
 
-                # Chain rib or update iterators to get one stream per collector / data_type
-                for rc, paths in rc_to_paths.items():
-                    # Don't use a generator here. parsers are lazy anyway
-                    parsers = [
-                        self.parser_cls(path, is_rib, rc, filters=self.filters)
-                        for path in paths
-                    ]
+        async def download(url, filepath):
+            result = await self._download_file(session, url, filepath)
+            self._ready[filepath].set_result(result is not None)
 
-                    chained_iterator = chain.from_iterable(parsers)
+        with self._download_lock:
+            if self._closing:
+                return
+            # Let _release cancel the downloads from another thread
+            self._download_task = (asyncio.get_running_loop(), asyncio.current_task())
 
-                    # Add metadata lost by bgpkit for compatibility with pubgpstream
-                    # iterators_to_merge.append((chained_iterator, is_rib, rc))
-                    iterators_to_merge.append(chained_iterator)
+        # Connections are kept open from one chunk to the next
+        session = await self._downloader.session()
+        logging.info(
+            f"Starting download of {len(self._downloads)} files with a concurrency of {self.max_concurrent_downloads} per host..."
+        )
+        # Tasks start in this order, the host limiters serve them first come first served
+        await asyncio.gather(
+            *(download(url, filepath) for url, filepath in self._downloads)
+        )
+        logging.info("All downloads finished.")
+
+    def _is_ready(self, path: str) -> bool:
+        """Wait until `path` is on disk. Returns False if its download failed."""
+        ready = self._ready.get(path)
+        if ready is None:
+            return True
+        if not ready.done():
+            with self._timed("wait"):
+                return ready.result()
+        return ready.result()
+
+    def _ready_jobs(self, paths: list[str], is_rib: bool, rc: str):
+        """Yield the `ParsingPool` jobs of `paths`, each once its file is on disk."""
+        for path in paths:
+            if self._is_ready(path):
+                yield path, is_rib, rc, self._parser_for(path)
+
+    def _parser_for(self, path: str) -> type[BGPParser]:
+        """Parser class of `path`, stopped at ts_end for the files running past it."""
+        parser_cls = self._full_parser_for(path)
+        if path in self._bounded:
+            parser_cls = partial(TimeBoundParser, parser_cls, self.ts_end)
+        return parser_cls
+
+    def _full_parser_for(self, path: str) -> type[BGPParser]:
+        """Parser class reading all of `path`: element files are read back, and files
+        parsed for the first time are summarized and written to the element cache."""
+        if path.endswith(ELEMENTS_EXT):
+            return ElementFileParser
+        # The download is over: checksums are known
+        parser_cls = self.parser_cls
+        if path in self._index_files:
+            url, summary_path = self._index_files[path]
+            checksum = self.cache_dir.checksum(url)
+            key = url + SUMMARY_KEY_SUFFIX + self._index_variant
+            parser_cls = partial(
+                IndexingParser, parser_cls, summary_path, checksum, self.cache_dir.name, key
+            )
+        if path in self._element_files:
+            url, elements_path = self._element_files[path]
+            checksum = self.cache_dir.checksum(url)
+            key = url + ELEMENTS_KEY_SUFFIX + self._element_variant
+            parser_cls = partial(
+                CachingParser, parser_cls, elements_path, checksum, self.cache_dir.name, key
+            )
+        return parser_cls
+
+    def _parse(self, path: str, is_rib: bool, rc: str, rows: bool = False):
+        """Parse `path` once it is on disk (nothing if its download failed)."""
+        if self._is_ready(path):
+            parser_cls = self._parser_for(path)
+            parser = parser_cls(path, is_rib, rc, filters=self.filters, fields=self.fields)
+            elements = parser.iter_rows() if rows else parser
+            if self.stats is not None:
+                elements = self.stats.timed_parse(elements)
+            yield from elements
+
+    def _timed(self, stage: str):
+        """Context manager accounting its time to `stage` in `self.stats`, if enabled."""
+        if self.stats is None:
+            return nullcontext()
+        return self.stats.timed(stage)
+
+    def _all_paths(self) -> list[str]:
+        return [
+            path
+            for rc_to_paths in self.paths.values()
+            for paths in rc_to_paths.values()
+            for path in paths
+        ]
 
-            for bgpelem in merge(*iterators_to_merge, key=attrgetter("time")):
-                if self.ts_start <= bgpelem.time <= self.ts_end:
-                    yield bgpelem
+    def _release(self):
+        """Release the fetched files once the stream is consumed or closed."""
+        with self._download_lock:
+            # Stop the downloads of a stream closed early
+            self._closing = True
+            downloading = self._downloading
+            if self._download_task is not None:
+                loop, task = self._download_task
+                loop.call_soon_threadsafe(task.cancel)
+        if downloading is not None:
+            downloading.wait()
+        if self._decompressor is not None:
+            self._decompressor.shutdown(cancel_futures=True)
+            self._decompressor = None
+            # Decompressions cancelled before they started
+            for ready in self._ready.values():
+                if not ready.done():
+                    ready.set_result(False)
+        if self._pinned:
+            self.cache_dir.unpin(self._pinned)
+        self.paths = None
+        self._pinned = []
+        if self._streams_stopped is not None:
+            self._streams_stopped.set()
+            self._streams_stopped = None
+        for fifo_path in self._streams:
+            try:
+                # Unblock a feeder still waiting for its parser to open the pipe
+                # (it sees the stream stopped and drops the download)
+                os.close(os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK))
+                os.remove(fifo_path)
+            except OSError:
+                pass
+        self._streams = []
+        if self._owns_broker_cache and self._broker_cache is not None:
+            self._broker_cache.close()
+            self._broker_cache = None
+        self.cache_dir.cleanup()
+
+    def _is_cached(self, url: str, filepath: str) -> bool:
+        if isinstance(self.cache_dir, CacheManager):
+            return self.cache_dir.lookup(url, filepath)
+        return os.path.exists(filepath)
+
+    def _fetch(self):
+        """List this stream's files and download them in a background thread."""
+        self._list_files()
+        threading.Thread(
+            target=self._download_files, name="pybgpflux-download", daemon=True
+        ).start()
+
+    def _make_worker(self, ts_start: float, ts_end: float) -> "BGPStream":
+        """Create a non-chunking worker stream sharing this stream's configuration."""
+        worker = type(self)(
+            ts_start=ts_start,
+            ts_end=ts_end,
+            collectors=self.collectors,
+            data_type=self.data_type,
+            cache_dir=self.cache_dir.name
+            if isinstance(self.cache_dir, CacheManager)
+            else None,
+            cache_max_size=self.cache_max_size,
+            cache_eviction=self.cache_eviction,
+            filters=self.filters,
+            max_concurrent_downloads=self.max_concurrent_downloads,
+            chunk_time=None,  # Worker doesn't chunk itself
+            ram_fetch=self.ram_fetch,
+            parser_name=self.parser_name,
+            workers=self.workers,
+            stream_downloads=self.stream_downloads,
+            stats=self.stats,
+            fields=self.fields,
+            cache_decompressed=self.cache_decompressed,
+            element_cache=self.element_cache,
+            file_index=self.file_index,
+            download_parts=self.download_parts,
+        )
+        worker._pool = self._pool
+        worker._downloader = self._downloader
+        if isinstance(self.cache_dir, CacheManager):
+            # Share pins: the manager's cache must not evict files of other chunks
+            worker.cache_dir = self.cache_dir
+            worker._broker_cache = self._cached_broker()
+            worker._owns_broker_cache = False
+        return worker
+
+    @contextmanager
+    def _download_session(self):
+        """Provide the `Downloader` of an iteration, closed once it is over.
+
+        The downloader is created here unless it was handed over by a manager
+        stream: chunk workers share its connections and host limiters.
+        """
+        if self._downloader is not None:
+            yield self._downloader
+            return
+        self._downloader = Downloader(self.max_concurrent_downloads)
+        try:
+            yield self._downloader
         finally:
-            self.cache_dir.cleanup()
-
-    def _iter_rib(self) -> Iterator[BGPElement]:
-        # __iter__ for data types [ribs]
-        # try/finally to cleanup the fetching cache
+            self._downloader.close()
+            self._downloader = None
+
+    @asynccontextmanager
+    async def _adownload_session(self):
+        """`_download_session` for asynchronous iteration: the downloads run on the running loop."""
+        if self._downloader is not None:
+            yield self._downloader
+            return
+        self._downloader = Downloader(
+            self.max_concurrent_downloads, loop=asyncio.get_running_loop()
+        )
         try:
-            # Manager mode: spawn smaller worker streams to balance fetch/parse
-            if self.chunk_time:
-                current = self.ts_start
+            yield self._downloader
+        finally:
+            await self._downloader.aclose()
+            self._downloader = None
 
-                while current < self.ts_end:
-                    chunk_end = min(current + self.chunk_time, self.ts_end)
+    @contextmanager
+    def _parsing_pool(self):
+        """Provide the process pool used when `workers` > 1 (None otherwise).
 
+        The pool is created here unless it was handed over by a manager stream.
+        """
+        if self.workers <= 1 or self._pool is not None:
+            yield self._pool
+            return
+        self._pool = ParsingPool(self.workers, self.parser_cls, self.filters, self.fields)
+        try:
+            yield self._pool
+        finally:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _chunk_bounds(self) -> Iterator[tuple[float, float]]:
+        """(start, end) of the `chunk_time` windows of the stream"""
+        current = self.ts_start
+        while current < self.ts_end:
+            chunk_end = min(current + self.chunk_time, self.ts_end)
+            yield current, chunk_end
+            current = chunk_end + 1e-7
+
+    def _iter_chunks(self, rows: bool = False) -> Iterator[BGPElement]:
+        """Manager mode: yield from one worker stream per `chunk_time` window.
+
+        Workers are fetched (broker query + downloads) in a background thread,
+        up to `prefetch_chunks` chunks ahead of the one being parsed, so that the
+        network and the parser are busy at the same time. A chunk is parsed as
+        soon as its files are listed, each parser waiting for its own file.
+        """
+
+        bounds = self._chunk_bounds()
+        pending = deque()
+
+        def schedule(n):
+            for start, end in islice(bounds, n):
+                # remove one second because BGPKIT include border
+                worker = self._make_worker(start, end - 1)
+                # Chunks are downloaded one after the other, by the same thread
+                listed = executor.submit(worker._list_files)
+                downloaded = executor.submit(worker._download_files)
+                pending.append((start, end, worker, listed, downloaded))
+
+        with self._parsing_pool(), ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="pybgpflux-prefetch"
+        ) as executor:
+            try:
+                schedule(1 + self.prefetch_chunks)
+                while pending:
+                    start, end, worker, listed, downloaded = pending[0]
                     logging.info(
-                        f"Processing chunk: {datetime.datetime.fromtimestamp(current)} "
-                        f"to {datetime.datetime.fromtimestamp(chunk_end)}"
-                    )
-                    worker = type(self)(
-                        ts_start=current,
-                        ts_end=chunk_end
-                        - 1,  # remove one second because BGPKIT include border
-                        collectors=self.collectors,
-                        data_type=self.data_type,
-                        cache_dir=self.cache_dir.name
-                        if isinstance(self.cache_dir, Directory)
-                        else None,
-                        filters=self.filters,
-                        max_concurrent_downloads=self.max_concurrent_downloads,
-                        chunk_time=None,  # Worker doesn't chunk itself
-                        ram_fetch=self.ram_fetch,
-                        parser_name=self.parser_name,
+                        f"Processing chunk: {datetime.datetime.fromtimestamp(start)} "
+                        f"to {datetime.datetime.fromtimestamp(end)}"
                     )
+                    with self._timed("wait"):
+                        listed.result()
+                    # Keep the lookahead window full while this chunk is parsed
+                    schedule(1)
+                    yield from worker._iter(rows)
+                    pending.popleft()
+            finally:
+                # Stream closed early: stop the downloads and drop their files
+                for *_, worker, listed, downloaded in pending:
+                    downloaded.cancel()
+                    if not listed.cancel():
+                        try:
+                            listed.result()
+                        except Exception:
+                            pass
+                    worker._release()
 
-                    yield from worker
-                    current = chunk_end + 1e-7
+    def __iter__(self):
+        return self._iter()
 
-                return
+    def _iter(self, rows: bool = False) -> Iterator[BGPElement] | Iterator[ElementRow]:
+        # rows: yield flat ElementRow tuples instead of BGPElement (see iter_batches)
+        if self.ts_start is None and self.ts_end is None:
+            live = self._iter_live()
+            elements = map(element_to_row, live) if rows else live
+        elif "update" in self.data_type:
+            elements = self._iter_update(rows)
+        else:
+            elements = self._iter_rib(rows)
+        if self._interner is not None:
+            return map(self._interner.row if rows else self._interner.element, elements)
+        return elements
 
-            self._set_urls()
-            asyncio.run(self._prefetch_data())
-
-            rc_to_paths = self.paths["rib"]
-
-            # Agglomerate all RIBs parsers for ordering
-            iterators_to_order = []
-            for rc, paths in rc_to_paths.items():
-                # Don't use a generator here. parsers are lazy anyway
-                parsers = [
-                    (
-                        dt_from_filepath(path),
-                        rc,
-                        self.parser_cls(path, True, rc, filters=self.filters),
-                    )
+    def iter_batches(self, batch_size: int = 65536) -> Iterator[ElementBatch]:
+        """Iterate over the stream in columnar batches instead of one element at a time.
+
+        Parsers produce flat rows directly (no `BGPElement` nor fields dict per
+        element), which are packed column by column into `ElementBatch` objects.
+        Batches follow the same order and filters as iterating over the stream.
+
+        Args:
+            batch_size: Maximum number of elements per batch. Default is 65536.
+
+        Yields:
+            ElementBatch: The next batch of at most `batch_size` elements.
+
+        Examples:
+            ```python
+            for batch in stream.iter_batches(batch_size=100_000):
+                columns = batch.to_numpy()  # requires numpy
+                print(len(batch), columns["time"].max())
+            ```
+        """
+        rows = self._iter(rows=True)
+        while batch := list(islice(rows, batch_size)):
+            yield ElementBatch(batch)
+
+    def _iter_update(self, rows: bool = False) -> Iterator[BGPElement]:
+        # __iter__ for data types [ribs, updates] or [updates]
+        # try/finally to cleanup the fetching cache
+        with self._download_session():
+            try:
+                # Manager mode: spawn smaller worker streams to balance fetch/parse
+                if self.chunk_time:
+                    yield from self._iter_chunks(rows)
+                    return
+
+                if self.paths is None:
+                    self._fetch()
+
+                with self._parsing_pool() as pool:
+                    # One iterator for each data_type * collector combinations
+                    # To be merged according to the elements timestamp
+                    iterators_to_merge = []
+
+                    for data_type in self.data_type:
+                        is_rib = data_type == "rib"
+
+                        # Get rib or update files per collector
+                        rc_to_paths = self.paths[data_type]
+
+                        # Chain rib or update iterators to get one stream per collector / data_type
+                        for rc, paths in rc_to_paths.items():
+                            if pool:
+                                # Each file is submitted to the pool once it is on disk
+                                chained_iterator = pool.chain(
+                                    self._ready_jobs(paths, is_rib, rc), rows=rows
+                                )
+                                if self.stats is not None:
+                                    chained_iterator = self.stats.timed_parse(chained_iterator)
+                            else:
+                                # Don't use a generator here. parsers are lazy anyway
+                                parsers = [
+                                    self._parse(path, is_rib, rc, rows) for path in paths
+                                ]
+                                chained_iterator = chain.from_iterable(parsers)
+
+                            # Add metadata lost by bgpkit for compatibility with pubgpstream
+                            # iterators_to_merge.append((chained_iterator, is_rib, rc))
+                            iterators_to_merge.append(chained_iterator)
+
+                    key = itemgetter(0) if rows else attrgetter("time")
+                    if self.stats is not None:
+                        yield from self.stats.timed_merge(
+                            merge(*iterators_to_merge, key=key), key, self.ts_start, self.ts_end
+                        )
+                        return
+
+                    if rows:
+                        for row in merge(*iterators_to_merge, key=key):
+                            if self.ts_start <= row[0] <= self.ts_end:
+                                yield row
+                        return
+
+                    for bgpelem in merge(*iterators_to_merge, key=key):
+                        if self.ts_start <= bgpelem.time <= self.ts_end:
+                            yield bgpelem
+            finally:
+                self._release()
+
+    def _iter_rib(self, rows: bool = False) -> Iterator[BGPElement]:
+        # __iter__ for data types [ribs]
+        # try/finally to cleanup the fetching cache
+        with self._download_session():
+            try:
+                # Manager mode: spawn smaller worker streams to balance fetch/parse
+                if self.chunk_time:
+                    yield from self._iter_chunks(rows)
+                    return
+
+                if self.paths is None:
+                    self._fetch()
+
+                rc_to_paths = self.paths["rib"]
+
+                # Agglomerate all RIBs files for ordering
+                ribs_to_order = [
+                    (dt_from_filepath(path), rc, path)
+                    for rc, paths in rc_to_paths.items()
                     for path in paths
                 ]
-                iterators_to_order.extend(parsers)
-
-            iterators_to_order.sort(key=itemgetter(0, 1))
+                ribs_to_order.sort(key=itemgetter(0, 1))
+
+                with self._parsing_pool() as pool:
+                    if pool:
+                        # RIBs dumped at the same time are parsed together, output in collector order
+                        rib_stream = chain.from_iterable(
+                            pool.chain_all(
+                                [
+                                    (path, True, rc, self._parser_for(path))
+                                    for _, rc, path in ribs
+                                    if self._is_ready(path)
+                                ],
+                                rows=rows,
+                            )
+                            for _, ribs in groupby(ribs_to_order, key=itemgetter(0))
+                        )
+                    else:
+                        # Don't use a generator here. parsers are lazy anyway
+                        parsers = [
+                            self._parse(path, True, rc, rows) for _, rc, path in ribs_to_order
+                        ]
+                        rib_stream = chain.from_iterable(parsers)
+
+                    if self.stats is not None:
+                        if pool:
+                            rib_stream = self.stats.timed_parse(rib_stream)
+                        # No merge: RIBs are already in time order
+                        yield from self.stats.timed_merge(
+                            rib_stream,
+                            itemgetter(0) if rows else attrgetter("time"),
+                            self.ts_start,
+                            self.ts_end,
+                        )
+                        return
 
-            for bgpelem in chain.from_iterable(
-                (iterator[2] for iterator in iterators_to_order)
-            ):
-                if self.ts_start <= bgpelem.time <= self.ts_end:
-                    yield bgpelem
-        finally:
-            self.cache_dir.cleanup()
+                    if rows:
+                        for row in rib_stream:
+                            if self.ts_start <= row[0] <= self.ts_end:
+                                yield row
+                        return
 
-    def _iter_live(self) -> Iterator[BGPElement]:
+                    for bgpelem in rib_stream:
+                        if self.ts_start <= bgpelem.time <= self.ts_end:
+                            yield bgpelem
+            finally:
+                self._release()
 
+    def _ris_live_stream(self) -> RISLiveStream:
         ris_collectors = [
             collector for collector in self.collectors if collector[:3] == "rrc"
         ]
+        return RISLiveStream(collectors=ris_collectors, filters=self.filters)
+
+    def _iter_live(self) -> Iterator[BGPElement]:
 
-        stream = RISLiveStream(collectors=ris_collectors, filters=self.filters)
+        stream = self._ris_live_stream()
 
         if self.jitter_buffer_delay is not None and self.jitter_buffer_delay > 0:
             stream = jitter_buffer_stream(stream, buffer_delay=self.jitter_buffer_delay)
@@ -481,6 +1247,228 @@ class BGPStream:
         for elem in stream:
             yield elem
 
+    # Asynchronous iteration (`async for elem in stream`). Mirrors the
+    # synchronous path: the downloads run on the running loop (the `Downloader`
+    # has no thread of its own) instead of a thread blocking on them, subprocess parsers
+    # are read with asyncio, and the other parsers (Python bindings, process
+    # pool) run in the default executor of the loop, a batch of elements at a time.
+
+    def __aiter__(self) -> AsyncIterator[BGPElement]:
+        """Iterate over the stream without blocking the running event loop.
+
+        Elements, order and filters are the same as with `for elem in stream`.
+
+        Examples:
+            ```python
+            async def main():
+                async for elem in BGPStream(...):
+                    await queue.put(elem)
+            ```
+        """
+        return self._aiter()
+
+    async def _aiter(self) -> AsyncIterator[BGPElement]:
+        intern = self._interner.element if self._interner is not None else None
+        if self.ts_start is None and self.ts_end is None:
+            stream = self._ris_live_stream()
+            if self.jitter_buffer_delay is not None and self.jitter_buffer_delay > 0:
+                stream = ajitter_buffer_stream(stream, buffer_delay=self.jitter_buffer_delay)
+            async with aclosing(aiter(stream)) as elements:
+                async for elem in elements:
+                    yield intern(elem) if intern else elem
+            return
+        # Nested generators are closed right away when the stream is closed early
+        async with aclosing(self._abatches()) as batches:
+            async for batch in batches:
+                if intern:
+                    batch = map(intern, batch)
+                for elem in batch:
+                    yield elem
+
+    async def _abatches(self) -> AsyncIterator[list[BGPElement]]:
+        """Batches of the stream's elements, in time order (async `_iter_update` and `_iter_rib`)"""
+        async with self._adownload_session():
+            try:
+                # Manager mode: spawn smaller worker streams to balance fetch/parse
+                if self.chunk_time:
+                    async with aclosing(self._aiter_chunks()) as batches:
+                        async for batch in batches:
+                            yield batch
+                    return
+
+                if self.paths is None:
+                    await self._afetch()
+
+                with self._parsing_pool() as pool:
+                    key = attrgetter("time")
+                    if "update" in self.data_type:
+                        # One source for each data_type * collector combinations, merged in time order
+                        sources = []
+                        for data_type in self.data_type:
+                            is_rib = data_type == "rib"
+                            for rc, paths in self.paths[data_type].items():
+                                if pool:
+                                    # Waits for downloads and pool results in the executor
+                                    chained = pool.chain(self._ready_jobs(paths, is_rib, rc))
+                                    if self.stats is not None:
+                                        chained = self.stats.timed_parse(chained)
+                                    sources.append(abatches(chained))
+                                else:
+                                    sources.append(
+                                        self._aparse([(path, is_rib, rc) for path in paths])
+                                    )
+                        merged = amerge(sources, key)
+                    else:
+                        ribs_to_order = [
+                            (dt_from_filepath(path), rc, path)
+                            for rc, paths in self.paths["rib"].items()
+                            for path in paths
+                        ]
+                        ribs_to_order.sort(key=itemgetter(0, 1))
+                        if pool:
+                            rib_stream = chain.from_iterable(
+                                pool.chain_all(
+                                    [
+                                        (path, True, rc, self._parser_for(path))
+                                        for _, rc, path in ribs
+                                        if self._is_ready(path)
+                                    ]
+                                )
+                                for _, ribs in groupby(ribs_to_order, key=itemgetter(0))
+                            )
+                            if self.stats is not None:
+                                rib_stream = self.stats.timed_parse(rib_stream)
+                            merged = abatches(rib_stream)
+                        else:
+                            # No merge: RIBs are already in time order
+                            merged = self._aparse([(path, True, rc) for _, rc, path in ribs_to_order])
+
+                    async with aclosing(merged) as batches:
+                        async for batch in batches:
+                            if self.stats is not None:
+                                batch = list(
+                                    self.stats.timed_merge(
+                                        iter(batch), key, self.ts_start, self.ts_end
+                                    )
+                                )
+                            else:
+                                batch = [
+                                    elem
+                                    for elem in batch
+                                    if self.ts_start <= elem.time <= self.ts_end
+                                ]
+                            if batch:
+                                yield batch
+            finally:
+                await self._arelease()
+
+    async def _aparse(self, jobs: list[tuple[str, bool, str]]) -> AsyncIterator[list[BGPElement]]:
+        """Batches of the elements of the (path, is_rib, collector) `jobs`, one file after the other.
+
+        Each file is parsed once it is on disk (skipped if its download failed).
+        """
+        for path, is_rib, rc in jobs:
+            ready = self._ready.get(path)
+            if ready is not None and not ready.done():
+                start = time.perf_counter()
+                await asyncio.wrap_future(ready)
+                if self.stats is not None:
+                    self.stats.add_time("wait", time.perf_counter() - start, 0.0)
+            if not self._is_ready(path):
+                continue
+            parser_cls = self._parser_for(path)
+            parser = parser_cls(path, is_rib, rc, filters=self.filters, fields=self.fields)
+            native = hasattr(parser, "_abatches")
+            if self.stats is not None and not native:
+                # Parsed in the executor: time it there
+                parser = self.stats.timed_parse(parser)
+            async with aclosing(abatches(parser)) as batches:
+                async for batch in batches:
+                    if self.stats is not None and native:
+                        self.stats.add(elements_parsed=len(batch))
+                    yield batch
+
+    async def _afetch(self):
+        """List this stream's files (in the executor), and await their downloads in a task."""
+        await asyncio.to_thread(self._list_files)
+        self._adownload = asyncio.create_task(self._adownload_files())
+
+    async def _adownload_files(self, after: list[asyncio.Future] = ()):
+        """`_download_files` for the running loop, once the `after` futures are done."""
+        if after:
+            await asyncio.wait(after)
+        with self._download_lock:
+            if self._closing or not self._downloads:
+                self._resolve_downloads(False)
+                return
+            self._downloading = threading.Event()
+        start = time.perf_counter()
+        # A task of the running loop (see _adownload_session)
+        done = self._downloader.submit(self._run_downloads())
+        try:
+            # Shielded: the downloads of a closed stream are cancelled by _release, which waits for them
+            await asyncio.shield(done)
+        finally:
+            if self.stats is not None:
+                self.stats.add_time("download", time.perf_counter() - start, 0.0)
+        if isinstance(self.cache_dir, CacheManager):
+            await asyncio.to_thread(self.cache_dir.evict)
+
+    async def _arelease(self):
+        """`_release` for streams iterated asynchronously, in the executor."""
+        download, self._adownload = self._adownload, None
+        if download is not None:
+            # Downloads in flight are stopped by _release, not by the task
+            download.cancel()
+        await asyncio.to_thread(self._release)
+        if download is not None:
+            await asyncio.wait([download])
+
+    async def _aiter_chunks(self) -> AsyncIterator[list[BGPElement]]:
+        """Manager mode of asynchronous iteration (see `_iter_chunks`).
+
+        Chunks are listed in the executor and downloaded by tasks of the running
+        loop, one chunk after the other, up to `prefetch_chunks` chunks ahead.
+        """
+        bounds = self._chunk_bounds()
+        pending = deque()
+        downloaded = None
+
+        def schedule(n):
+            nonlocal downloaded
+            for start, end in islice(bounds, n):
+                # remove one second because BGPKIT include border
+                worker = self._make_worker(start, end - 1)
+                listed = asyncio.ensure_future(asyncio.to_thread(worker._list_files))
+                # Chunks are downloaded one after the other
+                after = [listed] if downloaded is None else [listed, downloaded]
+                downloaded = asyncio.create_task(worker._adownload_files(after))
+                worker._adownload = downloaded
+                pending.append((start, end, worker, listed))
+
+        with self._parsing_pool():
+            try:
+                schedule(1 + self.prefetch_chunks)
+                while pending:
+                    start, end, worker, listed = pending[0]
+                    logging.info(
+                        f"Processing chunk: {datetime.datetime.fromtimestamp(start)} "
+                        f"to {datetime.datetime.fromtimestamp(end)}"
+                    )
+                    await listed
+                    # Keep the lookahead window full while this chunk is parsed
+                    schedule(1)
+                    async with aclosing(worker._abatches()) as batches:
+                        async for batch in batches:
+                            yield batch
+                    pending.popleft()
+            finally:
+                # Stream closed early: stop the downloads and drop their files
+                for *_, worker, listed in pending:
+                    # The listing thread cannot be interrupted: let it finish
+                    await asyncio.wait([listed])
+                    await worker._arelease()
+
     @classmethod
     def from_config(
         cls, config: BGPStreamConfig | LiveStreamConfig
@@ -528,6 +1516,18 @@ class BGPStream:
                     chunk_time=config.chunk_time.seconds if config.chunk_time else None,
                     ram_fetch=config.ram_fetch if config.ram_fetch else None,
                     parser_name=config.parser if config.parser else "pybgpkit",
+                    prefetch_chunks=config.prefetch_chunks,
+                    workers=config.workers,
+                    stream_downloads=config.stream_downloads,
+                    cache_decompressed=config.cache_decompressed,
+                    element_cache=config.element_cache,
+                    file_index=config.file_index,
+                    download_parts=config.download_parts,
+                    intern_attributes=config.intern_attributes,
+                    stats=config.stats,
+                    fields=config.fields,
+                    cache_max_size=config.cache_max_size,
+                    cache_eviction=config.cache_eviction,
                 )
             else:
                 return cls(
@@ -535,6 +1535,7 @@ class BGPStream:
                     data_type=["update"],
                     filters=config.filters if config.filters else FilterOptions(),
                     jitter_buffer_delay=10,
+                    intern_attributes=config.intern_attributes,
                 )
 
         elif isinstance(config, LiveStreamConfig):
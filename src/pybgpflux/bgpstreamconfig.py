@@ -4,29 +4,52 @@ import shutil
 from pydantic import BaseModel, Field, DirectoryPath, field_validator, model_validator
 from typing import Literal
 from ipaddress import IPv4Address, IPv6Address
+from pybgpflux.bgpelement import ElementField
 
 
 class FilterOptions(BaseModel):
-    """A unified model for the available filter options."""
+    """A unified model for the available filter options.
+
+    Options are combined with AND logic. List options match any of their values,
+    and are merged with their single-value counterpart (e.g. `origin_asn` and `origin_asns`).
+    """
 
     origin_asn: int | None = Field(
         default=None, description="Filter by the origin AS number."
     )
+    origin_asns: list[int] | None = Field(
+        default=None, description="Filter by a list of origin AS numbers (any of them)."
+    )
     prefix: str | None = Field(
         default=None, description="Filter by an exact prefix match."
     )
+    prefixes: list[str] | None = Field(
+        default=None, description="Filter by exact matches of a list of prefixes (any of them)."
+    )
     prefix_super: str | None = Field(
         default=None,
         description="Filter by the exact prefix and its more general super-prefixes.",
     )
+    prefixes_super: list[str] | None = Field(
+        default=None,
+        description="Filter by a list of prefixes and their super-prefixes (any of them).",
+    )
     prefix_sub: str | None = Field(
         default=None,
         description="Filter by the exact prefix and its more specific sub-prefixes.",
     )
+    prefixes_sub: list[str] | None = Field(
+        default=None,
+        description="Filter by a list of prefixes and their sub-prefixes (any of them).",
+    )
     prefix_super_sub: str | None = Field(
         default=None,
         description="Filter by the exact prefix and both its super- and sub-prefixes.",
     )
+    prefixes_super_sub: list[str] | None = Field(
+        default=None,
+        description="Filter by a list of prefixes and both their super- and sub-prefixes (any of them).",
+    )
     peer_ip: str | IPv4Address | IPv6Address | None = Field(
         default=None, description="Filter by the IP address of a single BGP peer."
     )
@@ -36,6 +59,9 @@ class FilterOptions(BaseModel):
     peer_asn: int | None = Field(
         default=None, description="Filter by the AS number of the BGP peer."
     )
+    peer_asns: list[int] | None = Field(
+        default=None, description="Filter by a list of BGP peer AS numbers (any of them)."
+    )
     update_type: Literal["withdraw", "announce"] | None = Field(
         default=None, description="Filter by the BGP update message type."
     )
@@ -45,6 +71,13 @@ class FilterOptions(BaseModel):
     ip_version: Literal[4, 6] | None = Field(
         default=None, description="Filter by ip version."
     )
+    communities: list[str] | None = Field(
+        default=None,
+        description=(
+            'Filter by BGP communities ("asn:value", "*" matches any asn or value): '
+            "elements carrying any of them."
+        ),
+    )
 
 
 class BGPStreamConfig(BaseModel):
@@ -66,12 +99,24 @@ class BGPStreamConfig(BaseModel):
 
     # --- Implementation parameters (optional) ---
     max_concurrent_downloads: int | None = Field(
-        default=10, description="Maximum concurrent downloads of archive files."
+        default=10, description="Maximum concurrent downloads of archive files from each archive host."
     )
     cache_dir: DirectoryPath | None = Field(
         default=None,
         description="Specifies the directory for caching downloaded files.",
     )
+    cache_max_size: int | None = Field(
+        default=None,
+        gt=0,
+        description=(
+            "Size budget of `cache_dir` in bytes. Beyond it, cached files are evicted according to `cache_eviction`."
+            "Default (None) never evicts."
+        ),
+    )
+    cache_eviction: Literal["lru", "lfu"] = Field(
+        default="lru",
+        description="Cache eviction policy: least recently used (`lru`) or least frequently used (`lfu`) files first.",
+    )
     ram_fetch: bool | None = Field(
         default=False,
         description=(
@@ -86,6 +131,82 @@ class BGPStreamConfig(BaseModel):
             "Lower value means less RAM/disk used at the cost of performance."
         ),
     )
+    prefetch_chunks: int | None = Field(
+        default=1,
+        ge=0,
+        description=(
+            "Number of upcoming chunks downloaded in the background while the current chunk is parsed (requires `chunk_time`)."
+            "Higher values hide more download time at the cost of RAM/disk used by prefetched files. 0 disables pipelining."
+        ),
+    )
+    workers: int | None = Field(
+        default=None,
+        ge=1,
+        description=(
+            "Number of worker processes parsing MRT files in parallel (elements are still merged in time order)."
+            "Default (None) parses in the current process. Not supported by the `pybgpstream` parser."
+        ),
+    )
+    stream_downloads: bool = Field(
+        default=False,
+        description=(
+            "Parse MRT files while they are downloaded (through a named pipe, POSIX only) instead of "
+            "after all downloads of a chunk have finished. Downloaded files are still cached."
+        ),
+    )
+    cache_decompressed: bool = Field(
+        default=False,
+        description=(
+            "Decompress MRT files in parallel background threads and keep the decompressed files "
+            "in the cache, so that later streams over the same files skip the decompression."
+        ),
+    )
+    element_cache: bool = Field(
+        default=False,
+        description=(
+            "Keep the parsed elements of each MRT file in `cache_dir`, in a binary columnar file "
+            "read back through a memory map by later streams with the same parser, filters and "
+            "fields (no download, decompression nor parsing). Requires `cache_dir`."
+        ),
+    )
+    file_index: bool = Field(
+        default=False,
+        description=(
+            "Summarize the peers, origin ASNs and prefixes of each MRT file of `cache_dir` the "
+            "first time it is parsed, and skip the files whose summary matches none of the "
+            "filters in later streams. Requires `cache_dir`."
+        ),
+    )
+    download_parts: int | None = Field(
+        default=1,
+        ge=1,
+        description=(
+            "Number of byte ranges of each large MRT file (32 MiB or more) downloaded in parallel. "
+            "Each range takes one of the `max_concurrent_downloads` slots of its host."
+        ),
+    )
+    intern_attributes: bool = Field(
+        default=False,
+        description=(
+            "Share the equal AS paths, communities (as tuples), next hops and peer addresses "
+            "of the elements through a bounded table, to cut the memory of buffered elements."
+        ),
+    )
+    stats: bool = Field(
+        default=False,
+        description=(
+            "Collect per-stage time (broker, download, parse, merge...) and counters in "
+            "`BGPStream.stats` (see `StreamStats`)."
+        ),
+    )
+    fields: list[ElementField] | None = Field(
+        default=None,
+        description=(
+            "Element fields built by the parsers (the others are None), e.g. ['prefix'] to "
+            "count prefixes per peer without extracting AS paths and communities. "
+            "None builds all of them."
+        ),
+    )
     parser: Literal["pybgpkit", "bgpkit", "pybgpstream", "bgpdump"] = Field(
         default="pybgpkit",
         description=(
@@ -0,0 +1,189 @@
+"""Local cache of BGPKIT broker query results."""
+
+import json
+import time
+import sqlite3
+import datetime
+import threading
+import logging
+from dataclasses import asdict
+
+from bgpkit.bgpkit_broker import BrokerItem
+
+# SQLite database stored inside the cache directory
+BROKER_CACHE_FILENAME = "pybgpflux-broker.sqlite"
+
+# Windows more recent than this are not considered complete (archives may still be filled)
+MIN_AGE = datetime.timedelta(hours=24).total_seconds()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    url TEXT PRIMARY KEY,
+    collector TEXT NOT NULL,
+    data_type TEXT NOT NULL,
+    ts_start REAL NOT NULL,
+    ts_end REAL NOT NULL,
+    item TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_window ON items (collector, data_type, ts_start);
+CREATE TABLE IF NOT EXISTS coverage (
+    collector TEXT NOT NULL,
+    data_type TEXT NOT NULL,
+    ts_start REAL NOT NULL,
+    ts_end REAL NOT NULL
+);
+"""
+
+
+def _timestamp(broker_time: str) -> float:
+    dt = datetime.datetime.fromisoformat(broker_time)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def _merge_intervals(intervals: list[tuple[float, float]]) -> list[tuple[float, float]]:
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _gaps(
+    covered: list[tuple[float, float]], ts_start: float, ts_end: float
+) -> list[tuple[float, float]]:
+    """Sub-windows of [ts_start, ts_end] not in the (merged) `covered` intervals."""
+    gaps = []
+    current = ts_start
+    for start, end in covered:
+        if end < current:
+            continue
+        if start > ts_end:
+            break
+        if start > current:
+            gaps.append((current, start))
+        current = max(current, end)
+    if current < ts_end:
+        gaps.append((current, ts_end))
+    return gaps
+
+
+class BrokerCache:
+    """Drop-in replacement for `bgpkit.Broker` that caches query results.
+
+    Results are stored per (collector, data_type) together with the time
+    windows they cover. A query is answered locally for the covered part of
+    its window and only the uncovered sub-windows are sent to the broker.
+    Windows younger than `min_age` are never recorded as covered, since new
+    archive files may still appear for them.
+
+    Results keep the order in which the broker listed the items (the order of
+    the collectors, and so the order of equal-time elements in a stream, is
+    the same as without the cache); items listed by successive queries come in
+    the order of these queries.
+
+    Args:
+        path: SQLite database path (":memory:" for a per-process cache).
+        broker: Object with a `bgpkit.Broker.query` compatible method, used on cache misses.
+        min_age: Age (seconds) below which a window is not cached. Default is 24 hours.
+    """
+
+    def __init__(self, path: str, broker, min_age: float = MIN_AGE):
+        self.broker = broker
+        self.min_age = min_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def _covered(self, collector: str, data_type: str) -> list[tuple[float, float]]:
+        rows = self._conn.execute(
+            "SELECT ts_start, ts_end FROM coverage WHERE collector = ? AND data_type = ?",
+            (collector, data_type),
+        ).fetchall()
+        return _merge_intervals(rows)
+
+    def _store(self, items: list[BrokerItem], collectors, data_type, gap):
+        with self._conn:
+            self._conn.executemany(
+                # Upsert: items already listed keep their rowid, i.e. their rank
+                "INSERT INTO items VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (url) DO UPDATE SET "
+                "collector = excluded.collector, data_type = excluded.data_type, "
+                "ts_start = excluded.ts_start, ts_end = excluded.ts_end, item = excluded.item",
+                [
+                    (
+                        item.url,
+                        item.collector_id,
+                        data_type,
+                        _timestamp(item.ts_start),
+                        _timestamp(item.ts_end),
+                        json.dumps(asdict(item)),
+                    )
+                    for item in items
+                ],
+            )
+            settled = min(gap[1], time.time() - self.min_age)
+            if settled > gap[0]:
+                for collector in collectors:
+                    # Rewrite this collector's coverage as merged intervals
+                    covered = _merge_intervals(
+                        self._covered(collector, data_type) + [(gap[0], settled)]
+                    )
+                    self._conn.execute(
+                        "DELETE FROM coverage WHERE collector = ? AND data_type = ?",
+                        (collector, data_type),
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO coverage VALUES (?, ?, ?, ?)",
+                        [(collector, data_type, start, end) for start, end in covered],
+                    )
+
+    def query(
+        self,
+        ts_start: int,
+        ts_end: int,
+        collector_id: str,
+        data_type: str,
+    ) -> list[BrokerItem]:
+        """Same as `bgpkit.Broker.query`, for the arguments used by `BGPStream`."""
+        collectors = collector_id.split(",")
+        ts_start, ts_end = float(ts_start), float(ts_end)
+
+        with self._lock:
+            # Collectors sharing the same missing windows are queried together
+            collectors_by_gaps = {}
+            for collector in collectors:
+                gaps = tuple(
+                    _gaps(self._covered(collector, data_type), ts_start, ts_end)
+                )
+                if gaps:
+                    collectors_by_gaps.setdefault(gaps, []).append(collector)
+
+            for gaps, gap_collectors in collectors_by_gaps.items():
+                for gap in gaps:
+                    logging.debug(
+                        f"Broker cache miss for {gap_collectors} {data_type} {gap}"
+                    )
+                    items = self.broker.query(
+                        ts_start=int(gap[0]),
+                        ts_end=int(gap[1]),
+                        collector_id=",".join(gap_collectors),
+                        data_type=data_type,
+                    )
+                    self._store(items, gap_collectors, data_type, gap)
+
+            rows = self._conn.execute(
+                "SELECT item FROM items WHERE data_type = ? "
+                f"AND collector IN ({','.join('?' * len(collectors))}) "
+                "AND ts_start <= ? AND ts_end >= ? ORDER BY rowid",
+                (data_type, *collectors, ts_end, ts_start),
+            ).fetchall()
+        return [BrokerItem(**json.loads(row[0])) for row in rows]
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,219 @@
+"""Persistent, size-bounded cache of MRT files, shared across runs and processes."""
+
+import os
+import time
+import sqlite3
+import logging
+from collections import Counter
+from contextlib import closing
+from typing import Literal, Iterable
+
+# SQLite index stored inside the cache directory
+INDEX_FILENAME = "pybgpflux-cache.sqlite"
+
+# Seconds to wait for another process holding the index lock
+LOCK_TIMEOUT = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    url TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    checksum TEXT,
+    added REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS pins (
+    filename TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (filename, pid)
+);
+"""
+
+EVICTION_ORDER = {
+    "lru": "last_access",
+    "lfu": "hits, last_access",
+}
+
+
+class CacheManager:
+    """Cache directory with an on-disk index and a size budget.
+
+    Every cached file is recorded in a SQLite index (url, size, checksum,
+    last access time, number of hits). When the total size exceeds `max_size`,
+    the least recently (`lru`) or least frequently (`lfu`) used files are
+    deleted. Index updates run in `BEGIN IMMEDIATE` transactions, i.e. under
+    SQLite's file lock, so several processes can share one cache directory.
+
+    Pinned files (files of the chunks being parsed or prefetched) are never
+    evicted. Pins are recorded in the index along with the pid of the process
+    holding them, so that they hold for every process sharing the cache; pins
+    of processes that are gone are dropped at eviction.
+
+    Args:
+        path: Cache directory.
+        max_size: Maximum total size of cached files, in bytes. None means unbounded.
+        eviction: Eviction policy, "lru" or "lfu".
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int | None = None,
+        eviction: Literal["lru", "lfu"] = "lru",
+    ):
+        if eviction not in EVICTION_ORDER:
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+        self.name = str(path)
+        self.max_size = max_size
+        self.eviction = eviction
+        self.index_path = os.path.join(self.name, INDEX_FILENAME)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per operation: the cache is used from download threads
+        return sqlite3.connect(
+            self.index_path, timeout=LOCK_TIMEOUT, isolation_level=None
+        )
+
+    def cleanup(self):
+        """No-op cleanup: cached files are only removed by eviction."""
+        pass
+
+    def lookup(self, url: str, filepath: str) -> bool:
+        """Return whether `url` is cached at `filepath`, and record the access.
+
+        Files present on disk but missing from the index (e.g. written by an
+        older version) are adopted.
+        """
+        if not os.path.exists(filepath):
+            return False
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            updated = conn.execute(
+                "UPDATE files SET last_access = ?, hits = hits + 1 WHERE url = ?",
+                (now, url),
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    "INSERT INTO files VALUES (?, ?, ?, NULL, ?, ?, 1)",
+                    (url, os.path.basename(filepath), os.path.getsize(filepath), now, now),
+                )
+            conn.execute("COMMIT")
+        return True
+
+    def add(self, url: str, filepath: str, checksum: str | None = None):
+        """Record a newly downloaded file."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (url, os.path.basename(filepath), os.path.getsize(filepath), checksum, now, now),
+            )
+            conn.execute("COMMIT")
+
+    def checksum(self, url: str) -> str | None:
+        """Checksum recorded for `url` when it was downloaded (None if unknown)."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT checksum FROM files WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def pin(self, paths: Iterable[str]):
+        """Protect `paths` from eviction, by any process, until they are unpinned."""
+        counts = Counter(os.path.basename(path) for path in paths)
+        if not counts:
+            return
+        pid = os.getpid()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO pins VALUES (?, ?, ?) ON CONFLICT (filename, pid) "
+                "DO UPDATE SET count = count + excluded.count",
+                [(filename, pid, count) for filename, count in counts.items()],
+            )
+            conn.execute("COMMIT")
+
+    def unpin(self, paths: Iterable[str]):
+        counts = Counter(os.path.basename(path) for path in paths)
+        if not counts:
+            return
+        pid = os.getpid()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE pins SET count = count - ? WHERE filename = ? AND pid = ?",
+                [(count, filename, pid) for filename, count in counts.items()],
+            )
+            conn.execute("DELETE FROM pins WHERE count <= 0")
+            conn.execute("COMMIT")
+
+    def _pinned(self, conn: sqlite3.Connection) -> set[str]:
+        """Filenames pinned by live processes (pins of dead ones are dropped)."""
+        pids = [pid for (pid,) in conn.execute("SELECT DISTINCT pid FROM pins")]
+        dead = [(pid,) for pid in pids if not _is_alive(pid)]
+        if dead:
+            conn.executemany("DELETE FROM pins WHERE pid = ?", dead)
+        return {filename for (filename,) in conn.execute("SELECT filename FROM pins")}
+
+    def size(self) -> int:
+        """Total size of the indexed files, in bytes."""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+
+    def evict(self) -> list[str]:
+        """Delete cached files (except pinned ones) until the cache fits in `max_size`.
+
+        Returns:
+            list[str]: Paths of the evicted files.
+        """
+        if self.max_size is None:
+            return []
+        evicted = []
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            keep = self._pinned(conn)
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+            if total > self.max_size:
+                candidates = conn.execute(
+                    "SELECT url, filename, size FROM files "
+                    f"ORDER BY {EVICTION_ORDER[self.eviction]}"
+                ).fetchall()
+                for url, filename, size in candidates:
+                    if total <= self.max_size:
+                        break
+                    if filename in keep:
+                        continue
+                    filepath = os.path.join(self.name, filename)
+                    try:
+                        os.remove(filepath)
+                    except FileNotFoundError:
+                        pass
+                    conn.execute("DELETE FROM files WHERE url = ?", (url,))
+                    total -= size
+                    evicted.append(filepath)
+            conn.execute("COMMIT")
+        if evicted:
+            logging.info(f"Evicted {len(evicted)} files from cache {self.name}")
+        if total > self.max_size:
+            logging.warning(
+                f"Cache {self.name} holds {total} bytes, above its {self.max_size} bytes budget"
+            )
+        return evicted
+
+
+def _is_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill would terminate the process: keep its pins
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -51,30 +51,65 @@ def main():
         default=None,
         help="Filter by the origin AS number.",
     )
+    parser.add_argument(
+        "--origin-asns",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Filter by a list of origin AS numbers (any of them).",
+    )
     parser.add_argument(
         "--prefix",
         type=str,
         default=None,
         help="Filter by an exact prefix match.",
     )
+    parser.add_argument(
+        "--prefixes",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Filter by exact matches of a list of prefixes (any of them).",
+    )
     parser.add_argument(
         "--prefix-super",
         type=str,
         default=None,
         help="Filter by the exact prefix and its more general super-prefixes.",
     )
+    parser.add_argument(
+        "--prefixes-super",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Filter by a list of prefixes and their super-prefixes (any of them).",
+    )
     parser.add_argument(
         "--prefix-sub",
         type=str,
         default=None,
         help="Filter by the exact prefix and its more specific sub-prefixes.",
     )
+    parser.add_argument(
+        "--prefixes-sub",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Filter by a list of prefixes and their sub-prefixes (any of them).",
+    )
     parser.add_argument(
         "--prefix-super-sub",
         type=str,
         default=None,
         help="Filter by the exact prefix and both its super- and sub-prefixes.",
     )
+    parser.add_argument(
+        "--prefixes-super-sub",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Filter by a list of prefixes and both their super- and sub-prefixes (any of them).",
+    )
     parser.add_argument(
         "--peer-ip",
         type=str,  # Note: argparse does not directly handle Union types, so we use string here.
@@ -94,6 +129,13 @@ def main():
         default=None,
         help="Filter by the AS number of the BGP peer.",
     )
+    parser.add_argument(
+        "--peer-asns",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Filter by a list of BGP peer AS numbers (any of them).",
+    )
     parser.add_argument(
         "--update-type",
         type=str,
@@ -107,6 +149,13 @@ def main():
         default=None,
         help="Filter by a regular expression matching the AS path.",
     )
+    parser.add_argument(
+        "--communities",
+        type=str,
+        nargs="+",
+        default=None,
+        help='Filter by BGP communities ("asn:value", "*" matches any asn or value).',
+    )
 
     # PyBGPStream implementation parameters
     parser.add_argument(
@@ -115,26 +164,90 @@ def main():
         default=None,
         help="Directory for caching downloaded files.",
     )
+    parser.add_argument(
+        "--cache-max-size",
+        type=int,
+        default=None,
+        help="Size budget of the cache directory in bytes (least recently used files are evicted).",
+    )
     parser.add_argument(
         "--parser",
         type=str,
         choices=["pybgpkit", "bgpkit", "pybgpstream", "bgpdump"],
         default="pybgpkit",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of processes parsing MRT files in parallel.",
+    )
+    parser.add_argument(
+        "--stream-downloads",
+        action="store_true",
+        help="Parse MRT files while they are downloaded.",
+    )
+    parser.add_argument(
+        "--cache-decompressed",
+        action="store_true",
+        help="Keep decompressed MRT files in the cache (decompressed in parallel).",
+    )
+    parser.add_argument(
+        "--element-cache",
+        action="store_true",
+        help="Keep the parsed elements in the cache, for later runs with the same filters.",
+    )
+    parser.add_argument(
+        "--file-index",
+        action="store_true",
+        help="Summarize cached MRT files, and skip the ones the filters rule out in later runs.",
+    )
+    parser.add_argument(
+        "--download-parts",
+        type=int,
+        default=1,
+        help="Download large MRT files in this many parallel byte ranges.",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print per-stage time and counters to stderr at the end of the stream.",
+    )
+    parser.add_argument(
+        "--stats-openmetrics",
+        type=str,
+        default=None,
+        help="Write the stats to this file in the OpenMetrics (Prometheus) text format.",
+    )
+    parser.add_argument(
+        "--fields",
+        type=str,
+        nargs="+",
+        choices=["prefix", "next_hop", "as_path", "communities"],
+        default=None,
+        help="Element fields to extract (the others are printed as None). Default: all of them.",
+    )
 
     args = parser.parse_args()
 
     filter_options = FilterOptions(
         origin_asn=args.origin_asn,
+        origin_asns=args.origin_asns,
         prefix=args.prefix,
+        prefixes=args.prefixes,
         prefix_super=args.prefix_super,
+        prefixes_super=args.prefixes_super,
         prefix_sub=args.prefix_sub,
+        prefixes_sub=args.prefixes_sub,
         prefix_super_sub=args.prefix_super_sub,
+        prefixes_super_sub=args.prefixes_super_sub,
         peer_ip=args.peer_ip,
         peer_ips=args.peer_ips,
         peer_asn=args.peer_asn,
+        peer_asns=args.peer_asns,
         update_type=args.update_type,
         as_path=args.as_path,
+        communities=args.communities,
     )
 
     # Convert filter to None if all filter attributes are None
@@ -148,15 +261,32 @@ def main():
         data_types=args.data_types,
         filters=filter_options,
         cache_dir=args.cache_dir,
+        cache_max_size=args.cache_max_size,
         parser=args.parser,
+        workers=args.workers,
+        stream_downloads=args.stream_downloads,
+        cache_decompressed=args.cache_decompressed,
+        element_cache=args.element_cache,
+        file_index=args.file_index,
+        download_parts=args.download_parts,
+        stats=args.stats or args.stats_openmetrics is not None,
+        fields=args.fields,
     )
 
+    stream = None
     try:
-        for element in BGPStream.from_config(config):
+        stream = BGPStream.from_config(config)
+        for element in stream:
             print(element)
     except Exception as e:
         print(f"An error occurred during streaming: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if stream is not None and args.stats:
+            print(stream.stats.summary(), file=sys.stderr)
+        if stream is not None and args.stats_openmetrics:
+            with open(args.stats_openmetrics, "w") as f:
+                f.write(stream.stats.to_openmetrics())
 
 
 if __name__ == "__main__":
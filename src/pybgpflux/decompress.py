@@ -0,0 +1,60 @@
+"""Decompressed tier of the file cache (see `BGPStream(cache_decompressed=True)`).
+
+MRT archives are bz2 or gz compressed, and parsers decompress them on the fly,
+in the parsing thread, at every cache hit. With the decompressed tier, each
+file is decompressed once, in a thread of its own (`bz2` and `zlib` release
+the GIL), next to its compressed version in the cache. Parsers read the raw
+MRT file.
+"""
+
+import bz2
+import gzip
+import os
+import shutil
+import threading
+
+# Compression extension -> opener
+DECOMPRESSORS = {".bz2": bz2.open, ".gz": gzip.open}
+
+# Extension of decompressed files (no compression extension: parsers read them as raw MRT)
+DECOMPRESSED_EXT = ".mrt"
+
+# Key of decompressed files in the `CacheManager` index: the URL of the archive plus this suffix
+DECOMPRESSED_KEY_SUFFIX = "#decompressed"
+
+BLOCK_SIZE = 1 << 20
+
+
+def decompressed_filepath(filepath: str) -> str:
+    """Path of the decompressed version of `filepath`
+
+    Examples:
+        ```python
+        decompressed_filepath("cache/cache-rib.20100901.0000.1a2b3c4d.bz2")
+        # "cache/cache-rib.20100901.0000.1a2b3c4d.mrt"
+        ```
+    """
+    root, ext = os.path.splitext(filepath)
+    if ext not in DECOMPRESSORS:
+        raise ValueError(f"Unknown compression extension: {filepath}")
+    return root + DECOMPRESSED_EXT
+
+
+def decompress_file(src: str, dst: str, block_size: int = BLOCK_SIZE) -> int:
+    """Decompress `src` into `dst` (written atomically).
+
+    Returns:
+        int: Size of the decompressed file, in bytes.
+    """
+    opener = DECOMPRESSORS[os.path.splitext(src)[1]]
+    # One temporary file per process and thread: several may decompress the same file
+    temp_filepath = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with opener(src, "rb") as fin, open(temp_filepath, "wb") as fout:
+            shutil.copyfileobj(fin, fout, block_size)
+        os.replace(temp_filepath, dst)
+    except BaseException:
+        if os.path.exists(temp_filepath):
+            os.remove(temp_filepath)
+        raise
+    return os.path.getsize(dst)
@@ -0,0 +1,395 @@
+"""HTTP downloads of archive files (see `BGPStream._prefetch_data`).
+
+A `Downloader` keeps one aiohttp session, and thus its pool of open
+connections, for a whole iteration of a stream: chunk workers share it
+instead of paying new TCP and TLS handshakes for each chunk. It runs on an
+event loop of its own, in a background thread.
+
+Concurrency is limited per archive host (RouteViews, RIS, ...) by a
+`HostLimiter`, whose window adapts to the responses of the host: halved
+when it asks to slow down (429 or 503, honoring Retry-After) or stops
+answering, increased back by one per window of fast responses.
+
+Files are fetched as one or more `Part`s (byte ranges). A failed request
+resumes after the bytes already written with an HTTP Range request, instead
+of downloading the file again from its first byte.
+"""
+
+import asyncio
+import email.utils
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future
+from typing import Coroutine, Mapping
+from urllib.parse import urlsplit
+
+import aiofiles
+import aiohttp
+
+# Status codes of a host asking its clients to slow down
+THROTTLE_STATUSES = frozenset({429, 503})
+
+# Responses slower than this factor times the fastest one of the host do not grow its window
+LATENCY_FACTOR = 3.0
+
+# Idle connections are kept open this long (seconds) for the next chunk
+KEEPALIVE_TIMEOUT = 60
+
+# Size of the reads from the responses
+CHUNK_SIZE = 32768
+
+# Files smaller than this are fetched in a single part (see `split_parts`)
+PARTS_MIN_SIZE = 32 << 20
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class DownloadError(aiohttp.ClientError):
+    """A response that cannot complete the file (unexpected size, ranges not supported).
+
+    Retried like the other client errors, from the first byte.
+    """
+
+
+class Part:
+    """Byte range [start, end) of a file being downloaded, and its progress.
+
+    The first `done` bytes of the part are on disk. `end` is None for a
+    single part whose size is unknown until the response. `checksum` is the
+    crc32 of the bytes on disk for a single part (None for the parts of a
+    file fetched in parallel ranges).
+    """
+
+    def __init__(self, start: int = 0, end: int | None = None):
+        self.start = start
+        self.end = end
+        self.done = 0
+        self.checksum = 0 if end is None else None
+        # Size of the whole file, as announced by the server
+        self.total: int | None = None
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None and self.start + self.done >= self.end
+
+    def advance(self, chunk: bytes):
+        self.done += len(chunk)
+        if self.checksum is not None:
+            self.checksum = zlib.crc32(chunk, self.checksum)
+
+    def reset(self):
+        self.done = 0
+        if self.checksum is not None:
+            self.checksum = 0
+
+
+def split_parts(size: int | None, parts: int) -> list[Part]:
+    """Split a file of `size` bytes in up to `parts` ranges fetched in parallel.
+
+    Files of unknown size, or smaller than `PARTS_MIN_SIZE`, are a single part.
+    """
+    if size is None or parts <= 1 or size < PARTS_MIN_SIZE:
+        return [Part()]
+    step = -(-size // parts)
+    return [Part(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def file_crc32(filepath: str, block_size: int = 1 << 20) -> int:
+    checksum = 0
+    with open(filepath, "rb") as f:
+        while block := f.read(block_size):
+            checksum = zlib.crc32(block, checksum)
+    return checksum
+
+
+def retry_after(headers: Mapping[str, str] | None) -> float | None:
+    """Delay (seconds) asked by the Retry-After header of a response, if any."""
+    value = headers.get("Retry-After") if headers else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class HostLimiter:
+    """Adaptive limit of the concurrent requests to one host (AIMD).
+
+    Requests get a slot with `acquire` and give it back with `release`, in
+    first come first served order. The window starts at `limit` slots:
+
+    - `throttled` halves it (down to one slot), and pauses the host for the
+      Retry-After delay if one is given.
+    - `responded` grows it by one slot per window of responses (up to
+      `limit`), unless the response was slow compared to the fastest one of
+      the host: a growing latency means the host is busy enough.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.window = float(limit)
+        self.active = 0
+        # Loop time before which no request starts (Retry-After)
+        self.resume_at = 0.0
+        # Fastest response of the host, seconds
+        self.fastest: float | None = None
+        self._waiters: deque[asyncio.Future] = deque()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _free(self) -> bool:
+        return self.active < max(1, int(self.window))
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        if not self._waiters and self._free() and self.resume_at <= loop.time():
+            self.active += 1
+            return
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        self._wake()
+        try:
+            # The slot is taken by _wake when the waiter is resolved
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                self._waiters.remove(waiter)
+            else:
+                self.release()
+            raise
+
+    def release(self):
+        self.active -= 1
+        self._wake()
+
+    def responded(self, latency: float):
+        """Record a successful response, received `latency` seconds after the request."""
+        if self.fastest is None or latency < self.fastest:
+            self.fastest = latency
+        if latency <= LATENCY_FACTOR * self.fastest:
+            self.window = min(float(self.limit), self.window + 1 / self.window)
+            self._wake()
+
+    def throttled(self, delay: float | None = None):
+        """Record a request the host turned down (or left unanswered), pausing it for `delay` seconds."""
+        self.window = max(1.0, self.window / 2)
+        if delay:
+            loop = asyncio.get_running_loop()
+            self.resume_at = max(self.resume_at, loop.time() + delay)
+
+    def _wake(self):
+        loop = asyncio.get_running_loop()
+        delay = self.resume_at - loop.time()
+        if delay > 0:
+            if self._timer is None:
+                self._timer = loop.call_later(delay, self._resume)
+            return
+        while self._waiters and self._free():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    def _resume(self):
+        self._timer = None
+        self._wake()
+
+
+class Downloader:
+    """An aiohttp session and the `HostLimiter` of each host, on an event loop running in a thread.
+
+    The loop is started by the first `submit`, and stopped by `close`. With
+    `loop`, the running loop of an asynchronous iteration, coroutines run as
+    tasks of that loop instead (no thread): `submit` must be called from it,
+    and the downloader is closed by `aclose`.
+
+    Args:
+        max_per_host: Maximum concurrent downloads from each host.
+        loop: Event loop running the downloads (default: a loop in a thread).
+    """
+
+    def __init__(self, max_per_host: int, loop: asyncio.AbstractEventLoop | None = None):
+        self.max_per_host = max_per_host
+        self.limiters: dict[str, HostLimiter] = {}
+        self._loop = loop
+        self._owns_loop = loop is None
+        self._thread: threading.Thread | None = None
+        self._session: aiohttp.ClientSession | None = None
+        self._lock = threading.Lock()
+
+    def limiter(self, url: str) -> HostLimiter:
+        """Limiter of the host of `url`"""
+        host = urlsplit(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = HostLimiter(self.max_per_host)
+        return self.limiters[host]
+
+    def submit(self, coro: Coroutine) -> Future | asyncio.Task:
+        """Run `coro` on the downloader's loop (a task of the caller's loop with `loop`)."""
+        if not self._owns_loop:
+            return self._loop.create_task(coro)
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="pybgpflux-download", daemon=True
+                )
+                self._thread.start()
+            return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def session(self) -> aiohttp.ClientSession:
+        """The session of the downloader (from its loop)"""
+        if self._session is None:
+            timeout = aiohttp.ClientTimeout(total=None, sock_read=300)
+            # No global limit: the limiters bound each host
+            connector = aiohttp.TCPConnector(limit=0, keepalive_timeout=KEEPALIVE_TIMEOUT)
+            # Archives are stored as sent: no Content-Encoding decoding
+            self._session = aiohttp.ClientSession(
+                timeout=timeout, connector=connector, auto_decompress=False
+            )
+        return self._session
+
+    async def _close_session(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def aclose(self):
+        """Close the session of a downloader running on the caller's loop."""
+        await self._close_session()
+        self.limiters = {}
+
+    def close(self):
+        """Close the session and stop the loop (submitted coroutines must be over)."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close_session(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+        self.limiters = {}
+
+
+async def fetch_part(
+    session: aiohttp.ClientSession,
+    limiter: HostLimiter,
+    url: str,
+    filepath: str,
+    part: Part,
+):
+    """Write the missing bytes of `part` of `url` to `filepath` (which must exist), in a slot of `limiter`.
+
+    Resumes after the bytes of the part already on disk, with an HTTP Range
+    request. The errors of the request are raised, after recording the
+    throttling ones in `limiter`: the bytes received so far are kept.
+    """
+    position = part.start + part.done
+    headers = {}
+    if position > 0 or part.end is not None:
+        last = "" if part.end is None else part.end - 1
+        headers["Range"] = f"bytes={position}-{last}"
+    await limiter.acquire()
+    try:
+        start = time.perf_counter()
+        async with session.get(url, headers=headers) as resp:
+            if resp.status == 416:
+                # Nothing left after `position`: the received bytes (or the file
+                # size the ranges were split from) cannot be trusted
+                part.reset()
+                raise DownloadError(f"Range of {url} not satisfiable")
+            resp.raise_for_status()
+            limiter.responded(time.perf_counter() - start)
+
+            if resp.status == 206:
+                match = _CONTENT_RANGE.match(resp.headers.get("Content-Range", ""))
+                if match is None or int(match[1]) != position:
+                    raise DownloadError(f"Unexpected range of {url}")
+                part.total = int(match[3])
+            elif headers and part.end is not None:
+                raise DownloadError(f"{url} does not support range requests")
+            else:
+                # The whole file (the server may ignore the range of a resumed download)
+                part.reset()
+                position = 0
+                part.total = resp.content_length
+
+            async with aiofiles.open(filepath, "r+b") as fd:
+                await fd.seek(position)
+                if part.end is None:
+                    await fd.truncate()
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    await fd.write(chunk)
+                    part.advance(chunk)
+        if part.end is None:
+            part.end = part.start + part.done
+    except DownloadError:
+        raise
+    except aiohttp.ClientResponseError as e:
+        if e.status in THROTTLE_STATUSES:
+            # The host asks to slow down: shrink its window (and pause it)
+            limiter.throttled(retry_after(e.headers))
+        raise
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        # Connection errors and timeouts
+        limiter.throttled()
+        raise
+    finally:
+        limiter.release()
+
+
+async def fetch_parts(
+    session: aiohttp.ClientSession,
+    limiter: HostLimiter,
+    url: str,
+    filepath: str,
+    parts: list[Part],
+):
+    """Fetch the missing bytes of `parts` concurrently (see `fetch_part`).
+
+    Raises the first error once all the requests are over, so that the other
+    parts keep what they received.
+    """
+    results = await asyncio.gather(
+        *(fetch_part(session, limiter, url, filepath, part) for part in parts if not part.complete),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+def check_size(filepath: str, parts: list[Part], expected: int | None) -> int:
+    """Size of a downloaded file, checked against the size of the whole file announced
+    by the server. Raises `DownloadError` on mismatch.
+
+    The `expected` size (broker metadata) may be stale: it is only checked when the
+    server announced no size, and a disagreement with the server is logged.
+    """
+    size = os.path.getsize(filepath)
+    total = parts[0].total
+    if total is None:
+        reference, source = expected, "broker"
+    else:
+        reference, source = total, "server"
+        if expected is not None and expected != total:
+            logging.warning(
+                f"Size of {filepath} is {total} bytes on the server, {expected} in the broker: "
+                "keeping the server's"
+            )
+    if reference is not None and size != reference:
+        raise DownloadError(f"Size of {filepath} is {size} bytes, {reference} expected ({source})")
+    return size
@@ -0,0 +1,303 @@
+"""Cache of parsed elements (see `BGPStream(element_cache=True)`).
+
+The elements of an MRT file, as produced by a parser with given filters and
+fields, are written to an element file next to the MRT file in the cache.
+Later streams over the same file read it back through `mmap` instead of
+downloading, decompressing and parsing the MRT file again.
+
+Element files are a sequence of blocks of up to `BLOCK_ROWS` elements, laid
+out like `ElementBatch` columns: numeric columns are raw arrays read without
+copy, string columns are dictionary-encoded per block.
+
+```
+magic | header length (uint32) | header (JSON)
+block: rows (uint32) | time (float64) | type (uint8) | peer_asn (uint32)
+       | per string column: codes (uint32) | values length (uint32) | values (JSON)
+...
+end: rows = 0
+```
+"""
+
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+import zlib
+from importlib import metadata
+from typing import Iterable, Iterator
+
+from pybgpflux.batch import TYPES, UINT32, ElementBatch, ElementRow, row_to_element
+from pybgpflux.bgpelement import BGPElement
+from pybgpflux.bgpparser import (
+    BGPdumpParser,
+    BGPKITParser,
+    BGPParser,
+    PyBGPKITParser,
+    PyBGPStreamParser,
+)
+from pybgpflux.bgpstreamconfig import FilterOptions
+from pybgpflux.cache import CacheManager
+
+MAGIC = b"PBFXELEM"
+# Bumped whenever the layout or the parsers' output changes: older element files are ignored
+FORMAT_VERSION = 1
+
+ELEMENTS_EXT = ".elements"
+
+# Key of element files in the `CacheManager` index: the URL of the archive plus this suffix and the variant
+ELEMENTS_KEY_SUFFIX = "#elements."
+
+BLOCK_ROWS = 65536
+
+STRING_COLUMNS = ("collector", "peer_address", "prefix", "next_hop", "as_path", "communities")
+
+_UINT32 = struct.Struct("<I")
+
+
+def _pad(offset: int, alignment: int = 8) -> int:
+    return -offset % alignment
+
+
+def parser_version(parser_cls: type[BGPParser]) -> str:
+    """Version of the code behind `parser_cls`: package version, or executable size and mtime"""
+    if parser_cls is PyBGPKITParser:
+        return metadata.version("pybgpkit")
+    if parser_cls is PyBGPStreamParser:
+        return metadata.version("pybgpstream")
+    executable = {BGPKITParser: "bgpkit-parser", BGPdumpParser: "bgpdump"}.get(parser_cls)
+    path = shutil.which(executable) if executable else None
+    if path is None:
+        return "unknown"
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def element_variant(
+    parser_cls: type[BGPParser], filters: FilterOptions | None, fields: Iterable[str] | None
+) -> str:
+    """Identify the elements produced by `parser_cls` with `filters` and `fields`.
+
+    Element files of a variant are only read back by streams of the same variant.
+    """
+    try:
+        version = metadata.version("pybgpflux")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    key = json.dumps(
+        [
+            FORMAT_VERSION,
+            version,
+            parser_cls.__name__,
+            parser_version(parser_cls),
+            filters.model_dump(mode="json", exclude_none=True) if filters else {},
+            sorted(fields) if fields is not None else None,
+        ],
+        sort_keys=True,
+    )
+    return f"{zlib.crc32(key.encode()) & 0xFFFFFFFF:08x}"
+
+
+def elements_filepath(filepath: str, variant: str) -> str:
+    """Path of the element file of the MRT file `filepath` (compressed or not)
+
+    Examples:
+        ```python
+        elements_filepath("cache/cache-rib.20100901.0000.1a2b3c4d.bz2", "5e6f7a8b")
+        # "cache/cache-rib.20100901.0000.1a2b3c4d.5e6f7a8b.elements"
+        ```
+    """
+    return f"{os.path.splitext(filepath)[0]}.{variant}{ELEMENTS_EXT}"
+
+
+def read_header(filepath: str) -> dict | None:
+    """Header of an element file, None if it is not a complete element file of this version."""
+    try:
+        with open(filepath, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (length,) = _UINT32.unpack(f.read(_UINT32.size))
+            header = json.loads(f.read(length))
+    except (OSError, ValueError, struct.error):
+        return None
+    if header.get("version") != FORMAT_VERSION:
+        return None
+    return header
+
+
+def _encode_block(rows: list[ElementRow]) -> bytes:
+    batch = ElementBatch(rows)
+    parts = [_UINT32.pack(len(batch))]
+    offset = _UINT32.size
+
+    def add(data: bytes):
+        nonlocal offset
+        parts.append(data)
+        offset += len(data)
+        padding = _pad(offset)
+        parts.append(b"\0" * padding)
+        offset += padding
+
+    add(b"")
+    add(batch.time.tobytes())
+    add(batch.type.tobytes())
+    add(batch.peer_asn.tobytes())
+    for name in STRING_COLUMNS:
+        column = getattr(batch, name)
+        values = json.dumps(column.values).encode()
+        add(column.codes.tobytes())
+        add(_UINT32.pack(len(values)) + values)
+    return b"".join(parts)
+
+
+def write_elements(
+    rows: Iterable[ElementRow],
+    filepath: str,
+    checksum: str | None = None,
+    cache_dir: str | None = None,
+    key: str | None = None,
+) -> Iterator[ElementRow]:
+    """Yield `rows`, writing them to the element file `filepath` on the way.
+
+    The file is written atomically once `rows` is exhausted: a parser failing,
+    or a stream closed early, leaves no element file behind.
+
+    Args:
+        rows: Rows of one MRT file.
+        filepath: Element file to write.
+        checksum: Checksum of the MRT file, recorded in the header (see `read_header`).
+        cache_dir: `CacheManager` directory whose index records the element file
+            under `key`, so that it counts in the cache budget.
+        key: Key of the element file in the index (see `ELEMENTS_KEY_SUFFIX`).
+    """
+    # One temporary file per process and thread: several may parse the same file
+    temp_filepath = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    header = json.dumps({"version": FORMAT_VERSION, "checksum": checksum}).encode()
+    try:
+        with open(temp_filepath, "wb") as f:
+            f.write(MAGIC + _UINT32.pack(len(header)) + header)
+            f.write(b"\0" * _pad(f.tell()))
+            block = []
+            for row in rows:
+                block.append(row)
+                yield row
+                if len(block) == BLOCK_ROWS:
+                    f.write(_encode_block(block))
+                    block = []
+            if block:
+                f.write(_encode_block(block))
+            f.write(_UINT32.pack(0))
+        os.replace(temp_filepath, filepath)
+        if cache_dir is not None:
+            CacheManager(cache_dir).add(key, filepath, checksum=checksum)
+    finally:
+        if os.path.exists(temp_filepath):
+            os.remove(temp_filepath)
+
+
+def read_elements(filepath: str) -> Iterator[ElementRow]:
+    """Yield the rows of an element file, through a memory map of the file."""
+    with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        # Views of the current block, released before the map is closed
+        views = []
+
+        def column(offset: int, count: int, itemsize: int, typecode: str) -> memoryview:
+            data = view[offset : offset + count * itemsize].cast(typecode)
+            views.append(data)
+            return data
+
+        try:
+            (length,) = _UINT32.unpack_from(view, len(MAGIC))
+            offset = len(MAGIC) + _UINT32.size + length
+            offset += _pad(offset)
+            while count := _UINT32.unpack_from(view, offset)[0]:
+                offset += 8
+                columns = []
+                for itemsize, typecode in ((8, "d"), (1, "B"), (4, UINT32)):
+                    columns.append(column(offset, count, itemsize, typecode))
+                    offset += count * itemsize
+                    offset += _pad(offset)
+                for _ in STRING_COLUMNS:
+                    codes = column(offset, count, 4, UINT32)
+                    offset += count * 4
+                    offset += _pad(offset)
+                    (size,) = _UINT32.unpack_from(view, offset)
+                    start = offset + _UINT32.size
+                    values = json.loads(bytes(view[start : start + size]))
+                    offset = start + size
+                    offset += _pad(offset)
+                    columns.append(map(values.__getitem__, codes))
+                times, types, peer_asns, collectors, *columns = columns
+                yield from zip(
+                    times, map(TYPES.__getitem__, types), collectors, peer_asns, *columns
+                )
+                del times, types, peer_asns, collectors, columns
+                for data in views:
+                    data.release()
+                views.clear()
+        finally:
+            for data in views:
+                data.release()
+            view.release()
+
+
+class ElementFileParser(BGPParser):
+    """Read the elements of an element file, as a parser would yield them.
+
+    Element files hold the output of a parser with the filters and fields of
+    their variant: `filters` and `fields` are not applied again.
+    """
+
+    def __init__(self, filepath, is_rib, collector, filters=None, fields=None):
+        self.filepath = filepath
+        self.is_rib = is_rib
+        self.collector = collector
+        self.filters = filters
+
+    def __iter__(self) -> Iterator[BGPElement]:
+        return map(row_to_element, read_elements(self.filepath))
+
+    def iter_rows(self) -> Iterator[ElementRow]:
+        return read_elements(self.filepath)
+
+
+class CachingParser(BGPParser):
+    """Parse with `parser_cls`, and write the rows to the element file `elements_path`.
+
+    The element file is recorded under `key` in the index of the cache
+    directory `cache_dir` (a path, so that pool workers can record it too).
+    Bind the first arguments (e.g. `functools.partial`) to use it as a parser class.
+    """
+
+    def __init__(
+        self,
+        parser_cls: type[BGPParser],
+        elements_path: str,
+        checksum: str | None,
+        cache_dir: str | None,
+        key: str | None,
+        filepath,
+        is_rib,
+        collector,
+        filters=None,
+        fields=None,
+    ):
+        self.parser = parser_cls(filepath, is_rib, collector, filters=filters, fields=fields)
+        self.elements_path = elements_path
+        self.checksum = checksum
+        self.cache_dir = cache_dir
+        self.key = key
+        self.filepath = filepath
+        self.is_rib = is_rib
+        self.collector = collector
+        self.filters = filters
+
+    def __iter__(self) -> Iterator[BGPElement]:
+        return map(row_to_element, self.iter_rows())
+
+    def iter_rows(self) -> Iterator[ElementRow]:
+        return write_elements(
+            self.parser.iter_rows(), self.elements_path, self.checksum, self.cache_dir, self.key
+        )
@@ -0,0 +1,192 @@
+"""Per-file summaries of cached MRT files (see `BGPStream(file_index=True)`).
+
+The first time a cached MRT file is parsed, the peers, origin ASNs and
+prefixes of its elements are written to a summary file next to it. Later
+filtered streams read the summary first, and skip the files that cannot
+hold a matching element: no download, decompression or parsing.
+
+Summaries list the distinct values of the whole file, so that any filter can
+be checked against them: the first parse of a file reads all its elements and
+filters them on the Python side, instead of pushing the filters down to the
+parser.
+"""
+
+import json
+import os
+import threading
+from typing import Iterator
+
+from pybgpflux.batch import ElementRow, row_to_element
+from pybgpflux.bgpelement import BGPElement
+from pybgpflux.bgpparser import BGPParser, projected_fields
+from pybgpflux.bgpstreamconfig import FilterOptions
+from pybgpflux.cache import CacheManager
+from pybgpflux.filtering import PREFIX_MODES, compile_filter, filter_values, path_origins
+from pybgpflux.prefixmatch import PrefixMatcher
+
+# Bumped whenever the summary content changes: older summaries are ignored
+FORMAT_VERSION = 2
+
+SUMMARY_EXT = ".summary"
+
+# Key of summaries in the `CacheManager` index: the URL of the archive plus this suffix and the variant
+SUMMARY_KEY_SUFFIX = "#summary."
+
+# Sets larger than this are not recorded (e.g. the prefixes of a full RIB dump):
+# such files are not skipped on this criterion
+MAX_SUMMARY_VALUES = 1 << 17
+
+# Summary key -> option it can rule out (see `filtering.filter_values`)
+SET_SUMMARIES = {
+    "peer_asns": "peer_asn",
+    "peer_ips": "peer_ip",
+    "origin_asns": "origin_asn",
+}
+
+
+def summary_filepath(filepath: str, variant: str) -> str:
+    """Path of the summary of the MRT file `filepath` (compressed or not), for a parser `variant`
+
+    Examples:
+        ```python
+        summary_filepath("cache/cache-rib.20100901.0000.1a2b3c4d.bz2", "5e6f7a8b")
+        # "cache/cache-rib.20100901.0000.1a2b3c4d.5e6f7a8b.summary"
+        ```
+    """
+    return f"{os.path.splitext(filepath)[0]}.{variant}{SUMMARY_EXT}"
+
+
+def read_summary(filepath: str) -> dict | None:
+    """Summary written by `IndexingParser`, None if missing or of another version."""
+    try:
+        with open(filepath, "rb") as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if summary.get("version") != FORMAT_VERSION:
+        return None
+    return summary
+
+
+def may_match(summary: dict, filters: FilterOptions | None) -> bool:
+    """Can the file of `summary` hold an element matching `filters`?
+
+    False only when it certainly cannot: one of the peer, origin ASN or prefix
+    filters matches none of the file's values.
+    """
+    values = filter_values(filters)
+    for key, option in SET_SUMMARIES.items():
+        if option in values and summary[key] is not None:
+            if {str(value) for value in values[option]}.isdisjoint(summary[key]):
+                return False
+    prefixes = summary["prefixes"]
+    if prefixes is not None:
+        for option, mode in PREFIX_MODES.items():
+            if option in values:
+                matcher = PrefixMatcher(values[option], mode)
+                if not any(map(matcher, prefixes)):
+                    return False
+    return True
+
+
+def write_summary(
+    filepath: str,
+    checksum: str | None,
+    cache_dir: str | None = None,
+    key: str | None = None,
+    **sets: set,
+):
+    """Write a summary atomically (sets beyond `MAX_SUMMARY_VALUES` are recorded as None)
+
+    With `cache_dir`, the summary is recorded under `key` in the index of the
+    `CacheManager` of this directory.
+    """
+    summary = {"version": FORMAT_VERSION, "checksum": checksum}
+    for name, values in sets.items():
+        summary[name] = sorted(values) if len(values) <= MAX_SUMMARY_VALUES else None
+    # One temporary file per process and thread: several may parse the same file
+    temp_filepath = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_filepath, "w") as f:
+            json.dump(summary, f)
+        os.replace(temp_filepath, filepath)
+        if cache_dir is not None:
+            CacheManager(cache_dir).add(key, filepath, checksum=checksum)
+    finally:
+        if os.path.exists(temp_filepath):
+            os.remove(temp_filepath)
+
+
+class IndexingParser(BGPParser):
+    """Parse a whole file with `parser_cls` and write its summary to `summary_path`.
+
+    `filters` and `fields` are applied on the Python side, after the summary.
+    The summary is recorded under `key` in the index of the cache directory
+    `cache_dir` (a path, so that pool workers can record it too).
+    Bind the first arguments (e.g. `functools.partial`) to use it as a parser class.
+    """
+
+    def __init__(
+        self,
+        parser_cls: type[BGPParser],
+        summary_path: str,
+        checksum: str | None,
+        cache_dir: str | None,
+        key: str | None,
+        filepath,
+        is_rib,
+        collector,
+        filters=None,
+        fields=None,
+    ):
+        self.parser = parser_cls(filepath, is_rib, collector, filters=None)
+        self.summary_path = summary_path
+        self.checksum = checksum
+        self.cache_dir = cache_dir
+        self.key = key
+        self.filepath = filepath
+        self.is_rib = is_rib
+        self.collector = collector
+        self.filters = filters
+        self._filter_func = compile_filter(filters)
+        self.fields = projected_fields(fields, None)
+
+    def __iter__(self) -> Iterator[BGPElement]:
+        return map(row_to_element, self._iter_rows())
+
+    def iter_rows(self) -> Iterator[ElementRow]:
+        return self._iter_rows()
+
+    def _iter_rows(self) -> Iterator[ElementRow]:
+        peer_asns, peer_ips, origin_asns, prefixes = set(), set(), set(), set()
+        check = self._filter_func
+        fields = self.fields
+        for row in self.parser.iter_rows():
+            _, _, _, peer_asn, peer_address, prefix, next_hop, as_path, communities = row
+            peer_asns.add(str(peer_asn))
+            peer_ips.add(peer_address)
+            if as_path:
+                origin_asns.update(path_origins(as_path))
+            if prefix:
+                prefixes.add(prefix)
+            if check is not None and not check(row_to_element(row)):
+                continue
+            if fields is not None:
+                row = (
+                    *row[:5],
+                    prefix if "prefix" in fields else None,
+                    next_hop if "next_hop" in fields else None,
+                    as_path if "as_path" in fields else None,
+                    communities if "communities" in fields else "",
+                )
+            yield row
+        write_summary(
+            self.summary_path,
+            self.checksum,
+            self.cache_dir,
+            self.key,
+            peer_asns=peer_asns,
+            peer_ips=peer_ips,
+            origin_asns=origin_asns,
+            prefixes=prefixes,
+        )
@@ -0,0 +1,203 @@
+"""Python-side filtering of elements, for the sources that cannot filter natively
+(`bgpdump` parser, RIS Live post-filtering), or only part of the filters
+(the other parsers push what they can down and filter the residual here)."""
+
+import re
+from typing import Callable, Iterable
+
+from pybgpflux.bgpelement import BGPElement
+from pybgpflux.bgpstreamconfig import FilterOptions
+from pybgpflux.prefixmatch import PrefixMatcher, parse_prefix
+
+ElementFilter = Callable[[BGPElement], bool]
+
+# Options taking a set of values: single-value option -> list option
+SET_OPTIONS = {
+    "origin_asn": "origin_asns",
+    "peer_asn": "peer_asns",
+    "peer_ip": "peer_ips",
+    "prefix": "prefixes",
+    "prefix_super": "prefixes_super",
+    "prefix_sub": "prefixes_sub",
+    "prefix_super_sub": "prefixes_super_sub",
+    "community": "communities",
+}
+SCALAR_OPTIONS = ("update_type", "as_path", "ip_version")
+
+# Prefix options and their match mode
+PREFIX_MODES = {
+    "prefix": "exact",
+    "prefix_sub": "sub",
+    "prefix_super": "super",
+    "prefix_super_sub": "super-sub",
+}
+
+
+def filter_values(f: FilterOptions | None) -> dict[str, list]:
+    """Values of the set options of `f`, keyed by single-value option name.
+
+    Single and list options are merged (e.g. `origin_asn` and `origin_asns`),
+    without duplicates. Options without values are left out.
+    """
+    values = {}
+    if f is None:
+        return values
+    for single, plural in SET_OPTIONS.items():
+        merged = [getattr(f, single, None)] + list(getattr(f, plural) or ())
+        merged = list(dict.fromkeys(str(v) if single == "peer_ip" else v for v in merged if v))
+        if merged:
+            values[single] = merged
+    return values
+
+
+def residual_filter(f: FilterOptions | None, pushed: Iterable[str]) -> FilterOptions:
+    """The part of `f` left to filter on the Python side, once a parser applied the `pushed` options.
+
+    `pushed` uses single-value names for set options (e.g. "origin_asn" for
+    `origin_asn` and `origin_asns`).
+    """
+    pushed = set(pushed)
+    kwargs = {
+        SET_OPTIONS[option]: values
+        for option, values in filter_values(f).items()
+        if option not in pushed
+    }
+    if f is not None:
+        for option in SCALAR_OPTIONS:
+            value = getattr(f, option)
+            if value is not None and option not in pushed:
+                kwargs[option] = value
+    return FilterOptions(**kwargs)
+
+
+def path_origins(as_path: str) -> list[str]:
+    """Origin ASNs of a space-separated AS path: its last ASN, or all the ASNs of
+    a final AS_SET (e.g. "{64500,64501}"), as with the origin filter of bgpkit."""
+    origin = as_path.rsplit(" ", 1)[-1]
+    if origin[:1] == "{":
+        return origin[1:-1].split(",")
+    return [origin]
+
+
+def origin_regex(asns: Iterable[int]) -> str:
+    """AS path regex matching any of the origin `asns` (see `path_origins`)"""
+    return f"(^|[ {{,])({'|'.join(map(str, asns))})(,\\d+)*\\}}?$"
+
+
+def community_regex(communities: Iterable[str]) -> str:
+    """Regex matching any of the `communities` ("asn:value", "*" matches any asn or value)"""
+    patterns = (
+        ":".join(r"\d+" if part == "*" else re.escape(part) for part in c.split(":"))
+        for c in communities
+    )
+    return f"^({'|'.join(patterns)})$"
+
+
+def community_matcher(communities: Iterable[str]) -> Callable[[list[str] | None], bool]:
+    """Match the communities of an element against `communities` (any of them).
+
+    Exact values are looked up in a set, only wildcards ("2497:*", "*:666") go through a regex.
+    """
+    communities = list(communities)
+    exact = {c for c in communities if "*" not in c}
+    wildcards = [c for c in communities if "*" in c]
+    search = re.compile(community_regex(wildcards)).match if wildcards else None
+
+    def match(element_communities: list[str] | None) -> bool:
+        if not element_communities:
+            return False
+        if not exact.isdisjoint(element_communities):
+            return True
+        if search is not None:
+            for community in element_communities:
+                if search(community):
+                    return True
+        return False
+
+    return match
+
+
+def prefix_matchers(f: FilterOptions) -> list[PrefixMatcher]:
+    """One matcher per prefix option set in `f` (an element must match them all)"""
+    values = filter_values(f)
+    return [
+        PrefixMatcher(values[option], mode)
+        for option, mode in PREFIX_MODES.items()
+        if option in values
+    ]
+
+
+def required_fields(f: FilterOptions | None) -> set[str]:
+    """Element fields (see `bgpelement.ELEMENT_FIELDS`) read by the Python-side filter of `f`"""
+    values = filter_values(f)
+    fields = set()
+    if f is None:
+        return fields
+    if f.ip_version or any(option in values for option in PREFIX_MODES):
+        fields.add("prefix")
+    if f.as_path or "origin_asn" in values:
+        fields.add("as_path")
+    if "community" in values:
+        fields.add("communities")
+    return fields
+
+
+def compile_filter(f: FilterOptions | None) -> ElementFilter | None:
+    """Build a predicate implementing `f` on `BGPElement`, None if `f` filters nothing."""
+    if f is None or not f.model_dump(exclude_unset=True):
+        return None
+
+    # Localize variables to the closure to avoid lookups in the loop
+    # Set options are evaluated together, as hash lookups (any value of a set matches)
+    values = filter_values(f)
+    p_asns = set(values["peer_asn"]) if "peer_asn" in values else None
+    p_ips = set(values["peer_ip"]) if "peer_ip" in values else None
+    o_asns = {str(asn) for asn in values["origin_asn"]} if "origin_asn" in values else None
+    c_match = community_matcher(values["community"]) if "community" in values else None
+    u_type = f.update_type[0].upper() if f.update_type else None  # 'A' or 'W'
+    version = f.ip_version
+    path_re = re.compile(f.as_path) if f.as_path else None
+    matchers = [matcher.match for matcher in prefix_matchers(f)]
+
+    def filter_logic(e: BGPElement) -> bool:
+        # 1. Cheap checks first (Integers and Strings)
+        if p_asns is not None and int(e.peer_asn) not in p_asns:
+            return False
+        if p_ips is not None and e.peer_address not in p_ips:
+            return False
+        if u_type is not None and e.type != u_type:
+            return False
+
+        # 2. String processing (Origin ASN and AS Path)
+        # Flat attributes: don't build the fields dict
+        as_path = e.as_path or ""
+        if o_asns is not None:
+            if not as_path or o_asns.isdisjoint(path_origins(as_path)):
+                return False
+        if path_re is not None and not path_re.search(as_path):
+            return False
+        if c_match is not None and not c_match(e.communities):
+            return False
+
+        # 3. Prefixes, parsed once into integers (see prefixmatch)
+        prefix_str = e.prefix
+        if version is not None:
+            # Fast check for IP version without parsing
+            is_v6 = ":" in prefix_str if prefix_str else False
+            if (version == 6 and not is_v6) or (version == 4 and is_v6):
+                return False
+
+        if matchers:
+            if not prefix_str:
+                return False
+            try:
+                prefix = parse_prefix(prefix_str)
+            except ValueError:
+                return False
+            for match in matchers:
+                if not match(prefix):
+                    return False
+
+        return True
+
+    return filter_logic
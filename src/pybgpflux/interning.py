@@ -0,0 +1,88 @@
+"""Interning of repeated element attributes (see `BGPStream(intern_attributes=True)`).
+
+Parsers build new strings for every element, while RIB dumps repeat the same
+AS paths, communities, next hops and peer addresses over millions of
+prefixes. An `Interner` maps equal values to one shared object, so that the
+elements (or rows) kept by the application share their attributes instead of
+holding a copy each.
+"""
+
+from pybgpflux.batch import ElementRow
+from pybgpflux.bgpelement import BGPElement
+
+# Values kept by an interner: the table is emptied when it is full
+MAX_INTERNED = 1 << 18
+
+
+class Interner:
+    """Bounded table of shared attribute values.
+
+    Calling the interner returns the shared object equal to a value. Once
+    `max_size` values are interned, the table is emptied and filled again
+    with the next values, keeping its memory bounded on long streams.
+
+    Communities are interned as tuples (lists cannot be shared safely).
+
+    Args:
+        max_size: Maximum number of values in the table.
+
+    Examples:
+        ```python
+        interner = Interner()
+        elements = [interner.element(elem) for elem in parser]
+        ```
+    """
+
+    def __init__(self, max_size: int = MAX_INTERNED):
+        self.max_size = max_size
+        self._values: dict = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __call__(self, value):
+        values = self._values
+        shared = values.get(value)
+        if shared is None:
+            if len(values) >= self.max_size:
+                values.clear()
+            shared = values[value] = value
+        return shared
+
+    def element(self, elem: BGPElement) -> BGPElement:
+        """Replace the attributes of `elem` by their shared objects (pybgpstream elements are left as is)."""
+        if type(elem) is not BGPElement:
+            return elem
+        elem.peer_address = self(elem.peer_address)
+        if elem.next_hop is not None:
+            elem.next_hop = self(elem.next_hop)
+        if elem.as_path is not None:
+            elem.as_path = self(elem.as_path)
+        if elem.communities:
+            elem.communities = self(tuple(elem.communities))
+        fields = elem._fields_dict
+        if fields is not None:
+            # Elements built from a fields dict (e.g. RIS Live) keep it in sync
+            for key, value in (
+                ("next-hop", elem.next_hop),
+                ("as-path", elem.as_path),
+                ("communities", elem.communities),
+            ):
+                if key in fields and value:
+                    fields[key] = value
+        return elem
+
+    def row(self, row: ElementRow) -> ElementRow:
+        """`row` with its attributes replaced by their shared objects"""
+        time, elem_type, collector, peer_asn, peer_address, prefix, next_hop, as_path, comm = row
+        return (
+            time,
+            elem_type,
+            collector,
+            peer_asn,
+            self(peer_address),
+            prefix,
+            next_hop if next_hop is None else self(next_hop),
+            as_path if as_path is None else self(as_path),
+            self(comm) if comm else comm,
+        )
@@ -0,0 +1,188 @@
+"""Batch-aware k-way merge of sorted sources (see `merge`).
+
+`heapq.merge` calls the key function, does a heap operation and resumes a
+generator for every element. Here the sources are read a batch at a time, and
+the source holding the smallest key emits a run of elements, up to the
+smallest key of the other sources: a bisection over its batch finds the end of
+the run, and the key function and the heap are only used a few times per run.
+Elements are then yielded from the runs by `itertools.chain`, without any
+Python code per element.
+
+Collectors interleave at the second granularity of BGP timestamps, so runs
+hold as many elements as a collector has in a second (tens to hundreds for
+updates, a whole batch for RIB dumps).
+
+The order is the one of `heapq.merge` for sorted sources. The few elements
+out of order in some update dumps may end a run at another point, but every
+source (and so every peer) keeps its own order.
+"""
+
+from bisect import bisect_left, bisect_right
+from heapq import heapify, heapreplace, heappop
+from itertools import chain, islice
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Elements read at a time from each source by `merge`
+MERGE_BATCH_SIZE = 1024
+
+
+def merge(
+    *iterables: Iterable[T],
+    key: Callable[[T], Any] | None = None,
+    batch_size: int = MERGE_BATCH_SIZE,
+) -> Iterator[T]:
+    """Drop-in replacement of `heapq.merge(*iterables, key=key)`, in the same order for sorted iterables.
+
+    Ties go to the earliest iterable, and each iterable keeps its own order
+    (see the module docstring for iterables not fully sorted). Unlike
+    `heapq.merge`, each iterable is read up to `batch_size` elements ahead.
+
+    Examples:
+        ```python
+        for elem in merge(*collector_iterators, key=attrgetter("time")):
+            ...
+        ```
+    """
+    sources = [_batches(iterable, batch_size) for iterable in iterables]
+    return chain.from_iterable(merge_batches(sources, key))
+
+
+def _batches(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    iterator = iter(iterable)
+    return iter(lambda: list(islice(iterator, size)), [])
+
+
+def _run_end(batch: list, start: int, threshold, inclusive: bool, key) -> int:
+    """End of the run of `batch[start:]` below `threshold` (or equal to it if `inclusive`)."""
+    if inclusive:
+        return bisect_right(batch, threshold, start, key=key)
+    return bisect_left(batch, threshold, start, key=key)
+
+
+def _identity(value):
+    return value
+
+
+def _next_head(heap: list) -> tuple:
+    # Smallest entry of the heap after its root: one of the root's children
+    if len(heap) == 2 or heap[1] < heap[2]:
+        return heap[1]
+    return heap[2]
+
+
+def merge_batches(
+    sources: Iterable[Iterable[list[T]]], key: Callable[[T], Any] | None = None
+) -> Iterator[list[T]]:
+    """Merge sources of batches into runs: lists of elements in merged order.
+
+    Each source yields lists of elements, in order over the whole source. The
+    runs are slices of these lists (or the lists themselves), in the order of
+    `heapq.merge` over the flattened sources (see the module docstring).
+    """
+    sources = [iter(source) for source in sources]
+    if key is None:
+        key = _identity
+    current = [next(filter(None, source), None) for source in sources]
+    starts = [0] * len(sources)
+    heap = [(key(batch[0]), order) for order, batch in enumerate(current) if batch]
+    heapify(heap)
+
+    # _run_end and _next_head inlined: this loop runs once per run
+    while len(heap) > 1:
+        order = heap[0][1]
+        if len(heap) == 2 or heap[1] < heap[2]:
+            threshold, other = heap[1]
+        else:
+            threshold, other = heap[2]
+        bisect = bisect_right if order < other else bisect_left
+        batch = current[order]
+        start = starts[order]
+        while True:
+            end = bisect(batch, threshold, start, key=key)
+            if end == len(batch):
+                yield batch if start == 0 else batch[start:]
+                batch = current[order] = next(filter(None, sources[order]), None)
+                if batch is None:
+                    heappop(heap)
+                    break
+                start = 0
+            else:
+                if end > start:
+                    yield batch[start:end]
+                starts[order] = end
+                heapreplace(heap, (key(batch[end]), order))
+                break
+
+    if heap:
+        # Last source: the rest of it as is
+        order = heap[0][1]
+        batch = current[order]
+        yield batch if starts[order] == 0 else batch[starts[order] :]
+        yield from filter(None, sources[order])
+
+
+async def amerge(
+    sources: list[AsyncIterator[list]], key: Callable, batch_size: int = 4096
+) -> AsyncIterator[list]:
+    """Merge sorted async sources of batches into sorted batches of at most `batch_size`.
+
+    Same order as `heapq.merge` over the flattened sources: ties go to the
+    earliest source. Batches are merged a run at a time, like `merge_batches`,
+    and the loop only awaits when a source's batch is exhausted.
+    Sources are closed with the merge.
+    """
+    try:
+        async for batch in _amerge(sources, key, batch_size):
+            yield batch
+    finally:
+        for source in sources:
+            await source.aclose()
+
+
+async def _amerge(
+    sources: list[AsyncIterator[list]], key: Callable, batch_size: int
+) -> AsyncIterator[list]:
+    if len(sources) == 1:
+        async for batch in sources[0]:
+            yield batch
+        return
+
+    async def load(order: int) -> list | None:
+        async for batch in sources[order]:
+            if batch:
+                return batch
+        return None
+
+    current = [await load(order) for order in range(len(sources))]
+    starts = [0] * len(sources)
+    heap = [(key(batch[0]), order) for order, batch in enumerate(current) if batch]
+    heapify(heap)
+    out = []
+
+    while heap:
+        order = heap[0][1]
+        batch = current[order]
+        start = starts[order]
+        if len(heap) == 1:
+            end = len(batch)
+        else:
+            threshold, other = _next_head(heap)
+            end = _run_end(batch, start, threshold, order < other, key)
+        out += batch[start:end]
+        if end == len(batch):
+            batch = current[order] = await load(order)
+            if batch is None:
+                heappop(heap)
+            else:
+                starts[order] = 0
+                heapreplace(heap, (key(batch[0]), order))
+        else:
+            starts[order] = end
+            heapreplace(heap, (key(batch[end]), order))
+        while len(out) >= batch_size:
+            yield out[:batch_size]
+            del out[:batch_size]
+    if out:
+        yield out
@@ -0,0 +1,209 @@
+"""Fan-out of one stream to many filtered subscribers (see `StreamMultiplexer`)."""
+
+from collections import deque
+from typing import Callable, Iterable, Iterator
+
+from pybgpflux.bgpelement import BGPElement
+from pybgpflux.bgpstreamconfig import FilterOptions
+from pybgpflux.filtering import compile_filter, filter_values, path_origins, residual_filter
+from pybgpflux.prefixmatch import _BITS, parse_prefix
+
+# Options subscriptions are indexed by, most selective first.
+# A subscription is indexed by the first one it sets, and only the rest of
+# its filters (the residual) is checked on the elements found in the index.
+INDEXED_OPTIONS = ("prefix", "origin_asn", "prefix_sub", "peer_asn")
+
+
+class Subscription:
+    """A filtered view of a `StreamMultiplexer`, created by `StreamMultiplexer.subscribe`.
+
+    Subscriptions without callback are iterators over their elements.
+
+    Attributes:
+        filters: Filters of the subscription.
+        callback: Function called with each matching element, if any.
+        matched: Number of elements dispatched to the subscription so far.
+    """
+
+    def __init__(
+        self,
+        mux: "StreamMultiplexer",
+        filters: FilterOptions,
+        callback: Callable[[BGPElement], None] | None,
+    ):
+        self.filters = filters
+        self.callback = callback
+        self.matched = 0
+        self._mux = mux
+        # Elements parsed while pulling another subscription
+        self._buffer: deque[BGPElement] = deque()
+
+    def __iter__(self) -> Iterator[BGPElement]:
+        if self.callback is not None:
+            raise TypeError("Subscriptions with a callback cannot be iterated")
+        return self
+
+    def __next__(self) -> BGPElement:
+        buffer = self._buffer
+        while not buffer:
+            if not self._mux._pull():
+                raise StopIteration
+        return buffer.popleft()
+
+
+class StreamMultiplexer:
+    """Parse a stream once, and dispatch its elements to many filtered subscribers.
+
+    Instead of one `BGPStream` per filter, each downloading and parsing the same
+    files, subscribe every filter to a single unfiltered stream. Subscriptions
+    are indexed by exact prefixes, origin ASNs, sub-prefixes (`prefix_sub`) or
+    peer ASNs: an element is only checked against the subscriptions it can
+    match, rather than against every filter.
+
+    Subscriptions receive the same `BGPElement` objects, which must not be modified.
+    They are consumed either:
+
+    - with callbacks, called as `run()` (or the iteration of the multiplexer) goes,
+    - by iterating the multiplexer, over `(subscription, element)` pairs,
+    - by iterating the subscriptions themselves. Pulling one subscription buffers
+      the elements matched by the others until they are iterated.
+
+    Args:
+        stream: Elements to dispatch, e.g. a `BGPStream` (its own `filters`
+            apply to every subscription).
+
+    Examples:
+        ```python
+        mux = StreamMultiplexer(BGPStream(...))
+        hijacks = mux.subscribe(FilterOptions(prefixes_sub=["192.0.2.0/24"]))
+        mux.subscribe(FilterOptions(origin_asns=[13335, 15169]), callback=print)
+        for subscription, elem in mux:
+            ...
+        ```
+    """
+
+    def __init__(self, stream: Iterable[BGPElement]):
+        self.stream = stream
+        self.subscriptions: list[Subscription] = []
+        self._iterator: Iterator[BGPElement] | None = None
+
+    def subscribe(
+        self,
+        filters: FilterOptions | None = None,
+        callback: Callable[[BGPElement], None] | None = None,
+    ) -> Subscription:
+        """Register a subscriber (before the stream starts).
+
+        Args:
+            filters: Elements the subscriber receives (all of them if None).
+            callback: Function called with each matching element. Without
+                callback, the returned subscription can be iterated.
+
+        Raises:
+            RuntimeError: If the stream already started.
+        """
+        if self._iterator is not None:
+            raise RuntimeError("Cannot subscribe once the stream started")
+        subscription = Subscription(self, filters or FilterOptions(), callback)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def _build_index(self):
+        # Index entries: (subscription order, subscription, residual filter or None)
+        self._unindexed = []
+        self._by_prefix = {}
+        self._by_origin = {}
+        self._by_supernet = {}
+        self._by_peer = {}
+        for i, subscription in enumerate(self.subscriptions):
+            filters = subscription.filters
+            values = filter_values(filters)
+            option = next((o for o in INDEXED_OPTIONS if o in values), None)
+            if option is None:
+                self._unindexed.append((i, subscription, compile_filter(filters)))
+                continue
+            entry = (i, subscription, compile_filter(residual_filter(filters, [option])))
+            if option == "prefix":
+                keys, index = map(parse_prefix, values[option]), self._by_prefix
+            elif option == "prefix_sub":
+                keys, index = map(parse_prefix, values[option]), self._by_supernet
+            elif option == "origin_asn":
+                keys, index = map(str, values[option]), self._by_origin
+            else:
+                keys, index = values[option], self._by_peer
+            for key in keys:
+                index.setdefault(key, []).append(entry)
+        # Lengths of the indexed sub-prefix filters, to walk up an element prefix
+        self._supernet_lengths = {
+            version: sorted({length for v, _, length in self._by_supernet if v == version})
+            for version in _BITS
+        }
+
+    def _match(self, elem: BGPElement) -> list[Subscription]:
+        """Subscriptions matching `elem`, in subscription order"""
+        candidates = list(self._unindexed)
+        if self._by_peer:
+            candidates += self._by_peer.get(int(elem.peer_asn), ())
+        if self._by_origin and elem.as_path:
+            for origin in path_origins(elem.as_path):
+                candidates += self._by_origin.get(origin, ())
+        if (self._by_prefix or self._by_supernet) and elem.prefix:
+            try:
+                prefix = parse_prefix(elem.prefix)
+            except ValueError:
+                prefix = None
+            if prefix is not None:
+                candidates += self._by_prefix.get(prefix, ())
+                version, network, length = prefix
+                bits = _BITS[version]
+                for filter_length in self._supernet_lengths[version]:
+                    if filter_length > length:
+                        break
+                    shift = bits - filter_length
+                    key = (version, network >> shift << shift, filter_length)
+                    candidates += self._by_supernet.get(key, ())
+
+        if len(candidates) > 1:
+            # A subscription can be found under several of its keys
+            candidates = sorted(set(candidates), key=lambda entry: entry[0])
+        return [
+            subscription
+            for _, subscription, check in candidates
+            if check is None or check(elem)
+        ]
+
+    def _elements(self) -> Iterator[BGPElement]:
+        if self._iterator is None:
+            self._build_index()
+            self._iterator = iter(self.stream)
+        return self._iterator
+
+    def __iter__(self) -> Iterator[tuple[Subscription, BGPElement]]:
+        """Dispatch the stream, yielding `(subscription, element)` pairs for the
+        subscriptions without callback (callbacks are called on the way)."""
+        match = self._match
+        for elem in self._elements():
+            for subscription in match(elem):
+                subscription.matched += 1
+                if subscription.callback is not None:
+                    subscription.callback(elem)
+                else:
+                    yield subscription, elem
+
+    def run(self):
+        """Dispatch the whole stream to the subscription callbacks."""
+        for _ in self:
+            pass
+
+    def _pull(self) -> bool:
+        """Dispatch the next element to the subscription buffers (False at the end of the stream)"""
+        elem = next(self._elements(), None)
+        if elem is None:
+            return False
+        for subscription in self._match(elem):
+            subscription.matched += 1
+            if subscription.callback is not None:
+                subscription.callback(elem)
+            else:
+                subscription._buffer.append(elem)
+        return True
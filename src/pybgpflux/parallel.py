@@ -0,0 +1,144 @@
+"""Parse MRT files in worker processes and stream the elements back in batches."""
+
+import pickle
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Iterator, Iterable
+
+from pybgpflux.bgpelement import BGPElement
+from pybgpflux.bgpparser import BGPParser
+from pybgpflux.bgpstreamconfig import FilterOptions
+
+# Number of elements pickled together and sent back to the main process
+BATCH_SIZE = 4096
+
+# Parser arguments: (filepath, is_rib, collector), optionally followed by the
+# parser class of this file (instead of the pool's)
+ParserJob = tuple[str, bool, str] | tuple[str, bool, str, type[BGPParser]]
+
+
+def _parse_to_queue(
+    queue, parser_cls, filepath, is_rib, collector, filters, fields, batch_size, rows
+):
+    """Worker process entry point: parse one file and put pickled element batches in `queue`.
+
+    With `rows`, the parser's flat `ElementRow` tuples are sent instead of `BGPElement`.
+
+    A `None` sentinel always ends the file, even on errors (which are re-raised
+    in the main process through the task future).
+    """
+    try:
+        parser = parser_cls(filepath, is_rib, collector, filters=filters, fields=fields)
+        batch = []
+        for elem in parser.iter_rows() if rows else parser:
+            batch.append(elem)
+            if len(batch) == batch_size:
+                queue.put(pickle.dumps(batch, pickle.HIGHEST_PROTOCOL))
+                batch = []
+        if batch:
+            queue.put(pickle.dumps(batch, pickle.HIGHEST_PROTOCOL))
+    finally:
+        queue.put(None)
+
+
+class ParsingPool:
+    """Pool of worker processes parsing MRT files ahead of consumption.
+
+    Each file is parsed by one worker process, which streams its elements back
+    in batches through a queue. The main process only unpickles batches, so
+    parsing scales with the number of workers.
+
+    Args:
+        workers: Number of worker processes.
+        parser_cls: Parser backend class (must yield picklable `BGPElement`).
+        filters: Filters forwarded to every parser.
+        fields: Element fields built by the parsers (None for all of them).
+        batch_size: Number of elements per batch.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        parser_cls: type[BGPParser],
+        filters: FilterOptions,
+        fields: list[str] | None = None,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.parser_cls = parser_cls
+        self.filters = filters
+        self.fields = fields
+        self.batch_size = batch_size
+        # spawn: the pool may be created while download threads are running
+        ctx = multiprocessing.get_context("spawn")
+        self.manager = ctx.Manager()
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+
+    def _submit(self, job: ParserJob, queue, rows: bool) -> Future:
+        filepath, is_rib, collector, *parser_cls = job
+        return self.executor.submit(
+            _parse_to_queue,
+            queue,
+            parser_cls[0] if parser_cls else self.parser_cls,
+            filepath,
+            is_rib,
+            collector,
+            self.filters,
+            self.fields,
+            self.batch_size,
+            rows,
+        )
+
+    def chain(
+        self, jobs: Iterable[ParserJob], lookahead: int = 1, rows: bool = False
+    ) -> Iterator[BGPElement]:
+        """Yield the elements (or rows) of `jobs` in order, like chaining their parsers.
+
+        `jobs` is consumed lazily, so it may wait for files still being downloaded.
+
+        Up to `lookahead` files after the one being consumed are parsed in the
+        background. Their queues are unbounded so that a source waiting in a
+        merge never blocks the workers another source depends on.
+        """
+        jobs = iter(jobs)
+        pending = deque()
+
+        def schedule():
+            job = next(jobs, None)
+            if job is not None:
+                queue = self.manager.Queue()
+                pending.append((self._submit(job, queue, rows), queue))
+
+        for _ in range(1 + lookahead):
+            schedule()
+
+        while pending:
+            future, queue = pending.popleft()
+            while (batch := queue.get()) is not None:
+                yield from pickle.loads(batch)
+            future.result()
+            schedule()
+
+    def chain_all(
+        self, jobs: list[ParserJob], maxsize: int = 16, rows: bool = False
+    ) -> Iterator[BGPElement]:
+        """Yield the elements (or rows) of all `jobs` in job order, all parsed at once.
+
+        Meant for files whose elements share the same timestamp (RIB dumps of
+        the same time): the output is the same as chaining their parsers. Each
+        job writes to its own queue of `maxsize` batches, so memory stays
+        bounded whatever the consumer speed. Jobs are started in order, so the
+        one being consumed never waits for a worker blocked on a full queue.
+        """
+        queues = [self.manager.Queue(maxsize=maxsize) for _ in jobs]
+        futures = [self._submit(job, queue, rows) for job, queue in zip(jobs, queues)]
+        for queue in queues:
+            while (batch := queue.get()) is not None:
+                yield from pickle.loads(batch)
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        # Manager first: workers blocked on a full queue (abandoned stream) then fail fast
+        self.manager.shutdown()
+        self.executor.shutdown(wait=True, cancel_futures=True)
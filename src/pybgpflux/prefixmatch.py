@@ -0,0 +1,127 @@
+"""Prefix matching on integers, for the filters applied on the Python side.
+
+Prefixes are parsed once into `(version, network, length)` integers, and a
+set of prefixes is indexed by length: matching an element's prefix against
+many filter prefixes costs a few hash lookups, instead of building an
+`ipaddress.ip_network` and calling `subnet_of`/`supernet_of` per element.
+"""
+
+import socket
+from functools import lru_cache
+from typing import Iterable, Literal
+
+# Prefix as integers: (IP version, network address, prefix length)
+IntPrefix = tuple[int, int, int]
+
+MatchMode = Literal["exact", "sub", "super", "super-sub"]
+
+_BITS = {4: 32, 6: 128}
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_prefix(prefix: str) -> IntPrefix:
+    """Parse "192.0.2.0/24" or "2001:db8::/32" into integers (host bits are cleared).
+
+    Cached: streams see the same prefixes over and over.
+
+    Raises:
+        ValueError: If `prefix` is not a valid prefix.
+    """
+    address, _, length = prefix.partition("/")
+    try:
+        if ":" in address:
+            version = 6
+            network = int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+        else:
+            version = 4
+            network = int.from_bytes(socket.inet_aton(address), "big")
+            if address.count(".") != 3:
+                # inet_aton accepts shorthands like "10.1"
+                raise OSError
+    except OSError:
+        raise ValueError(f"Invalid prefix: {prefix!r}") from None
+    bits = _BITS[version]
+    length = int(length) if length else bits
+    if not 0 <= length <= bits:
+        raise ValueError(f"Invalid prefix length: {prefix!r}")
+    return version, network >> (bits - length) << (bits - length), length
+
+
+class PrefixMatcher:
+    """Match prefixes against a set of prefixes.
+
+    Args:
+        prefixes: Prefixes to match against (IPv4 and IPv6 can be mixed).
+        mode: How a prefix matches one of `prefixes`:
+            - "exact": it is equal to it.
+            - "sub": it is equal or more specific (a sub-prefix).
+            - "super": it is equal or less specific (a super-prefix).
+            - "super-sub": either of the two.
+
+    Examples:
+        ```python
+        matcher = PrefixMatcher(["10.0.0.0/8", "2001:db8::/32"], "sub")
+        matcher("10.1.0.0/16")  # True
+        matcher("11.0.0.0/8")  # False
+        ```
+    """
+
+    def __init__(self, prefixes: Iterable[str], mode: MatchMode = "exact"):
+        if mode not in ("exact", "sub", "super", "super-sub"):
+            raise ValueError(f"Unknown prefix match mode: {mode!r}")
+        self.mode = mode
+        self.prefixes = {parse_prefix(str(prefix)) for prefix in prefixes}
+        # Filter prefixes by version and length: {version: {length: networks}}
+        self._by_length: dict[int, dict[int, set[int]]] = {4: {}, 6: {}}
+        for version, network, length in self.prefixes:
+            self._by_length[version].setdefault(length, set()).add(network)
+        # Lengths, shortest first, to walk up the tree of an element's prefix
+        self._lengths = {
+            version: sorted(lengths) for version, lengths in self._by_length.items()
+        }
+        # Filter prefixes truncated to each element prefix length (see _has_sub)
+        self._truncated: dict[tuple[int, int], set[int]] = {}
+
+    def __call__(self, prefix: str) -> bool:
+        try:
+            return self.match(parse_prefix(prefix))
+        except ValueError:
+            return False
+
+    def match(self, prefix: IntPrefix) -> bool:
+        if self.mode == "exact":
+            return prefix in self.prefixes
+        if self.mode == "sub":
+            return self._has_super(prefix)
+        if self.mode == "super":
+            return self._has_sub(prefix)
+        return self._has_super(prefix) or self._has_sub(prefix)
+
+    def _has_super(self, prefix: IntPrefix) -> bool:
+        """Is `prefix` equal to or inside one of the filter prefixes?"""
+        version, network, length = prefix
+        bits = _BITS[version]
+        by_length = self._by_length[version]
+        for filter_length in self._lengths[version]:
+            if filter_length > length:
+                break
+            shift = bits - filter_length
+            if network >> shift << shift in by_length[filter_length]:
+                return True
+        return False
+
+    def _has_sub(self, prefix: IntPrefix) -> bool:
+        """Does `prefix` contain (or equal) one of the filter prefixes?"""
+        version, network, length = prefix
+        key = (version, length)
+        truncated = self._truncated.get(key)
+        if truncated is None:
+            # Once per element prefix length: filter prefixes at least as long, cut to it
+            shift = _BITS[version] - length
+            truncated = self._truncated[key] = {
+                filter_network >> shift << shift
+                for filter_length, networks in self._by_length[version].items()
+                if filter_length >= length
+                for filter_network in networks
+            }
+        return network in truncated
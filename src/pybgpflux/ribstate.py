@@ -0,0 +1,240 @@
+"""Routing table state rebuilt from RIB dumps and updates (see `RibState`).
+
+Tables are kept per peer, as dicts from integer prefix keys to the index of
+an interned route `(next_hop, as_path, communities)`: a route shared by many
+prefixes and peers is stored once, and prefix keys are shared by the tables
+of all the peers. A table entry costs a dict slot instead of an element.
+
+Snapshots are copy-on-write: taking one only copies the dict of tables, and
+the table of a peer is copied the first time the state changes it afterwards.
+"""
+
+import socket
+from typing import Iterable, Iterator
+
+from pybgpflux.batch import ElementRow, element_to_row
+from pybgpflux.bgpelement import BGPElement
+from pybgpflux.bgpstream import BGPStream
+from pybgpflux.prefixmatch import parse_prefix
+
+# Peer of a table: (collector, peer ASN, peer address)
+PeerKey = tuple[str, int, str]
+
+# Interned route attributes: (next_hop, as_path, communities)
+Route = tuple[str | None, str | None, str]
+
+
+def prefix_key(prefix: str) -> int:
+    """Pack a prefix into one integer: network address, length and IP version.
+
+    Raises:
+        ValueError: If `prefix` is not a valid prefix.
+
+    Examples:
+        ```python
+        key_prefix(prefix_key("192.0.2.0/24"))  # "192.0.2.0/24"
+        ```
+    """
+    version, network, length = parse_prefix(prefix)
+    return (network << 8 | length) << 1 | (version == 6)
+
+
+def key_prefix(key: int) -> str:
+    """Prefix of a `prefix_key`"""
+    length = key >> 1 & 0xFF
+    if key & 1:
+        address = socket.inet_ntop(socket.AF_INET6, (key >> 9).to_bytes(16, "big"))
+    else:
+        address = socket.inet_ntop(socket.AF_INET, (key >> 9).to_bytes(4, "big"))
+    return f"{address}/{length}"
+
+
+class RibSnapshot:
+    """Routing tables of every peer at a point in time, taken with `RibState.snapshot`.
+
+    Routes are returned as "R" elements, stamped with the time of the snapshot.
+
+    Attributes:
+        time: Time of the last element applied before the snapshot (None if none).
+    """
+
+    def __init__(
+        self, time: float | None, tables: dict[PeerKey, dict[int, int]], routes: list[Route]
+    ):
+        self.time = time
+        self._tables = tables
+        self._routes = routes
+
+    def __len__(self) -> int:
+        """Number of routes, over all the peers"""
+        return sum(map(len, self._tables.values()))
+
+    def peers(self) -> list[PeerKey]:
+        """Peers with at least one route, as `(collector, peer_asn, peer_address)`"""
+        return [peer for peer, table in self._tables.items() if table]
+
+    def _element(self, peer: PeerKey, key: int, route_id: int) -> BGPElement:
+        collector, peer_asn, peer_address = peer
+        next_hop, as_path, communities = self._routes[route_id]
+        return BGPElement(
+            self.time,
+            "R",
+            collector,
+            peer_asn,
+            peer_address,
+            None,
+            key_prefix(key),
+            next_hop,
+            as_path,
+            communities.split() if communities else None,
+        )
+
+    def lookup(self, prefix: str) -> list[BGPElement]:
+        """Routes of every peer to exactly `prefix`."""
+        key = prefix_key(prefix)
+        return [
+            self._element(peer, key, table[key])
+            for peer, table in self._tables.items()
+            if key in table
+        ]
+
+    def elements(self, peer: PeerKey | None = None) -> Iterator[BGPElement]:
+        """Iterate over the routes of `peer`, or of every peer, as "R" elements."""
+        if peer is not None:
+            tables = {peer: self._tables.get(peer, {})}
+        else:
+            tables = self._tables
+        for peer, table in tables.items():
+            for key, route_id in table.items():
+                yield self._element(peer, key, route_id)
+
+
+class RibState(RibSnapshot):
+    """Routing tables of every peer, updated as a stream of RIB dumps and updates goes.
+
+    Feed it a `BGPStream` with `data_type=["rib", "update"]` (or any iterable of
+    elements in time order): "R" elements fill the tables, announcements replace
+    the route of a prefix and withdrawals remove it. The first "R" element of a
+    new RIB dump of a collector (a new dump time) drops the tables of all its
+    peers, which the dump replaces.
+
+    Streams are read as flat rows (no `BGPElement` per element). Interned
+    routes are kept for the lifetime of the state.
+
+    Examples:
+        ```python
+        stream = BGPStream(..., data_type=["rib", "update"])
+        state = RibState()
+        for snapshot in state.replay(stream, [t1, t2]):
+            print(snapshot.time, len(snapshot), snapshot.lookup("192.0.2.0/24"))
+        ```
+    """
+
+    def __init__(self):
+        super().__init__(None, {}, [])
+        # Route -> index in self._routes
+        self._route_ids: dict[Route, int] = {}
+        # Canonical objects of the AS paths, communities and prefix keys
+        self._strings: dict[str, str] = {}
+        self._keys: dict[int, int] = {}
+        # Peers whose table is shared with a snapshot (copied on write)
+        self._shared: set[PeerKey] = set()
+        # Collector -> time of its last RIB dump
+        self._dumps: dict[str, float] = {}
+
+    def _table(self, peer: PeerKey) -> dict[int, int]:
+        table = self._tables.get(peer)
+        if table is None:
+            table = self._tables[peer] = {}
+        elif peer in self._shared:
+            table = self._tables[peer] = dict(table)
+            self._shared.discard(peer)
+        return table
+
+    def _route_id(self, next_hop: str | None, as_path: str | None, communities: str) -> int:
+        strings = self._strings
+        route = (
+            next_hop,
+            as_path and strings.setdefault(as_path, as_path),
+            communities and strings.setdefault(communities, communities),
+        )
+        route_id = self._route_ids.get(route)
+        if route_id is None:
+            route_id = self._route_ids[route] = len(self._routes)
+            self._routes.append(route)
+        return route_id
+
+    def _drop_collector(self, collector: str):
+        for peer in [peer for peer in self._tables if peer[0] == collector]:
+            del self._tables[peer]
+            self._shared.discard(peer)
+
+    def apply_row(self, row: ElementRow):
+        """Apply one element, as an `ElementRow`."""
+        time, elem_type, collector, peer_asn, peer_address, prefix, next_hop, as_path, comm = row
+        if prefix is None:
+            return
+        try:
+            key = prefix_key(prefix)
+        except ValueError:
+            return
+        key = self._keys.setdefault(key, key)
+        self.time = time
+        if elem_type == "W":
+            table = self._tables.get((collector, peer_asn, peer_address))
+            if table and key in table:
+                self._table((collector, peer_asn, peer_address)).pop(key)
+            return
+        if elem_type == "R" and self._dumps.get(collector) != time:
+            # First element of a new dump of the collector
+            self._drop_collector(collector)
+            self._dumps[collector] = time
+        table = self._table((collector, peer_asn, peer_address))
+        table[key] = self._route_id(next_hop, as_path, comm)
+
+    def apply(self, elem: BGPElement):
+        """Apply one element."""
+        self.apply_row(element_to_row(elem))
+
+    def update(self, source: Iterable[BGPElement]):
+        """Apply all the elements of `source` (a `BGPStream` or elements in time order)."""
+        for row in _rows(source):
+            self.apply_row(row)
+
+    def snapshot(self, time: float | None = None) -> RibSnapshot:
+        """Copy of the current tables, unaffected by the next elements.
+
+        Args:
+            time: Time of the snapshot, default is the time of the last element applied.
+        """
+        self._shared = set(self._tables)
+        return RibSnapshot(
+            self.time if time is None else time, dict(self._tables), self._routes
+        )
+
+    def replay(self, source: Iterable[BGPElement], times: Iterable[float]) -> Iterator[RibSnapshot]:
+        """Apply the elements of `source`, yielding a snapshot at each of `times`.
+
+        The snapshot at `t` holds the elements up to `t` included, and is
+        yielded once `source` reaches a later element (or its end).
+
+        Args:
+            source: A `BGPStream` or elements in time order.
+            times: Snapshot times, in any order (snapshots are yielded in time order).
+        """
+        times = sorted(times)
+        i = 0
+        for row in _rows(source):
+            while i < len(times) and row[0] > times[i]:
+                yield self.snapshot(times[i])
+                i += 1
+            self.apply_row(row)
+        for time in times[i:]:
+            yield self.snapshot(time)
+
+
+def _rows(source: Iterable[BGPElement]) -> Iterator[ElementRow]:
+    # Streams yield rows directly, without building elements
+    if isinstance(source, BGPStream):
+        return source._iter(rows=True)
+    return map(element_to_row, source)
@@ -1,10 +1,15 @@
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 import json
 import heapq
+import aiohttp
+from contextlib import aclosing
 import websocket
 
 from pybgpflux.bgpelement import BGPElement
 from pybgpflux.bgpstreamconfig import FilterOptions
+from pybgpflux.filtering import compile_filter, filter_values
+
+RIS_LIVE_URL = "wss://ris-live.ripe.net/v1/ws/"
 
 
 def ris_message2bgpelem(ris_message: dict) -> Iterator[BGPElement]:
@@ -13,7 +18,11 @@ def ris_message2bgpelem(ris_message: dict) -> Iterator[BGPElement]:
     collector = ris_message["host"].split(".")[0]
     peer_asn = int(ris_message["peer_asn"])
     peer_address = ris_message["peer"]
-    path = ris_message["path"]
+    # AS path as a string, like the other sources (AS sets as "{a,b}")
+    path = " ".join(
+        "{" + ",".join(map(str, asn)) + "}" if isinstance(asn, list) else str(asn)
+        for asn in ris_message["path"]
+    )
     communities = ris_message["community"]
     if communities:
         communities = [f"{asn}:{community}" for asn, community in communities]
@@ -59,6 +68,9 @@ class RISLiveStream:
         self.collectors = collectors
         self.client = client
         self.filters = self._convert_filter_options(filters)
+        # RIS Live cannot apply every filter (e.g. peer_ips, ip_version, as_path regex):
+        # received elements are filtered again on the Python side
+        self._filter_func = compile_filter(filters)
 
     @staticmethod
     def _convert_filter_options(f: FilterOptions) -> dict:
@@ -69,50 +81,86 @@ class RISLiveStream:
         if not f.model_dump(exclude_unset=True):
             return {}
 
+        # RIS Live filters take a single value: sets are only filtered on the Python side
+        values = {
+            option: value[0]
+            for option, value in filter_values(f).items()
+            if len(value) == 1
+        }
         res = {}
         if f.update_type == "withdraw":
             res["require"] = "withdrawals"
         elif f.update_type == "announce":
             res["require"] = "announcements"
-        if f.peer_ip:
-            res["peer"] = f.peer_ip
+        if "peer_ip" in values:
+            res["peer"] = values["peer_ip"]
         path_elements = []
-        if f.peer_asn:
-            path_elements.append(f"^{f.peer_asn}")
-        if f.origin_asn:
-            path_elements.append(f"{f.origin_asn}$")
+        if "peer_asn" in values:
+            path_elements.append(f"^{values['peer_asn']}")
+        if "origin_asn" in values:
+            path_elements.append(f"{values['origin_asn']}$")
         res["path"] = ",".join(path_elements)
 
-        if f.prefix:
-            res["prefix"] = f.prefix
+        # A single prefix option can be sent
+        if "prefix" in values:
+            res["prefix"] = values["prefix"]
             # default is True which I think is not consistent with BGPKIT/BGPStream
             res["moreSpecific"] = False
-        if f.prefix_sub:
-            res["prefix"] = f.prefix_sub
+        elif "prefix_sub" in values:
+            res["prefix"] = values["prefix_sub"]
             res["moreSpecific"] = True
-        if f.prefix_super:
-            res["prefix"] = f.prefix_super
+        elif "prefix_super" in values:
+            res["prefix"] = values["prefix_super"]
             res["lessSpecific"] = True
-        if f.prefix_super_sub:
-            res["prefix"] = f.prefix_super_sub
+        elif "prefix_super_sub" in values:
+            res["prefix"] = values["prefix_super_sub"]
             res["moreSpecific"] = True
             res["lessSpecific"] = True
 
         return res
 
+    def _subscriptions(self) -> list[str]:
+        """Subscription messages, one per collector (sent on the same connection)"""
+        return [
+            json.dumps(
+                {
+                    "type": "ris_subscribe",
+                    "data": {"host": collector, "type": "UPDATE"} | self.filters,
+                }
+            )
+            for collector in self.collectors
+        ]
+
+    def _elements(self, data: str) -> Iterator[BGPElement]:
+        elements = ris_message2bgpelem(json.loads(data)["data"])
+        if self._filter_func:
+            return filter(self._filter_func, elements)
+        return elements
+
     def __iter__(self) -> Iterator[BGPElement]:
         ws = websocket.WebSocket()
-        ws.connect(f"wss://ris-live.ripe.net/v1/ws/?client={self.client}")
+        ws.connect(f"{RIS_LIVE_URL}?client={self.client}")
 
-        # Subscribe to each collector on the same connection
-        for collector in self.collectors:
-            params = {"host": collector, "type": "UPDATE"}
-            params = params | self.filters
-            ws.send(json.dumps({"type": "ris_subscribe", "data": params}))
+        for message in self._subscriptions():
+            ws.send(message)
 
         for data in ws:
-            parsed = json.loads(data)["data"]
-            yield from ris_message2bgpelem(parsed)
+            yield from self._elements(data)
+
+    async def __aiter__(self) -> AsyncIterator[BGPElement]:
+        """Iterate asynchronously, with an aiohttp websocket client."""
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(
+                RIS_LIVE_URL, params={"client": self.client}
+            ) as ws:
+                for message in self._subscriptions():
+                    await ws.send_str(message)
+
+                async for message in ws:
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    for elem in self._elements(message.data):
+                        yield elem
 
 
 def jitter_buffer_stream(stream, buffer_delay=10) -> Iterator[BGPElement]:
@@ -136,3 +184,22 @@ def jitter_buffer_stream(stream, buffer_delay=10) -> Iterator[BGPElement]:
     # Clean up when stream ends (never hopefully)
     while heap:
         yield heapq.heappop(heap)
+
+
+async def ajitter_buffer_stream(stream, buffer_delay=10) -> AsyncIterator[BGPElement]:
+    """Asynchronous `jitter_buffer_stream`, over an asynchronous `stream`."""
+    heap = []
+    max_ts_seen = float("-inf")
+
+    async with aclosing(aiter(stream)) as elements:
+        async for elem in elements:
+            if elem.time > max_ts_seen:
+                max_ts_seen = elem.time
+
+            heapq.heappush(heap, elem)
+
+            while heap and (max_ts_seen - heap[0].time) > buffer_delay:
+                yield heapq.heappop(heap)
+
+    while heap:
+        yield heapq.heappop(heap)
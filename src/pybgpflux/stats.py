@@ -0,0 +1,321 @@
+"""Opt-in instrumentation of `BGPStream` stages (see `BGPStream(stats=True)`)."""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Stages, in pipeline order:
+# - broker: broker queries (or BrokerCache lookups)
+# - download: downloads of the files missing from the cache (background thread)
+# - decompress: decompression of the files to the cache, with `cache_decompressed`
+#   (background threads, one call per file)
+# - wait: the parsing thread waiting for files that are still downloading (or decompressing)
+# - parse: parsers (decompression, MRT parsing, conversion and parser-side filters)
+# - merge: merge of the collectors' streams in time order and time window filter
+STAGES = ("broker", "download", "decompress", "wait", "parse", "merge")
+
+
+@dataclass
+class StageStats:
+    """Time spent in a stage (seconds), over `calls` calls"""
+
+    wall: float = 0.0
+    cpu: float = 0.0
+    calls: int = 0
+
+
+class StreamStats:
+    """Per-stage time and counters of a `BGPStream`.
+
+    CPU times are the ones of the thread running the stage. Parsers running
+    in subprocesses (`bgpkit`, `bgpdump` or `workers` > 1) are accounted in
+    `children_cpu` instead, once they have exited.
+
+    Counters:
+        bytes_downloaded: Bytes written to the cache by downloads (downloads streamed
+            to the parsers with `stream_downloads` run in a helper process and are not counted).
+        files_downloaded: Successful downloads.
+        download_failures: Downloads that failed after all retries.
+        cache_hits: Files found in the cache.
+        cache_misses: Files downloaded or streamed.
+        files_skipped: Files left out because their summary rules out the filters
+            (see `BGPStream(file_index=True)`).
+        files_pruned: Files left out because their time span is outside the time
+            window of the stream.
+        elements_parsed: Elements produced by the parsers.
+        elements: Elements yielded by the stream.
+        dropped: Elements dropped per filter. `FilterOptions` are applied by the
+            parsers themselves (natively for most of them), so only the time window
+            of the stream ("time_window") is counted here.
+
+    Examples:
+        ```python
+        stream = BGPStream(..., stats=True)
+        for elem in stream:
+            pass
+        print(stream.stats.summary())
+        ```
+    """
+
+    def __init__(self):
+        self.stages = {stage: StageStats() for stage in STAGES}
+        self.bytes_downloaded = 0
+        self.files_downloaded = 0
+        self.download_failures = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.files_skipped = 0
+        self.files_pruned = 0
+        self.elements_parsed = 0
+        self.elements = 0
+        self.dropped = {"time_window": 0}
+        # Downloads are counted from another thread
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def add(self, **counters: int):
+        """Increment counters, e.g. `stats.add(cache_hits=1)`."""
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def add_time(self, stage: str, wall: float, cpu: float, calls: int = 1):
+        with self._lock:
+            stage_stats = self.stages[stage]
+            stage_stats.wall += wall
+            stage_stats.cpu += cpu
+            stage_stats.calls += calls
+
+    # Nested stages (e.g. waiting for a download while parsing) are only
+    # accounted to the innermost one: each thread keeps a stack of
+    # [start wall, start cpu, nested wall, nested cpu]
+
+    def _enter(self) -> list:
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append([time.perf_counter(), time.thread_time(), 0.0, 0.0])
+        return stack
+
+    @staticmethod
+    def _exit(stack: list) -> tuple[float, float]:
+        start_wall, start_cpu, nested_wall, nested_cpu = stack.pop()
+        wall = time.perf_counter() - start_wall
+        cpu = time.thread_time() - start_cpu
+        if stack:
+            stack[-1][2] += wall
+            stack[-1][3] += cpu
+        return wall - nested_wall, cpu - nested_cpu
+
+    @contextmanager
+    def timed(self, stage: str):
+        """Account the time spent in the `with` block to `stage`."""
+        stack = self._enter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, *self._exit(stack))
+
+    def timed_parse(self, elements: Iterator[T]) -> Iterator[T]:
+        """Wrap a parser: account the time spent producing each element to "parse"."""
+        wall = cpu = 0.0
+        count = 0
+        iterator = iter(elements)
+        try:
+            while True:
+                stack = self._enter()
+                try:
+                    element = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    own_wall, own_cpu = self._exit(stack)
+                    wall += own_wall
+                    cpu += own_cpu
+                count += 1
+                yield element
+        finally:
+            # Once per parser, not per element
+            self.add_time("parse", wall, cpu)
+            self.add(elements_parsed=count)
+
+    def timed_merge(
+        self,
+        merged: Iterator[T],
+        time_of: Callable[[T], float],
+        ts_start: float,
+        ts_end: float,
+    ) -> Iterator[T]:
+        """Filter the merged stream on the time window, accounting its time to "merge".
+
+        The time of the parsers consumed by `merged` (see `timed_parse`) and of
+        the waits for downloads is accounted to their own stages.
+        """
+        wall = cpu = 0.0
+        count = dropped = 0
+        try:
+            while True:
+                stack = self._enter()
+                try:
+                    for element in merged:
+                        if ts_start <= time_of(element) <= ts_end:
+                            break
+                        dropped += 1
+                    else:
+                        return
+                finally:
+                    own_wall, own_cpu = self._exit(stack)
+                    wall += own_wall
+                    cpu += own_cpu
+                count += 1
+                yield element
+        finally:
+            self.add_time("merge", wall, cpu)
+            self.add(elements=count)
+            with self._lock:
+                self.dropped["time_window"] += dropped
+
+    @property
+    def cache_hit_ratio(self) -> float | None:
+        """Fraction of the files found in the cache (None before any lookup)"""
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
+
+    @property
+    def children_cpu(self) -> float:
+        """CPU time (seconds) of the exited subprocesses of this process (0 on Windows)"""
+        times = os.times()
+        return times.children_user + times.children_system
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {"wall": s.wall, "cpu": s.cpu, "calls": s.calls}
+                    for stage, s in self.stages.items()
+                },
+                "bytes_downloaded": self.bytes_downloaded,
+                "files_downloaded": self.files_downloaded,
+                "download_failures": self.download_failures,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache_hit_ratio": self.cache_hit_ratio,
+                "files_skipped": self.files_skipped,
+                "files_pruned": self.files_pruned,
+                "elements_parsed": self.elements_parsed,
+                "elements": self.elements,
+                "dropped": dict(self.dropped),
+                "children_cpu": self.children_cpu,
+            }
+
+    def summary(self) -> str:
+        """Human readable report"""
+        stats = self.as_dict()
+        lines = [f"{'stage':<10} {'wall (s)':>10} {'cpu (s)':>10} {'calls':>8}"]
+        for stage, s in stats["stages"].items():
+            lines.append(
+                f"{stage:<10} {s['wall']:>10.3f} {s['cpu']:>10.3f} {s['calls']:>8}"
+            )
+        ratio = stats["cache_hit_ratio"]
+        lines += [
+            f"subprocesses cpu: {stats['children_cpu']:.3f}s",
+            f"downloaded: {stats['files_downloaded']} files, {stats['bytes_downloaded']} bytes"
+            f" ({stats['download_failures']} failures)",
+            f"cache: {stats['cache_hits']} hits, {stats['cache_misses']} misses"
+            + (f" (hit ratio {ratio:.2f})" if ratio is not None else "")
+            + (f", {stats['files_skipped']} files skipped" if stats["files_skipped"] else "")
+            + (f", {stats['files_pruned']} outside the window" if stats["files_pruned"] else ""),
+            f"elements: {stats['elements_parsed']} parsed, {stats['elements']} yielded",
+            "dropped: "
+            + ", ".join(f"{name} {count}" for name, count in stats["dropped"].items()),
+        ]
+        return "\n".join(lines)
+
+    def to_openmetrics(self, prefix: str = "pybgpflux") -> str:
+        """Export the stats in the OpenMetrics text format (also read by Prometheus).
+
+        Args:
+            prefix: Prefix of the metric names.
+
+        Returns:
+            str: Exposition ending with `# EOF`, e.g. to serve over HTTP or to
+                write for the node exporter textfile collector.
+        """
+        stats = self.as_dict()
+        lines = []
+
+        def family(name, help, samples, unit=None):
+            name = f"{prefix}_{name}"
+            lines.append(f"# TYPE {name} counter")
+            if unit:
+                lines.append(f"# UNIT {name} {unit}")
+            lines.append(f"# HELP {name} {help}")
+            for labels, value in samples:
+                labels = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{name}_total{{{labels}}} {value}" if labels else f"{name}_total {value}")
+
+        family(
+            "stage_seconds",
+            "Time spent per stage.",
+            [
+                ({"stage": stage, "clock": clock}, s[clock])
+                for stage, s in stats["stages"].items()
+                for clock in ("wall", "cpu")
+            ],
+            unit="seconds",
+        )
+        family(
+            "stage_calls",
+            "Calls per stage.",
+            [({"stage": stage}, s["calls"]) for stage, s in stats["stages"].items()],
+        )
+        family(
+            "subprocess_cpu_seconds",
+            "CPU time of the exited parser subprocesses.",
+            [({}, stats["children_cpu"])],
+            unit="seconds",
+        )
+        family(
+            "downloaded_bytes",
+            "Bytes downloaded to the cache.",
+            [({}, stats["bytes_downloaded"])],
+            unit="bytes",
+        )
+        family(
+            "downloaded_files", "Successful downloads.", [({}, stats["files_downloaded"])]
+        )
+        family(
+            "download_failures",
+            "Downloads failed after all retries.",
+            [({}, stats["download_failures"])],
+        )
+        family(
+            "cache_lookups",
+            "Cache lookups per result.",
+            [({"result": "hit"}, stats["cache_hits"]), ({"result": "miss"}, stats["cache_misses"])],
+        )
+        family(
+            "skipped_files",
+            "Files skipped by their summary.",
+            [({}, stats["files_skipped"])],
+        )
+        family(
+            "pruned_files",
+            "Files outside the time window.",
+            [({}, stats["files_pruned"])],
+        )
+        family(
+            "parsed_elements", "Elements produced by the parsers.", [({}, stats["elements_parsed"])]
+        )
+        family("elements", "Elements yielded by the stream.", [({}, stats["elements"])])
+        family(
+            "dropped_elements",
+            "Elements dropped per filter.",
+            [({"filter": name}, count) for name, count in stats["dropped"].items()],
+        )
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
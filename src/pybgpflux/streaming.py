@@ -0,0 +1,112 @@
+"""Feed MRT files to the parsers through named pipes while they are downloaded."""
+
+import os
+import time
+import zlib
+import asyncio
+import logging
+import threading
+
+import aiohttp
+
+from pybgpflux.cache import CacheManager
+from pybgpflux.download import THROTTLE_STATUSES, retry_after
+
+# Files to stream: (url, cache filepath, named pipe path)
+StreamJob = tuple[str, str, str]
+
+
+def feed_fifos(jobs: list[StreamJob], cache_dir: str | None, stopped):
+    """Helper process entry point: stream every job in its own thread.
+
+    Runs outside the parsing process because the pybgpkit parser holds the GIL
+    while it waits for data on the pipe.
+
+    Args:
+        jobs: Files to stream.
+        cache_dir: Directory of the `CacheManager` recording the downloads, if any.
+        stopped: Event set when the stream is released: pipes opened from then on
+            are not downloaded.
+    """
+    threading.Thread(target=_exit_with_parent, args=(os.getppid(),), daemon=True).start()
+    cache = CacheManager(cache_dir) if cache_dir else None
+    threads = [
+        threading.Thread(target=_feed_fifo, args=(*job, cache, stopped), daemon=False)
+        for job in jobs
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _exit_with_parent(parent_pid: int):
+    # Feeders may wait forever on pipes nobody will open if the parent is killed
+    while os.getppid() == parent_pid:
+        time.sleep(1)
+    os._exit(1)
+
+
+def _feed_fifo(url: str, filepath: str, fifo_path: str, cache: CacheManager | None, stopped):
+    temp_filepath = f"{filepath}.{os.getpid()}.tmp"
+    try:
+        # Blocks until the parser opens the pipe: files are downloaded when parsed
+        with open(fifo_path, "wb", buffering=0) as fifo:
+            if stopped.is_set():
+                # Opened by the release of a stream closed early, not by a parser
+                logging.debug(f"Stream closed before {url} was parsed")
+                return
+            checksum = asyncio.run(_tee_download(url, temp_filepath, fifo))
+        if checksum is not None:
+            os.rename(temp_filepath, filepath)
+            if cache is not None:
+                cache.add(url, filepath, checksum=f"{checksum:08x}")
+            return
+    except BrokenPipeError:
+        logging.debug(f"Parser of {url} closed before the end of the download")
+    except OSError as e:
+        # e.g. the temporary cache directory was removed by an abandoned stream
+        logging.debug(f"Streaming {url} aborted: {e}")
+    if os.path.exists(temp_filepath):
+        os.remove(temp_filepath)
+
+
+async def _tee_download(url: str, temp_filepath: str, fifo) -> int | None:
+    """Download `url` to `temp_filepath`, writing each chunk to `fifo` as well.
+
+    Errors are only retried before the first chunk is forwarded, as the parser
+    cannot rewind. Hosts asking to slow down (429 or 503) are retried after
+    their Retry-After delay.
+
+    Returns:
+        int | None: crc32 checksum of the file on success, None otherwise.
+    """
+    from pybgpflux.bgpstream import MAX_RETRIES, INITIAL_BACKOFF
+
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=300)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        for attempt in range(MAX_RETRIES + 1):
+            forwarded = False
+            try:
+                async with session.get(url) as resp:
+                    resp.raise_for_status()
+                    checksum = 0
+                    with open(temp_filepath, "wb") as fd:
+                        async for chunk in resp.content.iter_chunked(32768):
+                            checksum = zlib.crc32(chunk, checksum)
+                            fd.write(chunk)
+                            # Blocking write: the parser paces the download
+                            fifo.write(chunk)
+                            forwarded = True
+                    return checksum
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if forwarded or attempt == MAX_RETRIES:
+                    logging.error(f"Failed to stream {url}: {e}")
+                    return None
+                backoff = INITIAL_BACKOFF * (2**attempt)
+                if isinstance(e, aiohttp.ClientResponseError) and e.status in THROTTLE_STATUSES:
+                    backoff = max(backoff, retry_after(e.headers) or 0.0)
+                logging.warning(
+                    f"Retrying {url} in {backoff}s due to error: {e} (Attempt {attempt + 1}/{MAX_RETRIES})"
+                )
+                await asyncio.sleep(backoff)
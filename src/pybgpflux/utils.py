@@ -10,3 +10,22 @@ def dt_from_filepath(filepath: str, pattern=r"(\d{8}\.\d{4})") -> datetime.datet
     dt = datetime.datetime.strptime(timestamp_str, "%Y%m%d.%H%M")
     dt = dt.replace(tzinfo=datetime.timezone.utc)
     return dt
+
+
+# Time (seconds) covered by each update dump of the archives, by collector name prefix
+UPDATE_INTERVALS = {"rrc": 5 * 60, "route-views": 15 * 60}
+
+
+def dump_span(filepath: str, collector: str, is_rib: bool) -> tuple[float, float | None]:
+    """Time range [start, end) of the elements of a dump, from its file name.
+
+    RIB dumps are a snapshot at their start time (end = start). The end of the
+    update dumps of unknown collectors is None.
+    """
+    start = dt_from_filepath(filepath).timestamp()
+    if is_rib:
+        return start, start
+    for prefix, interval in UPDATE_INTERVALS.items():
+        if collector.startswith(prefix):
+            return start, start + interval
+    return start, None
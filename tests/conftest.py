@@ -0,0 +1,38 @@
+"""Offline fixtures: a synthetic archive (benchmarks.fixtures) served over HTTP and listed by the broker."""
+
+from contextlib import ExitStack
+from unittest import mock
+
+import pytest
+
+from benchmarks.fixtures import LocalArchive, LocalBroker
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+COLLECTORS = ["route-views.wide", "rrc06"]
+
+
+@pytest.fixture
+def make_archive(tmp_path):
+    """Factory of `LocalArchive`s, served over HTTP and listed by `bgpkit.Broker` until the end of the test.
+
+    The archive starts empty: dumps are generated by its `ensure` method. Tests
+    may serve it again with their own `ArchiveHandler` (see `LocalArchive.serve`).
+    """
+    with ExitStack() as stack:
+
+        def make(updates_per_file: int = 50, prefixes_per_rib: int = 100) -> LocalArchive:
+            archive = LocalArchive(str(tmp_path / "archive"), updates_per_file, prefixes_per_rib)
+            archive.serve()
+            stack.callback(archive.shutdown)
+            stack.enter_context(mock.patch("bgpkit.Broker", lambda: LocalBroker(archive)))
+            return archive
+
+        yield make
+
+
+@pytest.fixture
+def local_archive(make_archive):
+    """Update and RIB dumps of `COLLECTORS` over the two hours around `T0`"""
+    archive = make_archive()
+    archive.ensure(COLLECTORS, ["update", "rib"], T0 - 3600, T0 + 3600)
+    return archive
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import pytest
+
+from pybgpflux import BGPStream
+from pybgpflux.merge import amerge
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+
+
+async def _batches(*batches):
+    for batch in batches:
+        await asyncio.sleep(0)
+        yield list(batch)
+
+
+def test_amerge():
+    async def merged():
+        sources = [_batches([1, 4], [4, 9]), _batches(), _batches([2], [3, 4, 10])]
+        return [batch async for batch in amerge(sources, float, batch_size=3)]
+
+    batches = asyncio.run(merged())
+    assert [len(batch) for batch in batches] == [3, 3, 2]
+    assert sum(batches, []) == [1, 2, 3, 4, 4, 4, 9, 10]
+
+
+@pytest.mark.parametrize("data_type", [["rib", "update"], ["rib"]])
+@pytest.mark.parametrize("chunk_time", [None, 1800])
+def test_stream_async(local_archive, tmp_path, data_type, chunk_time):
+    def make_stream(cache_dir):
+        (tmp_path / cache_dir).mkdir(exist_ok=True)
+        return BGPStream(
+            collectors=["route-views.wide", "rrc06"],
+            data_type=data_type,
+            ts_start=T0,
+            ts_end=T0 + 3599,
+            cache_dir=str(tmp_path / cache_dir),
+            chunk_time=chunk_time,
+        )
+
+    expected = [str(elem) for elem in make_stream("sync")]
+
+    async def consume():
+        ticks = 0
+
+        async def tick():
+            # The loop keeps running other tasks while the stream downloads and parses
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = asyncio.create_task(tick())
+        try:
+            return [str(elem) async for elem in make_stream("async")], ticks
+        finally:
+            ticker.cancel()
+
+    elements, ticks = asyncio.run(consume())
+    assert elements == expected and expected
+    assert ticks > 1
+
+
+def test_stream_async_closed_early(local_archive, tmp_path):
+    (tmp_path / "cache").mkdir()
+    stream = BGPStream(
+        collectors=["route-views.wide", "rrc06"],
+        data_type=["update"],
+        ts_start=T0,
+        ts_end=T0 + 3599,
+        cache_dir=str(tmp_path / "cache"),
+        chunk_time=1800,
+    )
+
+    async def first():
+        elements = stream.__aiter__()
+        elem = await anext(elements)
+        await elements.aclose()
+        return elem
+
+    assert asyncio.run(first()).time >= T0
+    assert stream.paths is None
+
+
+class _LoopRecordingStream(BGPStream):
+    """Records the event loop and thread of each download"""
+
+    downloads: list = []
+
+    async def _download_file(self, session, url, filepath):
+        self.downloads.append((asyncio.get_running_loop(), threading.current_thread()))
+        return await super()._download_file(session, url, filepath)
+
+
+@pytest.mark.parametrize("chunk_time", [None, 1800])
+def test_stream_async_downloads_on_running_loop(local_archive, tmp_path, chunk_time):
+    _LoopRecordingStream.downloads = []
+    stream = _LoopRecordingStream(
+        collectors=["route-views.wide", "rrc06"],
+        data_type=["update"],
+        ts_start=T0,
+        ts_end=T0 + 3599,
+        chunk_time=chunk_time,
+    )
+
+    async def consume():
+        return [elem async for elem in stream], asyncio.get_running_loop()
+
+    elements, loop = asyncio.run(consume())
+    assert elements and _LoopRecordingStream.downloads
+    # No loop nor thread of the downloader's own
+    assert set(_LoopRecordingStream.downloads) == {
+        (loop, threading.main_thread())
+    }
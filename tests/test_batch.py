@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from pybgpflux import BGPElement
+from pybgpflux.batch import TYPES, DictionaryColumn, ElementBatch, element_to_row, row_to_element
+from pybgpflux.bgpparser import PyBGPKITParser
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+
+
+@pytest.fixture
+def elements(local_archive) -> list[BGPElement]:
+    """RIB entries, announcements and withdrawals of the local archive"""
+    return [
+        elem
+        for data_type in ("rib", "update")
+        for _, _, path in local_archive.files("rrc06", data_type, T0, T0 + 900)
+        for elem in PyBGPKITParser(
+            os.path.join(local_archive.root, path), data_type == "rib", "rrc06"
+        )
+    ]
+
+
+def test_element_row_round_trip(elements):
+    assert {elem.type for elem in elements} == {"R", "A", "W"}
+    rows = [element_to_row(elem) for elem in elements]
+    assert [row_to_element(row) for row in rows] == elements
+    # pybgpstream-like elements (fields dict only) give the same rows
+    from_fields = [BGPElement(*elem[:5], dict(elem.fields)) for elem in elements]
+    assert [element_to_row(elem) for elem in from_fields] == rows
+
+
+def test_batch_round_trip(elements):
+    rows = [element_to_row(elem) for elem in elements]
+    batch = ElementBatch(rows)
+
+    assert len(batch) == len(rows)
+    assert list(batch.rows()) == rows
+    assert list(batch.to_elements()) == elements
+    assert [TYPES[code] for code in batch.type] == [elem.type for elem in elements]
+    # Per-batch dictionaries: each value once
+    assert batch.collector.values == ["rrc06"]
+    assert len(batch.prefix.values) == len({elem.prefix for elem in elements})
+
+
+def test_batch_element_types():
+    peer_state = BGPElement(T0, "S", "rrc06", 2497, "202.249.2.169", {"new-state": "up"})
+    batch = ElementBatch([element_to_row(peer_state)])
+    assert next(batch.to_elements()).type == "S"
+
+    unknown = element_to_row(peer_state._replace(type="X"))
+    with pytest.raises(ValueError, match="'X'"):
+        ElementBatch([unknown])
+
+
+def test_dictionary_column():
+    column = DictionaryColumn(["b", None, "a", "b", None])
+    assert column.values == ["b", None, "a"]
+    assert list(column.codes) == [0, 1, 2, 0, 1]
+    assert len(column) == 5 and column[3] == "b"
+    assert column.decode() == ["b", None, "a", "b", None]
+
+
+def test_batch_to_numpy(elements):
+    np = pytest.importorskip("numpy")
+    batch = ElementBatch([element_to_row(elem) for elem in elements])
+    columns = batch.to_numpy()
+
+    assert columns["time"].tolist() == [elem.time for elem in elements]
+    assert columns["time"].dtype == np.float64 and columns["type"].dtype == np.uint8
+    # Numeric columns are views of the batch arrays
+    assert np.shares_memory(columns["peer_asn"], np.frombuffer(batch.peer_asn, dtype=np.uint32))
+    prefixes = columns["prefix_values"][columns["prefix"]]
+    assert prefixes.tolist() == [elem.prefix for elem in elements]
@@ -0,0 +1,34 @@
+from benchmarks.bench_stream import (
+    MARKER_END,
+    MARKER_START,
+    Scenario,
+    markdown,
+    run,
+    write_perf,
+)
+
+
+def test_bench_stream_offline(make_archive, tmp_path):
+    """The benchmark runs BGPStream end to end against the synthetic archive"""
+    archive = make_archive()
+    results = [
+        run(archive, Scenario("pybgpkit", "default", cache_type, "update", "single", "short"))
+        for cache_type in ("no cache", "cache hit")
+    ] + [run(archive, Scenario("pybgpkit", "default", "cache miss", "rib", "few", "short"))]
+
+    no_cache, cache_hit, rib = results
+    assert no_cache.count > 0 and no_cache.count == cache_hit.count
+    assert 0 < cache_hit.ttfe <= cache_hit.runtime
+    # One RIB per collector, every prefix seen by the 4 peers
+    assert rib.count % 4 == 0 and 0 < rib.count <= 2 * 4 * 100
+    assert all(result.peak_rss > 0 for result in results)
+
+    perf = tmp_path / "perf.md"
+    perf.write_text("# Performances\n")
+    write_perf(str(perf), markdown(results, archive, "bench"))
+    write_perf(str(perf), markdown(results[:1], archive, "bench"))
+    content = perf.read_text()
+    assert content.startswith("# Performances\n")
+    assert content.count(MARKER_START) == content.count(MARKER_END) == 1
+    assert "| default | No cache | Update | Single | Short |" in content
+    assert "Cache hit" not in content
@@ -0,0 +1,147 @@
+import sqlite3
+from itertools import islice
+from unittest import mock
+
+import pytest
+
+from benchmarks.fixtures import LocalArchive, LocalBroker
+from pybgpflux import BGPStream
+from pybgpflux.broker import BrokerCache
+
+HOUR = 3600
+# 2010-09-01 00:01 UTC: off the dump boundaries, where the broker's
+# and the cache's inclusive bounds may differ by a file
+T0 = 1283299200 + 60
+
+
+@pytest.fixture(scope="module")
+def archive(tmp_path_factory):
+    archive = LocalArchive(
+        str(tmp_path_factory.mktemp("archive")), updates_per_file=10, prefixes_per_rib=10
+    )
+    archive.ensure(["rrc00", "rrc01", "route-views2"], ["update"], T0, T0 + 3 * HOUR)
+    return archive
+
+
+@pytest.fixture
+def broker(archive):
+    # Records the queries sent to the broker
+    return mock.Mock(wraps=LocalBroker(archive))
+
+
+def calls(broker) -> list[tuple]:
+    return [
+        (call.kwargs["ts_start"], call.kwargs["ts_end"], call.kwargs["collector_id"])
+        for call in broker.query.call_args_list
+    ]
+
+
+def by_collector(items) -> dict[str, list[str]]:
+    urls = {}
+    for item in items:
+        urls.setdefault(item.collector_id, []).append(item.url)
+    return urls
+
+
+def test_broker_cache_offline_when_covered(tmp_path, broker):
+    cache = BrokerCache(str(tmp_path / "broker.sqlite"), broker)
+
+    first = cache.query(T0, T0 + 2 * HOUR, "rrc00,rrc01", "update")
+    second = cache.query(T0, T0 + 2 * HOUR, "rrc00,rrc01", "update")
+    inner = cache.query(T0 + HOUR, T0 + 2 * HOUR, "rrc00", "update")
+
+    assert broker.query.call_count == 1
+    assert {i.url for i in first} == {i.url for i in second}
+    assert {i.url for i in inner} == {
+        i.url for i in broker.query(T0 + HOUR, T0 + 2 * HOUR, "rrc00", "update")
+    }
+
+
+def test_broker_cache_queries_delta(tmp_path, broker):
+    cache = BrokerCache(str(tmp_path / "broker.sqlite"), broker)
+
+    cache.query(T0, T0 + 2 * HOUR, "rrc00", "update")
+    items = cache.query(T0 + HOUR, T0 + 3 * HOUR, "rrc00,rrc01", "update")
+
+    # rrc00 only misses the last hour, rrc01 the whole window
+    assert calls(broker)[1:] == [
+        (T0 + 2 * HOUR, T0 + 3 * HOUR, "rrc00"),
+        (T0 + HOUR, T0 + 3 * HOUR, "rrc01"),
+    ]
+    expected = broker.query(T0 + HOUR, T0 + 3 * HOUR, "rrc00,rrc01", "update")
+    assert {i.url for i in items} == {i.url for i in expected}
+
+
+def test_broker_cache_persistent(tmp_path, broker):
+    BrokerCache(str(tmp_path / "broker.sqlite"), broker).query(
+        T0, T0 + HOUR, "rrc00", "update"
+    )
+    BrokerCache(str(tmp_path / "broker.sqlite"), broker).query(
+        T0, T0 + HOUR, "rrc00", "update"
+    )
+
+    assert broker.query.call_count == 1
+
+
+def test_broker_cache_skips_recent_windows(tmp_path, broker):
+    # Every window is "recent": nothing is recorded as covered
+    cache = BrokerCache(str(tmp_path / "broker.sqlite"), broker, min_age=1e12)
+
+    cache.query(T0, T0 + HOUR, "rrc00", "update")
+    cache.query(T0, T0 + HOUR, "rrc00", "update")
+
+    assert broker.query.call_count == 2
+
+
+def test_broker_cache_keeps_broker_order(tmp_path, broker):
+    """Same collector order as the broker: equal-time elements come out in the same order"""
+    cache = BrokerCache(str(tmp_path / "broker.sqlite"), broker)
+    collectors = "rrc01,route-views2,rrc00"
+
+    missed = cache.query(T0, T0 + 2 * HOUR, collectors, "update")
+    hit = cache.query(T0, T0 + 2 * HOUR, collectors, "update")
+    delta = cache.query(T0, T0 + 3 * HOUR, collectors, "update")
+
+    assert broker.query.call_count == 2
+    expected = broker.query(T0, T0 + 2 * HOUR, collectors, "update")
+    assert [i.url for i in missed] == [i.url for i in expected]
+    assert [i.url for i in hit] == [i.url for i in expected]
+    # Assembled from two queries: the items of the second one come last, but
+    # the collectors (and the items of each collector) keep the broker's order
+    expected = broker.query(T0, T0 + 3 * HOUR, collectors, "update")
+    assert by_collector(delta) == by_collector(expected)
+    assert list(by_collector(delta)) == collectors.split(",")
+
+
+class _RecordingCache(BrokerCache):
+    opened: list = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opened.append(self)
+
+
+@pytest.mark.parametrize("stop_after", [None, 10])
+def test_stream_broker_cache_closed(local_archive, tmp_path, stop_after):
+    """One broker cache per stream, shared by its chunk workers and closed on release"""
+    _RecordingCache.opened = []
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    with mock.patch("pybgpflux.bgpstream.BrokerCache", _RecordingCache):
+        stream = BGPStream(
+            collectors=["route-views.wide", "rrc06"],
+            data_type=["update"],
+            ts_start=T0,
+            ts_end=T0 + HOUR - 120,
+            cache_dir=str(cache_dir),
+            chunk_time=900,
+        )
+        assert not _RecordingCache.opened
+        elements = iter(stream)
+        for _ in islice(elements, stop_after):
+            pass
+        elements.close()
+
+    assert len(_RecordingCache.opened) == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        _RecordingCache.opened[0].query(T0, T0 + HOUR, "rrc06", "update")
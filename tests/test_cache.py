@@ -0,0 +1,151 @@
+import os
+import time
+import multiprocessing
+from contextlib import closing
+
+import pytest
+
+from pybgpflux import BGPStream
+from pybgpflux.cache import CacheManager
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+
+
+def add_file(cache: CacheManager, name: str, size: int) -> str:
+    """Write a fake cached file of `size` bytes and record it in the cache"""
+    filepath = os.path.join(cache.name, name)
+    with open(filepath, "wb") as f:
+        f.write(b"\0" * size)
+    cache.add(f"https://archive/{name}", filepath)
+    # Make access times distinct
+    time.sleep(0.01)
+    return filepath
+
+
+def test_cache_lookup(tmp_path):
+    cache = CacheManager(tmp_path)
+    filepath = add_file(cache, "a.bz2", 10)
+
+    assert cache.lookup("https://archive/a.bz2", filepath)
+    assert not cache.lookup("https://archive/b.bz2", os.path.join(tmp_path, "b.bz2"))
+    assert cache.size() == 10
+
+
+def test_cache_adopts_unindexed_files(tmp_path):
+    filepath = os.path.join(tmp_path, "old.bz2")
+    with open(filepath, "wb") as f:
+        f.write(b"\0" * 5)
+
+    cache = CacheManager(tmp_path)
+    assert cache.lookup("https://archive/old.bz2", filepath)
+    assert cache.size() == 5
+
+
+def test_cache_lru_eviction(tmp_path):
+    cache = CacheManager(tmp_path, max_size=25)
+    a = add_file(cache, "a.bz2", 10)
+    b = add_file(cache, "b.bz2", 10)
+    c = add_file(cache, "c.bz2", 10)
+    # a becomes the most recently used
+    cache.lookup("https://archive/a.bz2", a)
+
+    assert cache.evict() == [b]
+    assert os.path.exists(a) and not os.path.exists(b) and os.path.exists(c)
+    assert cache.size() == 20
+
+
+def test_cache_lfu_eviction(tmp_path):
+    cache = CacheManager(tmp_path, max_size=25, eviction="lfu")
+    a = add_file(cache, "a.bz2", 10)
+    b = add_file(cache, "b.bz2", 10)
+    add_file(cache, "c.bz2", 10)
+    for _ in range(3):
+        cache.lookup("https://archive/a.bz2", a)
+    cache.lookup("https://archive/b.bz2", b)
+
+    assert [os.path.basename(p) for p in cache.evict()] == ["c.bz2"]
+
+
+def test_cache_pinned_files_are_kept(tmp_path):
+    cache = CacheManager(tmp_path, max_size=15)
+    a = add_file(cache, "a.bz2", 10)
+    b = add_file(cache, "b.bz2", 10)
+
+    cache.pin([a])
+    assert cache.evict() == [b]
+
+    cache.unpin([a])
+    cache.max_size = 5
+    assert cache.evict() == [a]
+
+
+def test_cache_shared_between_instances(tmp_path):
+    """Two managers (e.g. two processes) see the same index"""
+    first = CacheManager(tmp_path, max_size=100)
+    second = CacheManager(tmp_path, max_size=15)
+    a = add_file(first, "a.bz2", 10)
+    add_file(first, "b.bz2", 10)
+
+    assert second.size() == 20
+    assert second.evict() == [a]
+    assert not first.lookup("https://archive/a.bz2", a)
+
+
+def _pin_until(path: str, filepath: str, pinned, done):
+    CacheManager(path).pin([filepath])
+    pinned.set()
+    done.wait()
+
+
+def test_cache_pins_shared_between_processes(tmp_path):
+    """Files pinned by another process are kept, until that process is gone"""
+    cache = CacheManager(tmp_path, max_size=15)
+    a = add_file(cache, "a.bz2", 10)
+    b = add_file(cache, "b.bz2", 10)
+
+    context = multiprocessing.get_context("spawn")
+    pinned, done = context.Event(), context.Event()
+    process = context.Process(target=_pin_until, args=(str(tmp_path), a, pinned, done))
+    process.start()
+    try:
+        assert pinned.wait(60)
+        assert cache.evict() == [b]
+    finally:
+        done.set()
+        process.join()
+
+    # Exited without unpinning: its pins are dropped
+    cache.max_size = 5
+    assert cache.evict() == [a]
+
+
+def test_cache_invalid_policy(tmp_path):
+    with pytest.raises(ValueError):
+        CacheManager(tmp_path, eviction="fifo")
+
+
+@pytest.mark.parametrize("option, ext", [("element_cache", ".elements"), ("file_index", ".summary")])
+def test_stream_cache_budget(local_archive, tmp_path, option, ext):
+    """Files derived from the MRT files, by the stream or by pool workers, count in the budget"""
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    for workers in (1, 2):
+        stream = BGPStream(
+            collectors=["route-views.wide", "rrc06"],
+            data_type=["rib", "update"],
+            ts_start=T0 + 1800 * (workers - 1),
+            ts_end=T0 + 1800 * workers - 1,
+            cache_dir=str(cache),
+            cache_max_size=1 << 30,
+            workers=workers,
+            **{option: True},
+        )
+        assert list(stream)
+
+    derived = {name for name in os.listdir(cache) if name.endswith(ext)}
+    manager = CacheManager(str(cache), max_size=0)
+    with closing(manager._connect()) as conn:
+        indexed = {filename for (filename,) in conn.execute("SELECT filename FROM files")}
+    assert derived and derived <= indexed
+    manager.evict()
+    assert not any(name.endswith(ext) for name in os.listdir(cache))
@@ -0,0 +1,29 @@
+import os
+
+from pybgpflux import BGPStream
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+
+
+def test_stream_cache_decompressed(local_archive, tmp_path):
+    (tmp_path / "cache").mkdir()
+    runs = []
+    for cache_decompressed in (False, True, True):
+        stream = BGPStream(
+            collectors=["route-views.wide", "rrc06"],
+            data_type=["rib", "update"],
+            ts_start=T0,
+            ts_end=T0 + 3599,
+            cache_dir=str(tmp_path / "cache"),
+            chunk_time=1800,
+            stats=True,
+            cache_decompressed=cache_decompressed,
+        )
+        runs.append(([str(elem) for elem in stream], stream.stats))
+
+    (expected, _), (cold, cold_stats), (warm, warm_stats) = runs
+    assert cold == expected and warm == expected and expected
+    assert cold_stats.stages["decompress"].calls > 0
+    assert warm_stats.stages["decompress"].calls == 0
+    assert warm_stats.cache_hit_ratio == 1
+    assert any(name.endswith(".mrt") for name in os.listdir(tmp_path / "cache"))
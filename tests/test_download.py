@@ -0,0 +1,435 @@
+import asyncio
+import dataclasses
+import multiprocessing
+import os
+import re
+import email.utils
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+import pytest
+
+from benchmarks.fixtures import ArchiveHandler, LocalBroker
+from pybgpflux import BGPStream
+from pybgpflux.bgpparser import PyBGPKITParser
+from pybgpflux.cache import CacheManager
+from pybgpflux.download import HostLimiter, retry_after, split_parts
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+
+
+def test_retry_after():
+    assert retry_after({"Retry-After": "3"}) == 3.0
+    date = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 50 < retry_after({"Retry-After": date}) <= 60
+    assert retry_after({"Retry-After": "soon"}) is None
+    assert retry_after({}) is None and retry_after(None) is None
+
+
+def test_host_limiter():
+    async def run():
+        limiter = HostLimiter(4)
+        limiter.throttled()
+        assert limiter.window == 2
+        await limiter.acquire()
+        await limiter.acquire()
+        third = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not third.done()
+        limiter.release()
+        await third
+        assert limiter.active == 2
+
+        # Fast responses grow the window back, slow ones do not
+        limiter.responded(0.1)
+        limiter.responded(1.0)
+        assert limiter.window == 2.5
+        while limiter.window < 4:
+            limiter.responded(0.1)
+        assert limiter.window == 4
+
+        # Retry-After pauses the host
+        limiter.throttled(0.2)
+        limiter.release()
+        limiter.release()
+        start = time.perf_counter()
+        await limiter.acquire()
+        assert time.perf_counter() - start >= 0.15
+
+    asyncio.run(run())
+
+
+class _ThrottlingHandler(ArchiveHandler):
+    """Turns down the first request of each file (429), and counts connections"""
+
+    lock = threading.Lock()
+    seen: set = set()
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            type(self).connections += 1
+
+    def do_GET(self):
+        with self.lock:
+            first = self.path not in self.seen
+            self.seen.add(self.path)
+        if first:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        super().do_GET()
+
+
+def test_stream_throttled(local_archive, tmp_path):
+    (tmp_path / "cache").mkdir()
+    kwargs = dict(
+        collectors=["route-views.wide", "rrc06"],
+        data_type=["update"],
+        ts_start=T0,
+        ts_end=T0 + 3599,
+        chunk_time=900,
+        max_concurrent_downloads=2,
+        stats=True,
+    )
+    expected = [str(elem) for elem in BGPStream(**kwargs)]
+    local_archive.serve(_ThrottlingHandler)
+    stream = BGPStream(cache_dir=str(tmp_path / "cache"), **kwargs)
+    elements = [str(elem) for elem in stream]
+
+    assert elements == expected and expected
+    assert stream.stats.download_failures == 0
+    # Each file was requested twice, over connections kept from one chunk to the next
+    files = stream.stats.files_downloaded
+    assert files == len(_ThrottlingHandler.seen)
+    # (both collectors are on the same host, limited to 2 concurrent downloads)
+    assert _ThrottlingHandler.connections <= 2
+
+
+class _CuttingHandler(ArchiveHandler):
+    """Cuts the first response of each file halfway, and records the requested ranges"""
+
+    lock = threading.Lock()
+    requests: list = []
+
+    def send_head(self):
+        with self.lock:
+            self.first = not any(path == self.path for path, _ in self.requests)
+            self.requests.append((self.path, self.headers.get("Range")))
+        return super().send_head()
+
+    def copyfile(self, source, outputfile):
+        if self.first:
+            data = source.read()
+            outputfile.write(data[: len(data) // 2])
+            outputfile.flush()
+            # Let the client read the half before the connection is cut
+            time.sleep(0.2)
+            self.close_connection = True
+            return
+        super().copyfile(source, outputfile)
+
+
+def test_split_parts():
+    assert [(p.start, p.end) for p in split_parts(None, 4)] == [(0, None)]
+    assert len(split_parts(1 << 20, 4)) == 1
+    parts = split_parts(100 << 20, 3)
+    assert [p.end - p.start for p in parts] == [34952534, 34952534, 34952532]
+    assert parts[-1].end == 100 << 20 and parts[0].checksum is None
+
+
+@pytest.mark.parametrize("download_parts", [1, 3])
+def test_stream_resumed_download(make_archive, tmp_path, download_parts):
+    archive = make_archive(prefixes_per_rib=2000)
+    archive.ensure(["route-views.wide"], ["rib"], T0, T0 + 3600)
+    (tmp_path / "cache").mkdir()
+    _CuttingHandler.requests = []
+    kwargs = dict(
+        collectors=["route-views.wide"],
+        data_type=["rib"],
+        ts_start=T0,
+        ts_end=T0 + 3599,
+        download_parts=download_parts,
+        stats=True,
+    )
+    with mock.patch("pybgpflux.download.PARTS_MIN_SIZE", 1024):
+        expected = [str(elem) for elem in BGPStream(**kwargs)]
+        archive.serve(_CuttingHandler)
+        stream = BGPStream(cache_dir=str(tmp_path / "cache"), **kwargs)
+        elements = [str(elem) for elem in stream]
+
+    assert elements == expected and expected
+    assert stream.stats.download_failures == 0 and stream.stats.files_downloaded == 1
+    ranges = [header for _, header in _CuttingHandler.requests]
+    if download_parts == 1:
+        # The retry resumes after the received half
+        first, retry = ranges
+        assert first is None and re.fullmatch(r"bytes=\d+-", retry)
+        assert int(retry[6:-1]) > 0
+    else:
+        # 3 ranges, then the retry of the one that was cut, after its received half
+        first, *others, retry = ranges
+        assert len(set([first, *others])) == 3 and all(ranges)
+        (start, end), (resumed, retry_end) = (r[6:].split("-") for r in (first, retry))
+        assert retry_end == end and int(start) < int(resumed) < int(end)
+
+
+def test_stream_prefetch_chunks(local_archive, tmp_path):
+    def run(prefetch_chunks):
+        stream = BGPStream(
+            collectors=["route-views.wide", "rrc06"],
+            data_type=["update"],
+            ts_start=T0,
+            ts_end=T0 + 3599,
+            chunk_time=600,
+            prefetch_chunks=prefetch_chunks,
+        )
+        return [str(elem) for elem in stream]
+
+    expected = run(0)
+    assert expected
+    # The lookahead only changes when chunks are downloaded
+    for prefetch_chunks in (1, 3, 10):
+        assert run(prefetch_chunks) == expected
+
+
+@pytest.mark.parametrize("prefetch_chunks", [0, 3])
+def test_stream_closed_early(local_archive, tmp_path, prefetch_chunks):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    stream = BGPStream(
+        collectors=["route-views.wide", "rrc06"],
+        data_type=["update"],
+        ts_start=T0,
+        ts_end=T0 + 3599,
+        cache_dir=str(cache_dir),
+        chunk_time=600,
+        prefetch_chunks=prefetch_chunks,
+    )
+    elements = iter(stream)
+    for _ in range(10):
+        next(elements)
+    elements.close()
+
+    # Downloads stopped, and no file left pinned nor half-written
+    assert not list(cache_dir.glob("*.tmp"))
+    cache = CacheManager(str(cache_dir), max_size=0)
+    cache.evict()
+    assert cache.size() == 0
+    # Only the cache and broker indexes are left
+    assert all(path.suffix == ".sqlite" for path in cache_dir.iterdir())
+
+
+class _GatedHandler(ArchiveHandler):
+    """Holds the requests of the `held` file until `gate` is set, turns down the `missing` one,
+    and records the requested paths"""
+
+    gate = threading.Event()
+    held = missing = None
+    timed_out = False
+    requested: set = set()
+
+    def send_head(self):
+        self.requested.add(self.path)
+        if self.path == self.held:
+            type(self).timed_out = not self.gate.wait(10)
+        elif self.path == self.missing:
+            self.send_error(404)
+            return None
+        return super().send_head()
+
+
+def _dump_paths(archive, ts_start, ts_end) -> list[str]:
+    return [path for _, _, path in archive.files("rrc06", "update", ts_start, ts_end)]
+
+
+def test_stream_parses_before_downloads_finish(make_archive):
+    # Dumps larger than the batches read ahead by the merge
+    archive = make_archive(updates_per_file=1000)
+    archive.ensure(["rrc06"], ["update"], T0 - 300, T0 + 900)
+    kwargs = dict(collectors=["rrc06"], data_type=["update"], ts_start=T0, ts_end=T0 + 899)
+    expected = [str(elem) for elem in BGPStream(**kwargs)]
+    _GatedHandler.gate = threading.Event()
+    # The last dump of the window
+    _GatedHandler.held = f"/{_dump_paths(archive, T0 + 600, T0 + 600)[0]}"
+    _GatedHandler.missing = None
+    archive.serve(_GatedHandler)
+
+    elements = iter(BGPStream(**kwargs))
+    try:
+        first = next(elements)
+    finally:
+        _GatedHandler.gate.set()
+    # The first dumps were parsed while the last one was held by the server
+    assert not _GatedHandler.timed_out
+    assert [str(first), *map(str, elements)] == expected
+
+
+def test_stream_skips_failed_download(local_archive):
+    dumps = _dump_paths(local_archive, T0, T0 + 899)
+    _GatedHandler.held, _GatedHandler.missing = None, f"/{dumps[1]}"
+    local_archive.serve(_GatedHandler)
+    with mock.patch("pybgpflux.bgpstream.INITIAL_BACKOFF", 0.01):
+        stream = BGPStream(
+            collectors=["rrc06"],
+            data_type=["update"],
+            ts_start=T0,
+            ts_end=T0 + 899,
+            stats=True,
+        )
+        elements = [str(elem) for elem in stream]
+
+    # The other dumps are still parsed, in order
+    expected = [
+        str(elem)
+        for path in _dump_paths(local_archive, T0 - 300, T0 + 899)
+        if path != dumps[1]
+        for elem in PyBGPKITParser(os.path.join(local_archive.root, path), False, "rrc06")
+        if T0 <= elem.time <= T0 + 899
+    ]
+    assert elements == expected and expected
+    assert stream.stats.download_failures == 1
+
+
+def _stream_in_process(
+    archive, kwargs: dict, stop_after: int | None = None
+) -> tuple[list[str], bool]:
+    """Consume a stream, closed after `stop_after` elements if set.
+
+    Runs in a spawned process: the pybgpkit parser holds the GIL while it
+    waits on a named pipe, which would stall the HTTP server of the test process.
+
+    Returns:
+        tuple: the elements, and whether the processes feeding the pipes exited.
+    """
+    with mock.patch("bgpkit.Broker", lambda: LocalBroker(archive)):
+        elements = []
+        stream = iter(BGPStream(**kwargs))
+        for elem in stream:
+            elements.append(str(elem))
+            if len(elements) == stop_after:
+                stream.close()
+    helpers = multiprocessing.active_children()
+    for helper in helpers:
+        helper.join(10)
+    return elements, not any(helper.is_alive() for helper in helpers)
+
+
+@pytest.fixture
+def run_in_process():
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+
+        def run(*args):
+            # A parser blocked on its pipe fails the test instead of hanging it
+            return executor.submit(_stream_in_process, *args).result(timeout=60)
+
+        yield run
+
+
+def _streamed(cache_dir, **kwargs) -> dict:
+    return dict(
+        collectors=["rrc06"],
+        data_type=["update"],
+        ts_start=T0,
+        ts_end=T0 + 899,
+        cache_dir=str(cache_dir),
+        stream_downloads=True,
+        **kwargs,
+    )
+
+
+def test_stream_downloads(local_archive, tmp_path, run_in_process):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    kwargs = _streamed(cache_dir)
+    # Downloaded before parsing, without cache
+    plain = BGPStream(**kwargs | dict(cache_dir=None, stream_downloads=False))
+    expected = [str(elem) for elem in plain]
+
+    elements, exited = run_in_process(local_archive, kwargs)
+    assert elements == expected and expected
+    assert exited
+    # The streamed files were cached: the next run reads them from disk
+    assert not list(cache_dir.glob("*.fifo*")) and not list(cache_dir.glob("*.tmp"))
+    assert len(list(cache_dir.glob("*.gz"))) == len(_dump_paths(local_archive, T0 - 300, T0 + 899))
+    assert run_in_process(local_archive, kwargs)[0] == expected
+
+
+@pytest.mark.parametrize("handler", [_GatedHandler, _CuttingHandler])
+def test_stream_downloads_failed(local_archive, tmp_path, run_in_process, handler):
+    """Failed downloads end the file early: the parser moves on to the next pipe"""
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    kwargs = _streamed(cache_dir)
+    plain = BGPStream(**kwargs | dict(cache_dir=None, stream_downloads=False))
+    expected = [str(elem) for elem in plain]
+    dumps = _dump_paths(local_archive, T0 - 300, T0 + 899)
+    # Turned down (and retried) before the first byte, or cut halfway
+    _GatedHandler.held, _GatedHandler.missing = None, f"/{dumps[2]}"
+    _CuttingHandler.requests = []
+    local_archive.serve(handler)
+
+    elements, exited = run_in_process(local_archive, kwargs)
+    assert elements and set(elements) < set(expected)
+    assert exited
+    # Only the complete downloads were cached
+    assert not list(cache_dir.glob("*.fifo*")) and not list(cache_dir.glob("*.tmp"))
+    assert len(list(cache_dir.glob("*.gz"))) == (len(dumps) - 1 if handler is _GatedHandler else 0)
+
+
+def test_stream_downloads_closed_early(make_archive, tmp_path, run_in_process):
+    """Files not parsed yet are not downloaded once the stream is closed"""
+    # Dumps larger than the batches read ahead by the merge
+    archive = make_archive(updates_per_file=1000)
+    archive.ensure(["rrc06"], ["update"], T0 - 300, T0 + 900)
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    _GatedHandler.held = _GatedHandler.missing = None
+    _GatedHandler.requested = set()
+    archive.serve(_GatedHandler)
+
+    elements, exited = run_in_process(archive, _streamed(cache_dir), 10)
+    assert len(elements) == 10
+    assert exited
+    assert len(_GatedHandler.requested) < len(_dump_paths(archive, T0 - 300, T0 + 899))
+    assert not list(cache_dir.glob("*.fifo*")) and not list(cache_dir.glob("*.tmp"))
+
+
+class _StaleBroker(LocalBroker):
+    """Lists sizes off by `delta` bytes, like an archive file replaced after it was indexed"""
+
+    delta = 0
+
+    def query(self, *args, **kwargs):
+        return [
+            dataclasses.replace(item, exact_size=item.exact_size + self.delta)
+            for item in super().query(*args, **kwargs)
+        ]
+
+
+@pytest.mark.parametrize("download_parts", [1, 3])
+@pytest.mark.parametrize("delta", [-1000, 1000])
+def test_stream_stale_broker_size(make_archive, tmp_path, caplog, download_parts, delta):
+    """The server's size wins over the broker's"""
+    archive = make_archive(prefixes_per_rib=2000)
+    archive.ensure(["route-views.wide"], ["rib"], T0, T0 + 3600)
+    (tmp_path / "cache").mkdir()
+    kwargs = dict(collectors=["route-views.wide"], data_type=["rib"], ts_start=T0, ts_end=T0 + 3599)
+    expected = [str(elem) for elem in BGPStream(**kwargs)]
+    _StaleBroker.delta = delta
+    with mock.patch("bgpkit.Broker", lambda: _StaleBroker(archive)), mock.patch(
+        "pybgpflux.download.PARTS_MIN_SIZE", 1024
+    ), mock.patch("pybgpflux.bgpstream.INITIAL_BACKOFF", 0.01):
+        stream = BGPStream(
+            cache_dir=str(tmp_path / "cache"), download_parts=download_parts, stats=True, **kwargs
+        )
+        elements = [str(elem) for elem in stream]
+
+    assert elements == expected and expected
+    assert stream.stats.download_failures == 0 and stream.stats.files_downloaded == 1
+    assert "in the broker: keeping the server's" in caplog.text
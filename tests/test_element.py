@@ -0,0 +1,94 @@
+import heapq
+import pickle
+
+from pybgpflux import BGPElement
+
+ANNOUNCE = BGPElement(
+    1283299200.0,
+    "A",
+    "route-views.wide",
+    2497,
+    "202.249.2.169",
+    None,
+    "24.43.184.0/24",
+    "202.249.2.169",
+    "2497 3356 13335",
+    ["2497:22"],
+)
+WITHDRAW = BGPElement(
+    1283299100.0, "W", "rrc06", 2497, "202.249.2.169", None, "24.43.184.0/24"
+)
+
+
+def test_element_str():
+    assert str(ANNOUNCE) == (
+        "A|1283299200.000000|route-views.wide|2497|202.249.2.169|24.43.184.0/24|"
+        "202.249.2.169|2497 3356 13335|2497:22|None|None"
+    )
+    assert str(WITHDRAW) == (
+        "W|1283299100.000000|rrc06|2497|202.249.2.169|24.43.184.0/24|None|None|None|None|None"
+    )
+
+
+def test_element_lazy_fields():
+    assert ANNOUNCE.fields == {
+        "next-hop": "202.249.2.169",
+        "as-path": "2497 3356 13335",
+        "communities": ["2497:22"],
+        "prefix": "24.43.184.0/24",
+    }
+    assert ANNOUNCE.fields is ANNOUNCE.fields
+    # Same keys as the other elements
+    assert WITHDRAW.fields == {
+        "next-hop": None,
+        "as-path": None,
+        "communities": [],
+        "prefix": "24.43.184.0/24",
+    }
+
+
+def test_element_from_fields_dict():
+    """The former NamedTuple constructor is still supported"""
+    elem = BGPElement(
+        time=ANNOUNCE.time,
+        type="A",
+        collector="route-views.wide",
+        peer_asn=2497,
+        peer_address="202.249.2.169",
+        fields=dict(ANNOUNCE.fields),
+    )
+    assert elem == ANNOUNCE
+    assert str(elem) == str(ANNOUNCE)
+    assert elem.as_path == "2497 3356 13335"
+
+
+def test_element_tuple_compatibility():
+    time, type, collector, peer_asn, peer_address, fields = ANNOUNCE
+    assert (time, type, peer_asn) == (1283299200.0, "A", 2497)
+    assert ANNOUNCE[0] == time and ANNOUNCE[-1] is fields
+    assert ANNOUNCE._asdict()["collector"] == collector
+    assert ANNOUNCE._replace(peer_asn=1).peer_asn == 1
+
+
+def test_element_replace_flat_fields():
+    elem = ANNOUNCE._replace(time=0.0)
+    assert elem.fields == ANNOUNCE.fields and elem.time == 0.0
+    # Also once the fields dict was built, or when given as a dict
+    for base in (ANNOUNCE, BGPElement(*ANNOUNCE[:5], {**ANNOUNCE.fields, "old-state": "IDLE"})):
+        base.fields
+        elem = base._replace(as_path="2497 13335", communities=None)
+        assert elem.as_path == elem.fields["as-path"] == "2497 13335"
+        assert not elem.communities and elem.prefix == ANNOUNCE.prefix
+        assert elem._maybe_field("old-state") == base._maybe_field("old-state")
+    assert ANNOUNCE._replace(fields={"prefix": "10.0.0.0/8"}).prefix == "10.0.0.0/8"
+
+
+def test_element_ordering():
+    assert WITHDRAW < ANNOUNCE and WITHDRAW <= ANNOUNCE
+    merged = list(heapq.merge([WITHDRAW], [ANNOUNCE]))
+    assert merged == [WITHDRAW, ANNOUNCE]
+
+
+def test_element_pickle():
+    assert pickle.loads(pickle.dumps(ANNOUNCE)) == ANNOUNCE
+    assert str(pickle.loads(pickle.dumps(WITHDRAW))) == str(WITHDRAW)
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from pybgpflux import BGPStream
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+COLLECTORS = ["route-views.wide", "rrc06"]
+
+
+def test_stream_element_cache(local_archive, tmp_path):
+    cache = tmp_path / "cache"
+    cache.mkdir()
+
+    def make_stream(**kwargs):
+        return BGPStream(
+            collectors=COLLECTORS,
+            data_type=["rib", "update"],
+            ts_start=T0,
+            ts_end=T0 + 3599,
+            cache_dir=str(cache),
+            **kwargs,
+        )
+
+    def run(**kwargs):
+        stream = make_stream(chunk_time=1800, stats=True, **kwargs)
+        return [str(elem) for elem in stream], stream.stats
+
+    expected, _ = run()
+    cold, _ = run(element_cache=True)
+    elements = [name for name in os.listdir(cache) if name.endswith(".elements")]
+    # Element files replace the MRT files
+    for name in os.listdir(cache):
+        if name.endswith((".gz", ".bz2")):
+            os.remove(cache / name)
+    warm, warm_stats = run(element_cache=True)
+    batches = make_stream(element_cache=True).iter_batches()
+    rows = [row for batch in batches for row in batch.rows()]
+    # Other fields: other element files
+    projected, _ = run(element_cache=True, fields=["prefix"])
+
+    assert cold == expected and warm == expected and expected
+    assert [row[0] for row in rows] == [float(elem.split("|")[1]) for elem in expected]
+    assert elements and warm_stats.files_downloaded == 0 and warm_stats.cache_hit_ratio == 1
+    assert len(projected) == len(expected) and projected != expected
+    assert len(os.listdir(cache)) > len(elements) * 2
+    with pytest.raises(ValueError):
+        BGPStream(collectors=COLLECTORS, data_type=["update"], element_cache=True)
@@ -0,0 +1,39 @@
+import os
+
+from pybgpflux import BGPStream, FilterOptions
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+
+
+def test_stream_file_index(local_archive, tmp_path):
+    def run(cache, **kwargs):
+        cache.mkdir(exist_ok=True)
+        stream = BGPStream(
+            collectors=["route-views.wide", "rrc06"],
+            data_type=["rib", "update"],
+            ts_start=T0,
+            ts_end=T0 + 3599,
+            cache_dir=str(cache),
+            chunk_time=1800,
+            stats=True,
+            **kwargs,
+        )
+        return list(stream), stream.stats
+
+    elements, _ = run(tmp_path / "cache", file_index=True)
+    # Least frequent prefix: only in a few files
+    prefix = min(
+        {elem.prefix for elem in elements},
+        key=[elem.prefix for elem in elements].count,
+    )
+    filters = FilterOptions(prefix=prefix)
+    matches, stats = run(tmp_path / "cache", file_index=True, filters=filters)
+    # First parse of the files: filtered on the Python side to summarize them
+    filtered = FilterOptions(origin_asns=[elements[0].as_path.split()[-1]])
+    expected, _ = run(tmp_path / "plain", filters=filtered, fields=["as_path"])
+    indexed, _ = run(tmp_path / "indexed", file_index=True, filters=filtered, fields=["as_path"])
+
+    assert [str(e) for e in matches] == [str(e) for e in elements if e.prefix == prefix]
+    assert stats.files_skipped > 0
+    assert [str(e) for e in indexed] == [str(e) for e in expected] and expected
+    assert any(name.endswith(".summary") for name in os.listdir(tmp_path / "indexed"))
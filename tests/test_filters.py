@@ -371,3 +371,46 @@ def test_filter_aspath(parser):
     for elem in stream:
         count += 1
     assert count == target_count
+
+
+@pytest.mark.parametrize("parser", PARSERS_TO_TEST)
+def test_filter_multi_values(parser):
+    """
+    Test filtering by sets of origin ASNs and peer ASNs, evaluated together:
+    values of a set are OR-ed, options are AND-ed.
+    """
+    origin_asns = [27653, 13335, 15169]
+    peer_asns = [2497, 7500]
+    filters = FilterOptions(origin_asns=origin_asns, peer_asns=peer_asns)
+    stream = create_stream(parser, filters=filters)
+
+    count = 0
+    for elem in stream:
+        path = elem.fields.get("as-path", "")
+        if path and "{" not in path:
+            assert int(path.split(" ")[-1]) in origin_asns
+        assert elem.peer_asn in peer_asns
+        count += 1
+    assert count > 0
+
+
+@pytest.mark.parametrize("parser", PARSERS_TO_TEST)
+def test_filter_prefixes(parser):
+    """
+    Test filtering by a list of exact prefixes
+    """
+    stream = create_stream(parser, filters=FilterOptions(ip_version=4))
+    target_prefixes = set()
+    for elem in stream:
+        target_prefixes.add(elem.fields["prefix"])
+        if len(target_prefixes) == 3:
+            break
+
+    filters = FilterOptions(prefixes=sorted(target_prefixes))
+    stream = create_stream(parser, filters=filters)
+
+    unique_prefixes = set()
+    for elem in stream:
+        unique_prefixes.add(elem.fields["prefix"])
+
+    assert unique_prefixes == target_prefixes
@@ -0,0 +1,87 @@
+import gzip
+
+import pytest
+
+from benchmarks.fixtures import make_rib
+from pybgpflux import BGPElement, BGPStream
+from pybgpflux.bgpparser import PyBGPKITParser
+from pybgpflux.interning import Interner
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+
+
+@pytest.fixture(scope="module")
+def rib_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("interning") / "bview.20100901.0000.gz"
+    path.write_bytes(gzip.compress(make_rib(T0, 200, 1)))
+    return str(path)
+
+
+def test_interner_bounded():
+    interner = Interner(max_size=2)
+    first = interner("".join(["1", "2"]))
+    assert interner("".join(["1", "2"])) is first
+    interner("a")
+    interner("b")
+    assert len(interner) == 1
+    assert interner("".join(["1", "2"])) is not first
+
+
+def test_interner_elements(rib_path):
+    parser = PyBGPKITParser(rib_path, True, "rrc00")
+    expected = list(parser)
+    interner = Interner()
+    elements = [interner.element(elem) for elem in parser]
+
+    assert [str(elem) for elem in elements] == [str(elem) for elem in expected]
+    assert all(type(elem.communities) is tuple for elem in elements if elem.communities)
+    by_path = {}
+    for elem in elements:
+        assert by_path.setdefault(elem.as_path, elem.as_path) is elem.as_path
+    # Every element of a peer shares its address
+    assert len({id(elem.peer_address) for elem in elements}) == len(
+        {elem.peer_address for elem in elements}
+    )
+
+    rows = [interner.row(row) for row in parser.iter_rows()]
+    assert rows == list(parser.iter_rows())
+    assert rows[0][4] is elements[0].peer_address
+
+    # Elements built from a fields dict keep it in sync
+    fields = {
+        "prefix": "192.0.2.0/24",
+        "next-hop": "1.2.3.4",
+        "as-path": "2497 13335",
+        "communities": ["2497:1"],
+    }
+    elem = interner.element(BGPElement(T0, "A", "rrc00", 2497, "1.2.3.4", fields))
+    assert elem.communities == ("2497:1",)
+    assert elem.fields["communities"] is elem.communities
+
+
+def test_stream_interned(local_archive, tmp_path):
+    (tmp_path / "cache").mkdir()
+
+    def make_stream(**kwargs):
+        return BGPStream(
+            collectors=["route-views.wide", "rrc06"],
+            data_type=["rib", "update"],
+            ts_start=T0,
+            ts_end=T0 + 3599,
+            cache_dir=str(tmp_path / "cache"),
+            chunk_time=1800,
+            **kwargs,
+        )
+
+    expected = [str(elem) for elem in make_stream()]
+    stream = make_stream(intern_attributes=True)
+    elements = list(stream)
+    batches = list(stream.iter_batches())
+
+    assert [str(elem) for elem in elements] == expected
+    # One table for all the chunks of the stream
+    paths = {}
+    for elem in elements:
+        if elem.as_path:
+            assert paths.setdefault(elem.as_path, elem.as_path) is elem.as_path
+    assert sum(map(len, batches)) == len(expected)
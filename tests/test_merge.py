@@ -0,0 +1,45 @@
+import heapq
+import random
+from operator import itemgetter
+
+from pybgpflux.merge import merge, merge_batches
+
+
+def random_sources(rng: random.Random, shuffle: bool = False) -> list[list[tuple]]:
+    sources = []
+    for order in range(rng.randint(0, 6)):
+        times = sorted(rng.randint(0, 20) for _ in range(rng.randint(0, 30)))
+        if shuffle and len(times) > 2:
+            times[rng.randrange(len(times))] = rng.randint(0, 20)
+        sources.append([(time, order, i) for i, time in enumerate(times)])
+    return sources
+
+
+def test_merge_batches():
+    sources = [[[1, 1, 4]], [], [[0], [], [1, 2], [5, 6]]]
+    runs = list(merge_batches(sources))
+    assert runs == [[0], [1, 1], [1, 2], [4], [5, 6]]
+    # Runs are slices of the batches, or the batches themselves
+    assert runs[-1] is sources[2][3]
+
+
+def test_merge_like_heapq():
+    rng = random.Random(0)
+    for _ in range(500):
+        sources = random_sources(rng)
+        batch_size = rng.randint(1, 8)
+        assert list(merge(*sources, key=itemgetter(0), batch_size=batch_size)) == list(
+            heapq.merge(*sources, key=itemgetter(0))
+        )
+        assert list(merge(*sources, batch_size=batch_size)) == list(heapq.merge(*sources))
+
+
+def test_merge_out_of_order():
+    rng = random.Random(1)
+    for _ in range(500):
+        sources = random_sources(rng, shuffle=True)
+        merged = list(merge(*sources, key=itemgetter(0), batch_size=rng.randint(1, 8)))
+        assert sorted(merged) == sorted(sum(sources, []))
+        # Every source keeps its order
+        for order, source in enumerate(sources):
+            assert [elem for elem in merged if elem[1] == order] == source
@@ -0,0 +1,92 @@
+import gzip
+import random
+
+import pytest
+
+from benchmarks.fixtures import ORIGINS, PEERS, make_updates
+from pybgpflux import FilterOptions, StreamMultiplexer
+from pybgpflux.bgpparser import PyBGPKITParser
+from pybgpflux.filtering import compile_filter
+
+
+@pytest.fixture(scope="module")
+def elements(tmp_path_factory):
+    path = tmp_path_factory.mktemp("mux") / "updates.20100901.0000.gz"
+    path.write_bytes(gzip.compress(make_updates(1283299200, 1283299500, 2000, 1)))
+    return list(PyBGPKITParser(str(path), False, "rrc00"))
+
+
+def subscription_filters(elements) -> list[FilterOptions]:
+    rng = random.Random(0)
+    prefixes = [e.prefix for e in elements]
+    filters = [
+        FilterOptions(),
+        FilterOptions(update_type="withdraw"),
+        FilterOptions(prefixes_super=rng.sample(prefixes, 5)),
+    ]
+    for _ in range(20):
+        filters += [
+            FilterOptions(prefixes=rng.sample(prefixes, 10), peer_asn=rng.choice(PEERS)[0]),
+            FilterOptions(origin_asns=rng.sample(ORIGINS, 2), ip_version=rng.choice([4, 6])),
+            FilterOptions(prefixes_sub=[f"{rng.randrange(1, 224)}.0.0.0/8", "128.0.0.0/4"]),
+            FilterOptions(peer_asns=[rng.choice(PEERS)[0]], update_type="announce"),
+        ]
+    return filters
+
+
+def test_multiplexer_matches_independent_filters(elements):
+    filters = subscription_filters(elements)
+    mux = StreamMultiplexer(elements)
+    subscriptions = [mux.subscribe(f) for f in filters]
+    received = {id(s): [] for s in subscriptions}
+    for subscription, elem in mux:
+        received[id(subscription)].append(elem)
+
+    for subscription, f in zip(subscriptions, filters):
+        check = compile_filter(f)
+        expected = [e for e in elements if check is None or check(e)]
+        assert received[id(subscription)] == expected
+        assert subscription.matched == len(expected)
+    assert any(received.values())
+
+    with pytest.raises(RuntimeError):
+        mux.subscribe(FilterOptions())
+
+
+def test_multiplexer_subscriptions(elements):
+    mux = StreamMultiplexer(iter(elements))
+    withdrawals = []
+    mux.subscribe(FilterOptions(update_type="withdraw"), callback=withdrawals.append)
+    origins = mux.subscribe(FilterOptions(origin_asns=ORIGINS[:2]))
+    everything = mux.subscribe()
+
+    # Pulling one subscription buffers the elements of the other
+    first = next(origins)
+    assert first.as_path.split()[-1] in map(str, ORIGINS[:2])
+    assert list(everything) == elements
+    assert [e for e in elements if e.type == "W"] == withdrawals
+    assert len(list(origins)) == origins.matched - 1
+
+    with pytest.raises(TypeError):
+        iter(mux.subscriptions[0])
+
+
+def test_multiplexer_as_set_origin(elements):
+    """Paths ending with an AS_SET reach the subscriptions of every ASN of the set"""
+    announcements = [e for e in elements if e.type == "A"][:3]
+    as_set = [e._replace(as_path=f"{e.peer_asn} {{64500,64501}}") for e in announcements]
+    mux = StreamMultiplexer(announcements + as_set)
+    filters = [
+        FilterOptions(origin_asn=64501),
+        FilterOptions(origin_asns=[64500, 64501], update_type="announce"),
+        FilterOptions(origin_asn=64502),
+    ]
+    subscriptions = [mux.subscribe(f) for f in filters]
+    received = {id(s): [] for s in subscriptions}
+    for subscription, elem in mux:
+        received[id(subscription)].append(elem)
+
+    for subscription, f in zip(subscriptions, filters):
+        check = compile_filter(f)
+        assert received[id(subscription)] == [e for e in announcements + as_set if check(e)]
+    assert [received[id(s)] for s in subscriptions] == [as_set, as_set, []]
@@ -0,0 +1,50 @@
+import datetime
+
+import pytest
+
+from pybgpflux import BGPStream, BGPStreamConfig
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+COLLECTORS = ["route-views.wide", "rrc06", "rrc00"]
+
+
+def test_config_data_types():
+    historical = BGPStreamConfig(
+        start_time=datetime.datetime(2010, 9, 1, 0, 0),
+        end_time=datetime.datetime(2010, 9, 1, 1, 0),
+        collectors=["rrc06"],
+        data_types=None,
+        workers=2,
+    )
+    live = BGPStreamConfig(collectors=["rrc06"], data_types=None, workers=2)
+    # Only live configs default to updates
+    assert historical.data_types is None
+    assert live.data_types == ["updates"]
+
+
+@pytest.fixture
+def archive(local_archive):
+    local_archive.ensure(COLLECTORS, ["update", "rib"], T0 - 3600, T0 + 7200)
+    return local_archive
+
+
+@pytest.mark.parametrize("data_type", [["update"], ["rib"], ["rib", "update"]])
+@pytest.mark.parametrize("chunk_time", [None, 1800])
+def test_workers_like_single_process(archive, tmp_path, data_type, chunk_time):
+    def run(workers):
+        stream = BGPStream(
+            collectors=COLLECTORS,
+            data_type=data_type,
+            ts_start=T0,
+            ts_end=T0 + 3599,
+            cache_dir=str(tmp_path / "cache"),
+            chunk_time=chunk_time,
+            workers=workers,
+        )
+        return [str(elem) for elem in stream]
+
+    (tmp_path / "cache").mkdir()
+    expected = run(1)
+    assert expected
+    # Same elements in the same order, RIBs of the same time included
+    assert run(2) == expected
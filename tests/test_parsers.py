@@ -0,0 +1,146 @@
+import asyncio
+import gzip
+import io
+import os
+import stat
+
+import pytest
+
+from benchmarks.fixtures import make_updates
+from pybgpflux import BGPElement, FilterOptions
+from pybgpflux.batch import element_to_row
+from pybgpflux.bgpparser import (
+    TIME_SLACK,
+    BGPdumpParser,
+    BGPKITParser,
+    PyBGPKITParser,
+    TimeBoundParser,
+    read_lines,
+)
+
+BGPKIT_OUTPUT = """\
+A|1283299200.5|202.249.2.169|2497|24.43.184.0/24|2497 3356 13335|IGP|202.249.2.169|0|0|2497:22 3356:1|false|||
+W|1283299201.0|202.249.2.169|2497|24.43.184.0/24
+A|1283299202.0|202.249.2.83|7500|2001:db8::/32|7500 15169|IGP|202.249.2.83|0|0||false|||
+"""
+BGPDUMP_OUTPUT = """\
+BGP4MP|1283299200|A|202.249.2.169|2497|24.43.184.0/24|2497 3356 13335|IGP|202.249.2.169|0|0|2497:22 3356:1|NAG||
+BGP4MP|1283299201|STATE|202.249.2.169|2497|3|6
+BGP4MP|1283299201|W|202.249.2.169|2497|24.43.184.0/24
+BGP4MP|1283299202|A|202.249.2.83|7500|2001:db8::/32|7500 15169|IGP|202.249.2.83|0|0||NAG||
+"""
+
+
+def test_read_lines():
+    text = "A|é|1\nW|2\n\nA|3"
+    for block_size in (1, 3, 7, 1 << 20):
+        lines = list(read_lines(io.BytesIO(text.encode()), block_size))
+        assert lines == text.split("\n")
+    assert list(read_lines(io.BytesIO(b"A|1\n"))) == ["A|1"]
+    assert list(read_lines(io.BytesIO(b""))) == []
+
+
+@pytest.fixture
+def fake_binaries(tmp_path, monkeypatch):
+    """`bgpkit-parser` and `bgpdump` printing canned outputs"""
+    for name, output in (("bgpkit-parser", BGPKIT_OUTPUT), ("bgpdump", BGPDUMP_OUTPUT)):
+        (tmp_path / f"{name}.txt").write_text(output)
+        script = tmp_path / name
+        script.write_text(f"#!/bin/sh\ncat {tmp_path / name}.txt\n")
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+@pytest.mark.parametrize("parser_cls", [BGPKITParser, BGPdumpParser])
+def test_subprocess_parsers(fake_binaries, parser_cls):
+    path = "/archive/updates.20100901.0000.bz2"
+    elements = list(parser_cls(path, False, "rrc00", FilterOptions()))
+    assert [(e.type, e.peer_asn, e.prefix) for e in elements] == [
+        ("A", 2497, "24.43.184.0/24"),
+        ("W", 2497, "24.43.184.0/24"),
+        ("A", 7500, "2001:db8::/32"),
+    ]
+    assert elements[0].as_path == "2497 3356 13335"
+    assert elements[0].communities == ["2497:22", "3356:1"]
+    assert elements[2].communities is None
+    rows = list(parser_cls(path, False, "rrc00", FilterOptions()).iter_rows())
+    assert rows == [element_to_row(e) for e in elements]
+
+    # Sets are filtered on the Python side
+    filters = FilterOptions(prefixes=["2001:db8::/32", "192.0.2.0/24"])
+    assert [e.prefix for e in parser_cls(path, False, "rrc00", filters)] == ["2001:db8::/32"]
+
+
+@pytest.mark.parametrize("parser_cls", [BGPKITParser, BGPdumpParser])
+def test_subprocess_parsers_fields(fake_binaries, parser_cls):
+    path = "/archive/updates.20100901.0000.bz2"
+    full = list(parser_cls(path, False, "rrc00", FilterOptions()))
+    projected = list(parser_cls(path, False, "rrc00", FilterOptions(), fields=["prefix"]))
+    assert [(e.time, e.type, e.peer_asn, e.prefix) for e in projected] == [
+        (e.time, e.type, e.peer_asn, e.prefix) for e in full
+    ]
+    assert all(e.as_path is e.next_hop is e.communities is None for e in projected)
+    rows = parser_cls(path, False, "rrc00", FilterOptions(), fields=["communities"]).iter_rows()
+    assert [row[5:] for row in rows] == [
+        (None, None, None, "2497:22 3356:1"),
+        (None, None, None, ""),
+        (None, None, None, ""),
+    ]
+
+    # Fields read by the Python-side filters are still extracted
+    filters = FilterOptions(communities=["*:22"], prefixes=["24.43.184.0/24", "192.0.2.0/24"])
+    (elem,) = parser_cls(path, False, "rrc00", filters, fields=["next_hop"])
+    assert elem.communities == ["2497:22", "3356:1"] and elem.as_path is None
+
+
+@pytest.mark.parametrize("parser_cls", [BGPKITParser, BGPdumpParser])
+def test_subprocess_parsers_async(fake_binaries, parser_cls):
+    path = "/archive/updates.20100901.0000.bz2"
+    filters = FilterOptions(prefixes=["2001:db8::/32", "192.0.2.0/24"])
+
+    async def parse():
+        return [elem async for elem in parser_cls(path, False, "rrc00", filters)]
+
+    elements = asyncio.run(parse())
+    assert [e.prefix for e in elements] == ["2001:db8::/32"]
+    assert elements == list(parser_cls(path, False, "rrc00", filters))
+
+
+def test_pybgpkit_fields(tmp_path):
+    path = tmp_path / "updates.20100901.0000.gz"
+    path.write_bytes(gzip.compress(make_updates(1283299200, 1283299500, 200, 1)))
+    full = list(PyBGPKITParser(str(path), False, "rrc00"))
+    projected = PyBGPKITParser(str(path), False, "rrc00", fields=["prefix", "as_path"])
+    assert [str(e) for e in projected] == [
+        str(BGPElement(*e[:5], prefix=e.prefix, as_path=e.as_path)) for e in full
+    ]
+    assert [row[:8] for row in projected.iter_rows()] == [
+        element_to_row(e)[:6] + (None, e.as_path) for e in full
+    ]
+    with pytest.raises(ValueError):
+        PyBGPKITParser(str(path), False, "rrc00", fields=["as-path"])
+
+
+def test_time_bound_parser(tmp_path, fake_binaries):
+    path = tmp_path / "updates.20100901.0000.gz"
+    path.write_bytes(gzip.compress(make_updates(1283299200, 1283300100, 300, 1)))
+    full = list(PyBGPKITParser(str(path), False, "rrc00"))
+    ts_end = 1283299500
+    bounded = TimeBoundParser(PyBGPKITParser, ts_end, str(path), False, "rrc00")
+    elements = list(bounded)
+    assert elements == [e for e in full if e.time <= ts_end + TIME_SLACK]
+    assert len(elements) < len(full) and elements[-1].time > ts_end
+    assert list(bounded.iter_rows()) == list(map(element_to_row, elements))
+
+    # Subprocess parsers are still read with asyncio
+    dump = "/archive/updates.20100901.0000.bz2"
+    bounded = TimeBoundParser(BGPdumpParser, 1283299201 - TIME_SLACK, dump, False, "rrc00")
+
+    async def parse():
+        return [elem async for elem in bounded]
+
+    assert hasattr(bounded, "_abatches")
+    assert [(e.type, e.time) for e in asyncio.run(parse())] == [
+        ("A", 1283299200),
+        ("W", 1283299201),
+    ]
@@ -0,0 +1,157 @@
+import gzip
+import random
+import ipaddress
+from collections import Counter
+
+import pytest
+
+from benchmarks.fixtures import make_updates
+from pybgpflux import BGPElement, FilterOptions
+from pybgpflux.bgpparser import (
+    PyBGPKITParser,
+    bgpkit_cli_args,
+    generate_bgpstream_filters,
+)
+from pybgpflux.filtering import compile_filter, residual_filter
+from pybgpflux.prefixmatch import PrefixMatcher, parse_prefix
+
+
+def random_prefixes(rng: random.Random, n: int) -> list[str]:
+    prefixes = []
+    for _ in range(n):
+        if rng.random() < 0.7:
+            address = ipaddress.IPv4Address(rng.getrandbits(32) & 0x0F0F0000)
+            length = rng.randint(4, 28)
+        else:
+            address = ipaddress.IPv6Address(rng.getrandbits(128) & (0xFF0F << 112))
+            length = rng.randint(8, 48)
+        prefixes.append(str(ipaddress.ip_network(f"{address}/{length}", strict=False)))
+    return prefixes
+
+
+def reference(prefix: str, filter_prefixes: list[str], mode: str) -> bool:
+    net = ipaddress.ip_network(prefix)
+    for other in map(ipaddress.ip_network, filter_prefixes):
+        if other.version != net.version:
+            continue
+        if mode in ("exact", "sub", "super-sub") and net == other:
+            return True
+        if mode in ("sub", "super-sub") and net.subnet_of(other):
+            return True
+        if mode in ("super", "super-sub") and net.supernet_of(other):
+            return True
+    return False
+
+
+@pytest.mark.parametrize("mode", ["exact", "sub", "super", "super-sub"])
+def test_prefix_matcher_against_ipaddress(mode):
+    rng = random.Random(mode)
+    filter_prefixes = random_prefixes(rng, 50)
+    matcher = PrefixMatcher(filter_prefixes, mode)
+    elements = random_prefixes(rng, 2000) + filter_prefixes
+
+    matches = [prefix for prefix in elements if matcher(prefix)]
+    assert matches == [p for p in elements if reference(p, filter_prefixes, mode)]
+    assert matches
+
+
+def test_parse_prefix():
+    assert parse_prefix("10.1.2.3/8") == (4, 10 << 24, 8)
+    assert parse_prefix("2001:db8::/32") == (6, 0x20010DB8 << 96, 32)
+    assert parse_prefix("192.0.2.1") == (4, 0xC0000201, 32)
+    for invalid in ("10.1/16", "10.0.0.0/33", "foo/8", ""):
+        with pytest.raises(ValueError):
+            parse_prefix(invalid)
+    assert not PrefixMatcher(["10.0.0.0/8"], "sub")("not a prefix")
+
+
+def test_compile_filter_prefixes():
+    def announce(prefix):
+        return BGPElement(0.0, "A", "rrc00", 2497, "192.0.2.1", None, prefix, None, "2497 13335")
+
+    sub = compile_filter(FilterOptions(prefix_sub="10.0.0.0/8"))
+    assert sub(announce("10.1.0.0/16")) and sub(announce("10.0.0.0/8"))
+    # Other IP version: no match instead of a TypeError from ipaddress
+    assert not sub(announce("11.0.0.0/16")) and not sub(announce("2001:db8::/32"))
+
+    both = compile_filter(FilterOptions(prefix_super="10.1.0.0/16", origin_asn=13335))
+    assert both(announce("10.0.0.0/8")) and not both(announce("10.1.1.0/24"))
+    assert compile_filter(FilterOptions()) is None
+
+
+def test_compile_filter_sets():
+    def announce(peer_asn, prefix, as_path, communities=None):
+        return BGPElement(
+            0.0, "A", "rrc00", peer_asn, "192.0.2.1", None, prefix, None, as_path, communities
+        )
+
+    f = compile_filter(
+        FilterOptions(
+            origin_asn=13335,
+            origin_asns=[15169],
+            peer_asns=[2497, 7500],
+            prefixes_sub=["10.0.0.0/8", "2001:db8::/32"],
+            communities=["2497:1", "*:666"],
+        )
+    )
+    assert f(announce(2497, "10.1.0.0/16", "2497 15169", ["2497:1"]))
+    assert f(announce(7500, "2001:db8:1::/48", "7500 13335", ["3356:666"]))
+    # Any ASN of a final AS_SET is an origin
+    assert f(announce(2497, "10.1.0.0/16", "2497 {64500,15169}", ["2497:1"]))
+    assert not f(announce(2497, "10.1.0.0/16", "2497 {64500,15169} 3356", ["2497:1"]))
+    assert not f(announce(3356, "10.1.0.0/16", "3356 15169", ["2497:1"]))
+    assert not f(announce(2497, "11.0.0.0/8", "2497 15169", ["2497:1"]))
+    assert not f(announce(2497, "10.1.0.0/16", "2497 3356", ["2497:1"]))
+    assert not f(announce(2497, "10.1.0.0/16", "2497 15169", ["2497:2", "666:1"]))
+    assert not f(announce(2497, "10.1.0.0/16", "2497 15169"))
+
+
+def test_filter_pushdown():
+    f = FilterOptions(
+        origin_asns=[13335, 15169],
+        prefix="10.0.0.0/8",
+        prefixes_sub=["10.0.0.0/8", "11.0.0.0/8"],
+        peer_asns=[2497],
+        ip_version=4,
+    )
+    args, residual = bgpkit_cli_args(f)
+    assert args == [
+        "--as-path", r"(^|[ {,])(13335|15169)(,\d+)*\}?$",
+        "--peer-asn", "2497",
+        "--prefix", "10.0.0.0/8",
+        "--ipv4-only",
+    ]
+    assert residual == residual_filter(f, ["origin_asn", "peer_asn", "prefix", "ip_version"])
+    assert residual.model_dump(exclude_none=True) == {
+        "prefixes_sub": ["10.0.0.0/8", "11.0.0.0/8"]
+    }
+    assert generate_bgpstream_filters(f) == (
+        'peer 2497 and aspath "_(13335|15169)$" and prefix exact 10.0.0.0/8'
+        " and prefix more 10.0.0.0/8 11.0.0.0/8 and ipversion 4"
+    )
+
+
+def test_pybgpkit_pushdown(tmp_path):
+    """pybgpkit filters pushed down + Python residual == Python filters only"""
+    path = tmp_path / "updates.20100901.0000.gz"
+    path.write_bytes(gzip.compress(make_updates(1283299200, 1283299500, 2000, 1)))
+    elements = list(PyBGPKITParser(str(path), False, "rrc00"))
+    origins = Counter(int(e.as_path.split()[-1]) for e in elements if e.as_path)
+    origins = [asn for asn, _ in origins.most_common(3)]
+    communities = Counter(c for e in elements for c in e.communities or ())
+    community = communities.most_common(1)[0][0]
+
+    for filters in (
+        FilterOptions(origin_asns=origins),
+        FilterOptions(
+            origin_asn=origins[0],
+            origin_asns=origins[1:],
+            prefixes=[e.prefix for e in elements[:50]],
+        ),
+        FilterOptions(prefixes_super_sub=["128.0.0.0/1"], peer_asns=[2497, 7500]),
+        FilterOptions(communities=[community, community.split(":")[0] + ":*"]),
+    ):
+        parser = PyBGPKITParser(str(path), False, "rrc00", filters)
+        matches = [str(e) for e in elements if compile_filter(filters)(e)]
+        assert [str(e) for e in parser] == matches
+        assert len(list(parser.iter_rows())) == len(matches) > 0
@@ -0,0 +1,110 @@
+import gzip
+from heapq import merge
+from operator import itemgetter
+
+import pytest
+
+from benchmarks.fixtures import make_rib, make_updates
+from pybgpflux import BGPStream, RibState
+from pybgpflux.batch import element_to_row, row_to_element
+from pybgpflux.bgpparser import PyBGPKITParser
+from pybgpflux.ribstate import key_prefix, prefix_key
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+
+
+@pytest.fixture(scope="module")
+def rows(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("ribstate")
+    rib = directory / "bview.20100901.0000.gz"
+    rib.write_bytes(gzip.compress(make_rib(T0, 300, 1)))
+    updates = directory / "updates.20100901.0000.gz"
+    updates.write_bytes(gzip.compress(make_updates(T0, T0 + 900, 2000, 1)))
+    rib_rows = PyBGPKITParser(str(rib), True, "rrc00").iter_rows()
+    update_rows = PyBGPKITParser(str(updates), False, "rrc00").iter_rows()
+    return list(merge(rib_rows, update_rows, key=itemgetter(0)))
+
+
+def reference_tables(rows, until=float("inf")) -> dict:
+    tables = {}
+    for time, elem_type, collector, peer_asn, peer_address, prefix, *route in rows:
+        if time > until:
+            break
+        key = (collector, peer_asn, peer_address, prefix)
+        if elem_type == "W":
+            tables.pop(key, None)
+        else:
+            tables[key] = tuple(route)
+    return tables
+
+
+def tables_of(snapshot) -> dict:
+    tables = {}
+    for row in map(element_to_row, snapshot.elements()):
+        _, elem_type, collector, peer_asn, peer_address, prefix, *route = row
+        assert elem_type == "R" and (collector, peer_asn, peer_address) in snapshot.peers()
+        tables[(collector, peer_asn, peer_address, prefix)] = tuple(route)
+    return tables
+
+
+def test_prefix_key():
+    for prefix in ("0.0.0.0/0", "192.0.2.0/24", "10.1.2.3/32", "2001:db8::/32", "::/0"):
+        assert key_prefix(prefix_key(prefix)) == prefix
+    assert prefix_key("192.0.2.1/24") == prefix_key("192.0.2.0/24")
+    assert prefix_key("0.0.0.0/0") != prefix_key("::/0")
+
+
+def test_rib_state(rows):
+    assert {row[1] for row in rows} == {"R", "A", "W"}
+    times = [T0, T0 + 300, T0 + 600]
+    state = RibState()
+    snapshots = list(state.replay(map(row_to_element, rows), reversed(times)))
+
+    # Snapshots are not affected by the elements applied after them
+    assert [snapshot.time for snapshot in snapshots] == times
+    for snapshot in snapshots:
+        expected = reference_tables(rows, snapshot.time)
+        assert tables_of(snapshot) == expected
+        assert len(snapshot) == len(expected)
+    assert tables_of(state) == reference_tables(rows)
+    assert state.time == rows[-1][0]
+
+    announcement = next(row for row in reversed(rows) if row[1] == "A")
+    _, _, collector, peer_asn, peer_address, prefix, *route = announcement
+    routes = state.lookup(prefix)
+    assert (collector, peer_asn, peer_address) in {
+        (elem.collector, elem.peer_asn, elem.peer_address) for elem in routes
+    }
+    assert all(elem.prefix == prefix for elem in routes)
+
+
+def test_rib_state_new_dump(rows):
+    state = RibState()
+    state.update(map(row_to_element, rows))
+    before = state.snapshot()
+
+    # A later dump of the collector replaces all its tables
+    time, _, collector, peer_asn, peer_address, prefix, *route = rows[0]
+    state.apply(row_to_element((time + 7200, "R", collector, peer_asn, peer_address, prefix, *route)))
+    assert state.peers() == [(collector, peer_asn, peer_address)]
+    assert tables_of(state) == {(collector, peer_asn, peer_address, prefix): tuple(route)}
+    assert tables_of(before) == reference_tables(rows)
+
+
+def test_rib_state_stream(local_archive, tmp_path):
+    (tmp_path / "cache").mkdir()
+    stream = BGPStream(
+        collectors=["route-views.wide", "rrc06"],
+        data_type=["rib", "update"],
+        ts_start=T0,
+        ts_end=T0 + 3599,
+        cache_dir=str(tmp_path / "cache"),
+    )
+    elements = list(stream)
+    state = RibState()
+    state.update(stream)
+
+    expected = RibState()
+    expected.update(elements)
+    assert tables_of(state) == tables_of(expected)
+    assert {collector for collector, *_ in state.peers()} == {"route-views.wide", "rrc06"}
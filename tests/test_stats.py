@@ -0,0 +1,62 @@
+import time
+
+from pybgpflux import BGPStream, StreamStats
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+
+
+def test_stats_nested_stages():
+    stats = StreamStats()
+
+    def parser():
+        with stats.timed("wait"):
+            time.sleep(0.05)
+        yield from range(3)
+
+    merged = stats.timed_merge(stats.timed_parse(parser()), float, 1, 2)
+    assert list(merged) == [1, 2]
+
+    stages = stats.as_dict()["stages"]
+    # The wait is only accounted once, to the innermost stage
+    assert stages["wait"]["wall"] >= 0.05
+    assert stages["parse"]["wall"] < 0.05 and stages["merge"]["wall"] < 0.05
+    assert (stats.elements_parsed, stats.elements, stats.dropped) == (3, 2, {"time_window": 1})
+
+
+def test_stats_openmetrics():
+    stats = StreamStats()
+    stats.add(cache_hits=3, cache_misses=1, bytes_downloaded=2048)
+
+    exposition = stats.to_openmetrics()
+    assert stats.cache_hit_ratio == 0.75
+    assert 'pybgpflux_cache_lookups_total{result="hit"} 3' in exposition
+    assert "pybgpflux_downloaded_bytes_total 2048" in exposition
+    assert "# UNIT pybgpflux_stage_seconds seconds" in exposition
+    assert exposition.endswith("# EOF\n")
+
+
+def test_stream_stats(local_archive, tmp_path):
+    (tmp_path / "cache").mkdir()
+    runs = []
+    for _ in range(2):
+        stream = BGPStream(
+            collectors=["route-views.wide", "rrc06"],
+            data_type=["update"],
+            ts_start=T0,
+            ts_end=T0 + 3599,
+            cache_dir=str(tmp_path / "cache"),
+            chunk_time=1800,
+            stats=True,
+        )
+        runs.append((sum(1 for _ in stream), stream.stats))
+
+    (count, cold), (_, warm) = runs
+    assert cold.elements == count == warm.elements
+    assert cold.elements_parsed == count + cold.dropped["time_window"]
+    # (consecutive chunks share the files over their boundary)
+    assert cold.cache_hit_ratio < 0.5 and warm.cache_hit_ratio == 1
+    assert cold.files_downloaded == cold.cache_misses and cold.bytes_downloaded > 0
+    assert warm.files_downloaded == 0
+    # Chunks share the stats of the stream
+    assert cold.stages["broker"].calls == 2
+    assert cold.stages["parse"].wall > 0 and cold.stages["download"].wall > 0
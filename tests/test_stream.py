@@ -164,6 +164,30 @@ def test_pybgpflux_with_tz(pybgpflux_stream, config):
     assert utc_elems == tokyo_elems
 
 
+def test_pybgpflux_batches(config_with_cache):
+    """Test if columnar batches hold the same elements as the element stream"""
+    elems = list(BGPStream.from_config(config_with_cache))
+    batches = list(BGPStream.from_config(config_with_cache).iter_batches(batch_size=1000))
+
+    assert all(len(batch) <= 1000 for batch in batches)
+    assert sum(len(batch) for batch in batches) == len(elems)
+    batch_elems = [elem for batch in batches for elem in batch.to_elements()]
+    assert [str(e) for e in batch_elems] == [str(e) for e in elems]
+
+
+def test_pybgpflux_stream_downloads(config_with_rib, tmp_path):
+    """Test if parsing files while they are downloaded gives the same elements"""
+    config = config_with_rib.model_copy(
+        update={"cache_dir": tmp_path, "stream_downloads": True}
+    )
+    streamed = [str(e) for e in BGPStream.from_config(config)]
+    # Second run reads the files written to the cache while streaming
+    cached = [str(e) for e in BGPStream.from_config(config)]
+    downloaded = [str(e) for e in BGPStream.from_config(config_with_rib)]
+
+    assert streamed == cached == downloaded
+
+
 def validate_stream(
     stream: BGPStream | pybgpstream.BGPStream, config: BGPStreamConfig
 ):
@@ -0,0 +1,56 @@
+import gzip
+import os
+
+from benchmarks.fixtures import make_updates
+from pybgpflux import BGPStream
+from pybgpflux.bgpparser import TIME_SLACK, PyBGPKITParser
+
+T0 = 1283299200  # 2010-09-01 00:00 UTC
+COLLECTORS = ["route-views.wide", "rrc06"]
+
+
+def test_stream_time_window(local_archive, tmp_path):
+    # The dump before the window has records stamped past its end
+    _, _, path = local_archive.files("rrc06", "update", T0 - 300, T0 - 300)[0]
+    with open(os.path.join(local_archive.root, path), "wb") as f:
+        f.write(gzip.compress(make_updates(T0 - 300, T0 + TIME_SLACK // 2, 50, 1)))
+    expected = sorted(
+        str(elem)
+        for collector in COLLECTORS
+        for data_type in ("update", "rib")
+        for _, _, path in local_archive.files(collector, data_type, T0 - 3600, T0 + 3600)
+        for elem in PyBGPKITParser(
+            os.path.join(local_archive.root, path), data_type == "rib", collector
+        )
+        if T0 <= elem.time <= T0 + 3599
+    )
+
+    def run(**kwargs):
+        stream = BGPStream(
+            collectors=COLLECTORS,
+            data_type=["rib", "update"],
+            ts_start=T0,
+            ts_end=T0 + 3599,
+            cache_dir=str(tmp_path / "cache"),
+            stats=True,
+            **kwargs,
+        )
+        return [str(elem) for elem in stream], stream.stats, stream
+
+    (tmp_path / "cache").mkdir()
+    elements, _, stream = run()
+    chunked, chunked_stats, _ = run(chunk_time=300)
+
+    # Boundary records of the dumps around the window are kept
+    assert sorted(elements) == expected
+    assert any(elem.split("|")[1] < f"{T0 + TIME_SLACK // 2}" for elem in elements)
+    # Only the dumps wholly outside the window, slack included, are left out
+    assert stream._in_window(T0 - 300, T0, False)
+    assert not stream._in_window(T0 - 300 - TIME_SLACK, T0 - TIME_SLACK, False)
+    assert not stream._in_window(T0 + 3600, T0 + 3900, False)
+    assert stream._in_window(T0 - TIME_SLACK // 2, T0 - TIME_SLACK // 2, True)
+    assert not stream._in_window(T0 - 2 * TIME_SLACK, T0 - 2 * TIME_SLACK, True)
+    # Chunks stop parsing the update dumps running past their end (the boundary
+    # records make the two dumps overlap: the merge order may differ)
+    assert sorted(chunked) == expected
+    assert chunked_stats.elements_parsed < 2 * len(elements)